@@ -0,0 +1,72 @@
+from ocp_resources.pod import Pod
+
+from utils.constants import MARIADB, MARIADB_PORT
+
+
+class MariaDBPod(Pod):
+    def __init__(
+        self,
+        name,
+        namespace,
+        image,
+        database,
+        user,
+        password,
+        client,
+        **kwargs,
+    ):
+        super().__init__(name=name, namespace=namespace, client=client, **kwargs)
+        self.image = image
+        self.database = database
+        self.user = user
+        self.password = password
+
+    def to_dict(self):
+        super().to_dict()
+        self.res["metadata"]["labels"] = {
+            "app": MARIADB,
+        }
+        self.res["spec"] = {
+            "containers": [
+                {
+                    "env": [
+                        {
+                            "name": "MYSQL_DATABASE",
+                            "value": self.database,
+                        },
+                        {
+                            "name": "MYSQL_USER",
+                            "value": self.user,
+                        },
+                        {
+                            "name": "MYSQL_PASSWORD",
+                            "value": self.password,
+                        },
+                        {
+                            "name": "MYSQL_ROOT_PASSWORD",
+                            "value": self.password,
+                        },
+                    ],
+                    "image": self.image,
+                    "name": self.name,
+                    "ports": [
+                        {
+                            "containerPort": MARIADB_PORT,
+                        }
+                    ],
+                    # Over TCP, which the image only enables once the database has been initialized
+                    "readinessProbe": {
+                        "exec": {
+                            "command": [
+                                "sh",
+                                "-c",
+                                'MYSQL_PWD="$MYSQL_PASSWORD" mysqladmin -u"$MYSQL_USER" -h 127.0.0.1 '
+                                f"-P {MARIADB_PORT} ping",
+                            ],
+                        },
+                        "initialDelaySeconds": 5,
+                        "periodSeconds": 5,
+                    },
+                }
+            ]
+        }
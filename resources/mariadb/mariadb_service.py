@@ -0,0 +1,33 @@
+from ocp_resources.service import Service
+
+from utils.constants import MARIADB
+
+
+class MariaDBService(Service):
+    def __init__(
+            self,
+            name,
+            port,
+            namespace,
+            client,
+            **kwargs,
+    ):
+        super().__init__(name=name, namespace=namespace, client=client, **kwargs)
+        self.port = port
+
+    def to_dict(self):
+        super().to_dict()
+
+        self.res["spec"] = {
+            "ports": [
+                {
+                    "name": "mariadb-port",
+                    "port": self.port,
+                    "protocol": "TCP",
+                    "targetPort": self.port,
+                }
+            ],
+            "selector": {
+                "app": MARIADB,
+            },
+        }
@@ -0,0 +1,39 @@
+from ocp_resources.secret import Secret
+
+
+class TrustyAIDatabaseSecret(Secret):
+    # Connection settings read by the TrustyAI service in DATABASE storage mode
+    def __init__(
+            self,
+            client,
+            name,
+            namespace,
+            database_kind,
+            database_service,
+            database_port,
+            database_name,
+            database_username,
+            database_password,
+            **kwargs,
+    ):
+        super().__init__(name=name, namespace=namespace, client=client, **kwargs)
+        self.database_kind = database_kind
+        self.database_service = database_service
+        self.database_port = database_port
+        self.database_name = database_name
+        self.database_username = database_username
+        self.database_password = database_password
+
+    def to_dict(self):
+        super().to_dict()
+
+        self.res["stringData"] = {
+            "databaseKind": self.database_kind,
+            "databaseService": self.database_service,
+            "databasePort": str(self.database_port),
+            "databaseName": self.database_name,
+            "databaseUsername": self.database_username,
+            "databasePassword": self.database_password,
+            "databaseGeneration": "update",
+        }
+        self.res["type"] = "Opaque"
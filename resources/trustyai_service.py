@@ -1,6 +1,7 @@
 from ocp_resources.resource import NamespacedResource
 
-from utils.constants import TRUSTYAI_API_GROUP
+from utils.constants import TRUSTYAI_API_GROUP, TRUSTYAI_STORAGE_FOLDER, TRUSTYAI_PVC_STORAGE, \
+    TRUSTYAI_DATABASE_STORAGE, TRUSTYAI_CSV_DATA_FORMAT, TRUSTYAI_DATABASE_SECRET
 
 
 class TrustyAIService(NamespacedResource):
@@ -11,9 +12,22 @@ class TrustyAIService(NamespacedResource):
             name,
             namespace,
             client,
+            storage_format=TRUSTYAI_PVC_STORAGE,
+            storage_size="1Gi",
+            data_format=TRUSTYAI_CSV_DATA_FORMAT,
+            data_filename="data.csv",
+            metrics_schedule="5s",
+            database_configurations=TRUSTYAI_DATABASE_SECRET,
             **kwargs,
     ):
         super().__init__(name=name, namespace=namespace, client=client, **kwargs)
+        self.storage_format = storage_format
+        self.storage_size = storage_size
+        self.data_format = data_format
+        self.data_filename = data_filename
+        self.metrics_schedule = metrics_schedule
+        # Name of the secret with the database connection, only used with DATABASE storage
+        self.database_configurations = database_configurations
 
     def to_dict(self):
         super().to_dict()
@@ -26,16 +40,23 @@ class TrustyAIService(NamespacedResource):
             "replicas": 1,
             "image": "quay.io/trustyaiservice/trustyai-service",
             "tag": "latest",
-            "storage": {
-                "format": "PVC",
-                "folder": "/inputs",
-                "size": "1Gi",
-            },
-            "data": {
-                "filename": "data.csv",
-                "format": "CSV",
-            },
             "metrics": {
-                "schedule": "5s",
+                "schedule": self.metrics_schedule,
             },
         }
+
+        if self.storage_format == TRUSTYAI_DATABASE_STORAGE:
+            self.res["spec"]["storage"] = {
+                "format": TRUSTYAI_DATABASE_STORAGE,
+                "databaseConfigurations": self.database_configurations,
+            }
+        else:
+            self.res["spec"]["storage"] = {
+                "format": self.storage_format,
+                "folder": TRUSTYAI_STORAGE_FOLDER,
+                "size": self.storage_size,
+            }
+            self.res["spec"]["data"] = {
+                "filename": self.data_filename,
+                "format": self.data_format,
+            }
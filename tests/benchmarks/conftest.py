@@ -0,0 +1,76 @@
+import logging
+
+import pytest
+
+from utils.benchmark import BenchmarkReport
+from utils.payload_store import PayloadStore
+from utils.resource_sampler import sample_resources
+
+logger = logging.getLogger(__name__)
+
+TRAINING_DATA_PATH = "./data/training"
+
+benchmark_report_key = pytest.StashKey[BenchmarkReport]()
+benchmark_regressions_key = pytest.StashKey[list]()
+
+
+@pytest.fixture(scope="session")
+def benchmark_report(request):
+    report = BenchmarkReport()
+    request.config.stash[benchmark_report_key] = report
+    yield report
+
+
+@pytest.fixture(scope="session")
+def payload_store():
+    with PayloadStore() as store:
+        yield store
+
+
+@pytest.fixture(scope="session")
+def training_payloads(payload_store):
+    yield list(payload_store.payloads(data_path=TRAINING_DATA_PATH))
+
+
+@pytest.fixture(scope="session")
+def training_rows(payload_store):
+    yield payload_store.row_arrays(data_path=TRAINING_DATA_PATH)
+
+
+@pytest.fixture(scope="function")
+def resource_sampler(request, client, model_namespace, benchmark_report):
+    # Samples the TrustyAI and ModelMesh pods for the duration of a test, usage is recorded per run_load phase
+    with sample_resources(client=client, namespace=model_namespace, benchmark_report=benchmark_report,
+                          benchmark=f"resources_{request.node.name}",
+                          interval=request.config.getoption("--resource-sample-interval")) as sampler:
+        yield sampler
+
+
+def pytest_sessionfinish(session, exitstatus):
+    report = session.config.stash.get(benchmark_report_key, None)
+    if report is None:
+        return
+
+    report_path = session.config.getoption("--benchmark-report")
+    report.write(path=report_path)
+    logger.info(f"Benchmark report written to {report_path}")
+
+    baseline_path = session.config.getoption("--benchmark-baseline")
+    if baseline_path:
+        regressions = report.compare(baseline=BenchmarkReport.load(path=baseline_path),
+                                     tolerance=session.config.getoption("--benchmark-tolerance"))
+        session.config.stash[benchmark_regressions_key] = regressions
+        if regressions:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    regressions = config.stash.get(benchmark_regressions_key, None)
+    if regressions is None:
+        return
+
+    terminalreporter.section("benchmark regressions")
+    if not regressions:
+        terminalreporter.write_line("No regressions against the baseline")
+    for regression in regressions:
+        terminalreporter.write_line(str(regression))
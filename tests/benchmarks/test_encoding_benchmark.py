@@ -0,0 +1,37 @@
+import logging
+from time import process_time
+
+import pytest
+
+from utils.benchmark import run_load, repeat_payloads, FIXED_LOAD_CONCURRENCY
+from utils.tensor_encoding import load_payload_arrays, make_payload, JSON_ENCODING, BINARY_ENCODING
+
+logger = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.benchmark
+
+ENCODING_REPEATS = 5
+
+
+@pytest.fixture(scope="module")
+def training_arrays():
+    yield list(load_payload_arrays(data_path="./data/training"))
+
+
+@pytest.mark.parametrize("encoding", [JSON_ENCODING, BINARY_ENCODING])
+def test_inference_encoding(encoding, trustyai_client, onnx_loan_model_alpha_inference_service, training_arrays,
+                            benchmark_report):
+    benchmark = f"inference_encoding_{encoding}"
+
+    start_time = process_time()
+    payloads = [make_payload(name=file_name, rows=rows, input_name=input_name, encoding=encoding)
+                for file_name, rows, input_name in training_arrays]
+    benchmark_report.record(benchmark=benchmark, metric="encode_cpu_time", value=process_time() - start_time,
+                            unit="s")
+
+    run_load(trustyai_client=trustyai_client,
+             inference_service=onnx_loan_model_alpha_inference_service,
+             payloads=repeat_payloads(payloads=payloads, repeats=ENCODING_REPEATS),
+             concurrency=FIXED_LOAD_CONCURRENCY,
+             benchmark_report=benchmark_report,
+             benchmark=benchmark)
@@ -0,0 +1,161 @@
+import http
+import logging
+from time import monotonic
+
+import pytest
+
+from utils.batching import BatchSizeTuner
+from utils.constants import LOAN_MODEL_INPUT_MAPPINGS, LOAN_MODEL_OUTPUT_MAPPINGS
+from utils.benchmark import run_load, repeat_payloads, FIXED_LOAD_CONCURRENCY
+from utils.metric_sweep import MetricSweep, metric_grid
+from utils.open_loop import OpenLoopScheduler, step_profile, spike_profile, CONSTANT_ARRIVALS, POISSON_ARRIVALS
+
+logger = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.benchmark
+
+FIXED_LOAD_REPEATS = 5
+RAMP_CONCURRENCY_STEPS = (1, 2, 4, 8, 16)
+RAMP_REPEATS = 2
+SPD_DATASET_STEPS = 5
+SPD_SAMPLES_PER_STEP = 10
+SWEEP_BATCH_SIZES = (100, 500, 1000, 2500, 5000)
+OPEN_LOOP_RATES = (5, 10, 20, 40, 80)
+OPEN_LOOP_STEP_SECONDS = 20
+OPEN_LOOP_CONCURRENCY = 10
+
+
+def test_inference_fixed_load(trustyai_client, onnx_loan_model_alpha_inference_service, training_payloads,
+                              benchmark_report, resource_sampler):
+    run_load(trustyai_client=trustyai_client,
+             inference_service=onnx_loan_model_alpha_inference_service,
+             payloads=repeat_payloads(payloads=training_payloads, repeats=FIXED_LOAD_REPEATS),
+             concurrency=FIXED_LOAD_CONCURRENCY,
+             benchmark_report=benchmark_report,
+             benchmark="inference_fixed_load",
+             resource_sampler=resource_sampler)
+
+
+def test_inference_ramped_load(trustyai_client, onnx_loan_model_alpha_inference_service, training_payloads,
+                               benchmark_report, resource_sampler):
+    for concurrency in RAMP_CONCURRENCY_STEPS:
+        logger.info(f"Ramped load step with concurrency {concurrency}")
+        run_load(trustyai_client=trustyai_client,
+                 inference_service=onnx_loan_model_alpha_inference_service,
+                 payloads=repeat_payloads(payloads=training_payloads, repeats=RAMP_REPEATS),
+                 concurrency=concurrency,
+                 benchmark_report=benchmark_report,
+                 benchmark=f"inference_ramp_c{concurrency}",
+                 resource_sampler=resource_sampler)
+
+
+def test_spd_latency_vs_dataset_size(trustyai_client, onnx_loan_model_alpha_inference_service, training_payloads,
+                                     benchmark_report):
+    model_id = onnx_loan_model_alpha_inference_service.name
+    benchmark = "spd_latency_vs_dataset_size"
+
+    for step in range(SPD_DATASET_STEPS):
+        run_load(trustyai_client=trustyai_client,
+                 inference_service=onnx_loan_model_alpha_inference_service,
+                 payloads=repeat_payloads(payloads=training_payloads, repeats=1),
+                 concurrency=FIXED_LOAD_CONCURRENCY,
+                 benchmark_report=benchmark_report,
+                 benchmark=f"{benchmark}_ingest_step{step}")
+        if step == 0:
+            response = trustyai_client.apply_name_mappings(model_id=model_id,
+                                                           input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                                           output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+            assert response.status_code == http.HTTPStatus.OK
+
+        observations = trustyai_client.get_datapoint_counter(model_id=model_id, max_age=0)
+        latencies = []
+        for _ in range(SPD_SAMPLES_PER_STEP):
+            start_time = monotonic()
+            response = trustyai_client.get_fairness_metrics(model_id=model_id,
+                                                            protected_attribute="Is Male-Identifying?",
+                                                            privileged_attribute=1.0,
+                                                            unprivileged_attribute=0.0,
+                                                            outcome_name="Will Default?",
+                                                            favorable_outcome=0,
+                                                            batch_size=observations)
+            latencies.append(monotonic() - start_time)
+            assert response.status_code == http.HTTPStatus.OK
+
+        benchmark_report.record(benchmark=benchmark, metric=f"step{step}_observations", value=observations,
+                                unit="rows", higher_is_better=True)
+        benchmark_report.record_latencies(benchmark=benchmark, latencies=latencies, prefix=f"step{step}_latency")
+
+
+def test_inference_batch_size_tuning(trustyai_client, onnx_loan_model_alpha_inference_service, training_rows,
+                                     benchmark_report):
+    benchmark = "inference_batch_size_tuning"
+    tuner = BatchSizeTuner(trustyai_client=trustyai_client,
+                           inference_service_name=onnx_loan_model_alpha_inference_service.name,
+                           row_arrays=training_rows,
+                           max_concurrency=FIXED_LOAD_CONCURRENCY)
+    tuning = tuner.tune()
+
+    for probe in tuning.probes:
+        benchmark_report.record(benchmark=benchmark, metric=f"rows_per_s_b{probe.rows_per_request}",
+                                value=probe.rows_per_s, unit="rows/s", higher_is_better=True)
+        benchmark_report.record(benchmark=benchmark, metric=f"latency_p95_b{probe.rows_per_request}",
+                                value=probe.latency["p95"], unit="s")
+    benchmark_report.record(benchmark=benchmark, metric="tuned_rows_per_request", value=tuning.rows_per_request,
+                            unit="rows", higher_is_better=True)
+    assert not tuning.probes[0].errors, f"Smallest batch size {tuning.probes[0].rows_per_request} failed"
+
+
+def test_fairness_metric_sweep(trustyai_client, onnx_loan_model_alpha_inference_service, training_payloads,
+                               benchmark_report):
+    model_id = onnx_loan_model_alpha_inference_service.name
+    benchmark = "fairness_metric_sweep"
+    run_load(trustyai_client=trustyai_client,
+             inference_service=onnx_loan_model_alpha_inference_service,
+             payloads=training_payloads,
+             concurrency=FIXED_LOAD_CONCURRENCY,
+             benchmark_report=benchmark_report,
+             benchmark=f"{benchmark}_ingest")
+    response = trustyai_client.apply_name_mappings(model_id=model_id,
+                                                   input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                                   output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+    assert response.status_code == http.HTTPStatus.OK
+
+    grid = metric_grid(protected_attributes=list(LOAN_MODEL_INPUT_MAPPINGS.values()),
+                       batch_sizes=SWEEP_BATCH_SIZES,
+                       outcome_name="Will Default?",
+                       favorable_outcome=0)
+    start_time = monotonic()
+    rows = MetricSweep(trustyai_client=trustyai_client, model_id=model_id).run(metric_requests=grid)
+    benchmark_report.record(benchmark=benchmark, metric="sweep_seconds", value=monotonic() - start_time, unit="s")
+
+    failed = [row for row in rows if row.error]
+    assert not failed, f"{len(failed)} metric requests failed, first: {failed[0].error}"
+    for batch_size in SWEEP_BATCH_SIZES:
+        benchmark_report.record_latencies(benchmark=benchmark,
+                                          latencies=[row.latency for row in rows if row.batch_size == batch_size],
+                                          prefix=f"b{batch_size}_latency")
+
+
+def test_inference_open_loop_saturation(trustyai_client, onnx_loan_model_alpha_inference_service, training_payloads,
+                                        benchmark_report, resource_sampler):
+    # Fixed arrival rates against the OVMS runtime, latency measured from the intended send time
+    profiles = {
+        "inference_open_loop_steps": (step_profile(rates=OPEN_LOOP_RATES, step_duration=OPEN_LOOP_STEP_SECONDS),
+                                      CONSTANT_ARRIVALS),
+        "inference_open_loop_spike": (spike_profile(base_rate=OPEN_LOOP_RATES[1], spike_rate=OPEN_LOOP_RATES[-1],
+                                                    duration=3 * OPEN_LOOP_STEP_SECONDS,
+                                                    spike_start=OPEN_LOOP_STEP_SECONDS,
+                                                    spike_duration=OPEN_LOOP_STEP_SECONDS // 4),
+                                      POISSON_ARRIVALS),
+    }
+    for benchmark, (profile, arrivals) in profiles.items():
+        scheduler = OpenLoopScheduler(trustyai_client=trustyai_client,
+                                      inference_service_name=onnx_loan_model_alpha_inference_service.name,
+                                      profile=profile,
+                                      arrivals=arrivals,
+                                      max_concurrency=OPEN_LOOP_CONCURRENCY,
+                                      seed=0)
+        with resource_sampler.phase(name=benchmark):
+            run = scheduler.run(payloads=training_payloads)
+        run.record(benchmark_report=benchmark_report, benchmark=benchmark)
+        assert run.results, f"No requests were scheduled by {profile.name}"
@@ -0,0 +1,63 @@
+import http
+import logging
+from time import monotonic
+
+import pytest
+
+from utils.benchmark import run_multi_model_load
+from utils.constants import LOAN_MODEL_INPUT_MAPPINGS, LOAN_MODEL_OUTPUT_MAPPINGS
+
+logger = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.benchmark
+
+MODEL_COUNTS = (1, 5, 10, 20, 40)
+SCALE_OUT_CONCURRENCY = 2
+METADATA_SAMPLES = 10
+
+
+@pytest.mark.parametrize("model_count", MODEL_COUNTS)
+def test_model_scale_out(model_count, trustyai_client, onnx_loan_model_alpha_inference_service,
+                         onnx_loan_model_factory, training_payloads, benchmark_report, resource_sampler):
+    # TrustyAI and ModelMesh with `model_count` models behind the same ServingRuntime
+    benchmark = f"scale_out_{model_count}_models"
+    start_time = monotonic()
+    copies = onnx_loan_model_factory(count=model_count - 1)
+    benchmark_report.record(benchmark=benchmark, metric="deploy_seconds", value=monotonic() - start_time, unit="s")
+    model_ids = [onnx_loan_model_alpha_inference_service.name] + [copy.name for copy in copies]
+
+    loads = run_multi_model_load(trustyai_client=trustyai_client,
+                                 model_ids=model_ids,
+                                 payloads=training_payloads,
+                                 concurrency=SCALE_OUT_CONCURRENCY,
+                                 benchmark_report=benchmark_report,
+                                 benchmark=benchmark,
+                                 resource_sampler=resource_sampler)
+    not_ingested = [load.model_id for load in loads if not load.barrier.reached]
+    assert not not_ingested, f"Data not ingested by TrustyAI for {not_ingested}"
+
+    latencies = []
+    for _ in range(METADATA_SAMPLES):
+        start_time = monotonic()
+        response = trustyai_client.get_model_metadata()
+        latencies.append(monotonic() - start_time)
+        assert response.status_code == http.HTTPStatus.OK
+    benchmark_report.record_latencies(benchmark=benchmark, latencies=latencies, prefix="metadata_latency")
+
+    latencies = []
+    for load in loads:
+        response = trustyai_client.apply_name_mappings(model_id=load.model_id,
+                                                       input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                                       output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+        assert response.status_code == http.HTTPStatus.OK
+        start_time = monotonic()
+        response = trustyai_client.get_fairness_metrics(model_id=load.model_id,
+                                                        protected_attribute="Is Male-Identifying?",
+                                                        privileged_attribute=1.0,
+                                                        unprivileged_attribute=0.0,
+                                                        outcome_name="Will Default?",
+                                                        favorable_outcome=0,
+                                                        batch_size=load.barrier.observations)
+        latencies.append(monotonic() - start_time)
+        assert response.status_code == http.HTTPStatus.OK
+    benchmark_report.record_latencies(benchmark=benchmark, latencies=latencies, prefix="spd_latency")
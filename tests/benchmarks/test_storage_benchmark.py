@@ -0,0 +1,103 @@
+import http
+import itertools
+import logging
+from functools import partial
+from time import monotonic
+
+import pytest
+
+from utils.benchmark import run_load, repeat_payloads, FIXED_LOAD_CONCURRENCY
+from utils.constants import LOAN_MODEL_INPUT_MAPPINGS, LOAN_MODEL_OUTPUT_MAPPINGS, TRUSTYAI_PVC_STORAGE, \
+    TRUSTYAI_DATABASE_STORAGE
+from utils.namespace_pool import NamespacePool
+from utils.resource_sampler import sample_resources
+from utils.utils import get_trustyai_client, get_trustyai_storage_bytes
+from utils.worker_coordination import worker_scoped_name
+
+logger = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.benchmark
+
+STORAGE_FORMATS = (TRUSTYAI_PVC_STORAGE, TRUSTYAI_DATABASE_STORAGE)
+METRICS_SCHEDULES = ("5s", "30s")
+STORAGE_CONFIGS = {
+    f"{storage_format.lower()}-{schedule}": {"storage_format": storage_format, "metrics_schedule": schedule}
+    for storage_format, schedule in itertools.product(STORAGE_FORMATS, METRICS_SCHEDULES)
+}
+STORAGE_INGEST_STEPS = 5
+STORAGE_REPEATS_PER_STEP = 4
+STORAGE_SPD_SAMPLES = 5
+
+
+@pytest.fixture(scope="function")
+def storage_resource_sampler(request, client, storage_config_lease, benchmark_report):
+    with sample_resources(client=client, namespace=storage_config_lease[1].namespace,
+                          benchmark_report=benchmark_report, benchmark=f"resources_{request.node.name}",
+                          interval=request.config.getoption("--resource-sample-interval")) as sampler:
+        yield sampler
+
+
+@pytest.fixture(scope="module", params=list(STORAGE_CONFIGS), ids=list(STORAGE_CONFIGS))
+def storage_config_lease(request, client, cluster_monitoring, model_topology_steps_factory, model_topology_reset):
+    # A dedicated namespace per TrustyAIService configuration, deployed once for all steps of the benchmark
+    pool = NamespacePool(client=client,
+                         steps_factory=partial(model_topology_steps_factory,
+                                               trustyai_config=STORAGE_CONFIGS[request.param]),
+                         reset=model_topology_reset,
+                         size=1,
+                         name_prefix=worker_scoped_name(f"storage-{request.param}"),
+                         labels={"modelmesh-enabled": "true"})
+    try:
+        lease = pool.lease()
+        yield request.param, lease
+    finally:
+        pool.close()
+
+
+def test_storage_configuration(client, storage_config_lease, training_payloads, benchmark_report,
+                               storage_resource_sampler):
+    config_id, lease = storage_config_lease
+    namespace = lease.namespace
+    trustyai_service = lease.resources["trustyai_service"]
+    inference_service = lease.resources["onnx_loan_model_alpha_inference_service"]
+    trustyai_client = get_trustyai_client(client=client, namespace=namespace)
+    benchmark = f"storage_{config_id}"
+
+    for step in range(STORAGE_INGEST_STEPS):
+        run_load(trustyai_client=trustyai_client,
+                 inference_service=inference_service,
+                 payloads=repeat_payloads(payloads=training_payloads, repeats=STORAGE_REPEATS_PER_STEP),
+                 concurrency=FIXED_LOAD_CONCURRENCY,
+                 benchmark_report=benchmark_report,
+                 benchmark=f"{benchmark}_ingest_step{step}",
+                 resource_sampler=storage_resource_sampler)
+        if step == 0:
+            response = trustyai_client.apply_name_mappings(model_id=inference_service.name,
+                                                           input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                                           output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+            assert response.status_code == http.HTTPStatus.OK
+
+        observations = trustyai_client.get_datapoint_counter(model_id=inference_service.name, max_age=0)
+        storage_bytes = get_trustyai_storage_bytes(client=client, namespace=namespace,
+                                                   trustyai_service=trustyai_service)
+        latencies = []
+        for _ in range(STORAGE_SPD_SAMPLES):
+            start_time = monotonic()
+            response = trustyai_client.get_fairness_metrics(model_id=inference_service.name,
+                                                            protected_attribute="Is Male-Identifying?",
+                                                            privileged_attribute=1.0,
+                                                            unprivileged_attribute=0.0,
+                                                            outcome_name="Will Default?",
+                                                            favorable_outcome=0,
+                                                            batch_size=observations)
+            latencies.append(monotonic() - start_time)
+            assert response.status_code == http.HTTPStatus.OK
+
+        logger.info(f"{config_id} step {step}: {observations} rows stored in {storage_bytes} bytes")
+        benchmark_report.record(benchmark=benchmark, metric=f"step{step}_observations", value=observations,
+                                unit="rows", higher_is_better=True)
+        benchmark_report.record(benchmark=benchmark, metric=f"step{step}_storage_bytes", value=storage_bytes,
+                                unit="bytes")
+        benchmark_report.record(benchmark=benchmark, metric=f"step{step}_storage_bytes_per_row",
+                                value=storage_bytes / observations, unit="bytes/row")
+        benchmark_report.record_latencies(benchmark=benchmark, latencies=latencies, prefix=f"step{step}_spd_latency")
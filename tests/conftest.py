@@ -5,109 +5,149 @@ import kubernetes
 import yaml
 from kubernetes.dynamic import DynamicClient
 from ocp_resources.configmap import ConfigMap
-from ocp_resources.namespace import Namespace
 from ocp_resources.service_account import ServiceAccount
 
 from resources.inference_service import InferenceService
+from resources.mariadb.mariadb_pod import MariaDBPod
+from resources.mariadb.mariadb_service import MariaDBService
+from resources.mariadb.trustyai_database_secret import TrustyAIDatabaseSecret
 from resources.minio.minio_pod import MinioPod
 from resources.minio.minio_secret import MinioSecret
 from resources.minio.minio_service import MinioService
 from resources.serving_runtime import ServingRuntime
 from resources.trustyai_service import TrustyAIService
 from utils.constants import TRUSTYAI_SERVICE, OVMS_RUNTIME, OVMS_QUAY_IMAGE, OVMS, OPENVINO_MODEL_FORMAT, ONNX, \
-    MINIO_IMAGE
-from utils.utils import wait_for_model_pods
+    MINIO_IMAGE, TRUSTYAI_DATABASE_STORAGE, TRUSTYAI_DATABASE_SECRET, MARIADB, MARIADB_IMAGE, MARIADB_PORT, \
+    MARIADB_DATABASE, MARIADB_USER, MARIADB_PASSWORD
+from utils.benchmark import DEFAULT_REGRESSION_TOLERANCE
+from utils.cassette import Cassette, RecordedResource, get_active_cassette, set_active_cassette, describe_lease, \
+    describe_resource, recorded_lease, RECORD_MODE, REPLAY_MODE
+from utils.namespace_pool import NamespacePool, DEFAULT_POOL_SIZE
+from utils.provisioning import Provisioner, ProvisioningStep
+from utils.resource_sampler import DEFAULT_SAMPLE_INTERVAL
+from utils.tracing import tracer, span
+from utils.utils import wait_for_model_pods, get_trustyai_client, close_all_trustyai_clients, \
+    reset_trustyai_service, wait_for_inference_services
+from utils.waiters import wait_for_resource, is_trustyai_service_ready, is_pod_running, is_pod_ready, \
+    DEFAULT_WAIT_TIMEOUT
+from utils.worker_coordination import SharedClusterResources, get_worker_id, worker_scoped_name
 
 
-@pytest.fixture(scope="session")
-def client():
-    yield DynamicClient(client=kubernetes.config.new_client_from_config())
+def pytest_addoption(parser):
+    parser.addoption("--namespace-pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                     help="Number of namespaces with a deployed model topology to keep warm")
+    parser.addoption("--run-benchmarks", action="store_true", default=False,
+                     help="Run the tests marked as benchmark")
+    parser.addoption("--benchmark-report", default="benchmark_report.json",
+                     help="Path of the JSON report written by the benchmarks")
+    parser.addoption("--benchmark-baseline", default=None,
+                     help="JSON report to compare the benchmark results against")
+    parser.addoption("--benchmark-tolerance", type=float, default=DEFAULT_REGRESSION_TOLERANCE,
+                     help="Relative change from the baseline that is flagged as a regression")
+    parser.addoption("--resource-sample-interval", type=float, default=DEFAULT_SAMPLE_INTERVAL,
+                     help="Seconds between pod CPU/memory samples taken during the benchmarks")
+    parser.addoption("--cassette", default=None,
+                     help="Cassette file used to record or replay cluster and HTTP interactions")
+    parser.addoption("--cassette-mode", choices=(RECORD_MODE, REPLAY_MODE), default=REPLAY_MODE,
+                     help="Record a new cassette against the cluster, or replay one without a cluster")
+    parser.addoption("--trace-report", default=None,
+                     help="Enable tracing and write the spans and per-phase histograms to this OTLP JSON file")
 
 
-@pytest.fixture(scope="session")
-def model_namespace(client):
-    with Namespace(
-            client=client,
-            name="model-namespace",
-            label={"modelmesh-enabled": "true"},
-            teardown=True,
-            delete_timeout=600,
-    ) as ns:
-        ns.wait_for_status(status=Namespace.Status.ACTIVE, timeout=120)
-        yield ns
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: performance benchmark, only run with --run-benchmarks")
+    if config.getoption("--trace-report"):
+        tracer.enabled = True
+    if config.getoption("--cassette"):
+        if get_worker_id():
+            raise pytest.UsageError("--cassette can not be combined with pytest-xdist")
+        set_active_cassette(Cassette(path=config.getoption("--cassette"), mode=config.getoption("--cassette-mode")))
 
 
-@pytest.fixture(scope="function")
-def modelmesh_serviceaccount(client, model_namespace):
-    with ServiceAccount(client=client, name="modelmesh-serving-sa", namespace=model_namespace.name):
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    with span(f"fixture.{fixturedef.argname}", scope=fixturedef.scope):
         yield
 
 
-@pytest.fixture(scope="session")
-def cluster_monitoring_config(client):
-    config_yaml = yaml.dump({'enableUserWorkload': 'true'})
-    with ConfigMap(name="cluster-monitoring-config",
-                   namespace="openshift-monitoring",
-                   data={'config.yaml': config_yaml
-                         }) as cm:
-        print(cm.data)
-        yield cm
+def pytest_sessionfinish(session, exitstatus):
+    trace_report_path = session.config.getoption("--trace-report")
+    if trace_report_path:
+        tracer.write(path=trace_report_path)
+    cassette = get_active_cassette()
+    if cassette is not None:
+        cassette.save()
 
 
-@pytest.fixture(scope="session")
-def user_workload_monitoring_config(client):
-    config_yaml = yaml.dump({
-        'prometheus': {
-            'logLevel': 'debug',
-            'retention': '15d'
-        }
-    })
-    with ConfigMap(name="user-workload-monitoring-config",
-                   namespace="openshift-user-workload-monitoring",
-                   data={'config.yaml': config_yaml
-                         }) as cm:
-        yield cm
+def replaying():
+    cassette = get_active_cassette()
+    return cassette is not None and cassette.replaying
 
 
-@pytest.fixture(scope="function")
-def trustyai_service(client, model_namespace, modelmesh_serviceaccount,
-                     cluster_monitoring_config, user_workload_monitoring_config):
-    with TrustyAIService(name=TRUSTYAI_SERVICE, namespace=model_namespace.name, client=client) as trusty:
-        yield trusty
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not config.getoption("--trace-report"):
+        return
 
+    terminalreporter.section("trace summary")
+    terminalreporter.write_line(f"{'span':<60} {'count':>7} {'total s':>9} {'mean s':>9} {'p95 s':>9} {'max s':>9}")
+    for name, stats in tracer.summary().items():
+        terminalreporter.write_line(f"{name:<60} {stats['count']:>7} {stats['total']:>9.3f} {stats['mean']:>9.3f} "
+                                    f"{stats['p95']:>9.3f} {stats['max']:>9.3f}")
 
-@pytest.fixture(scope="function")
-def minio_service(client, model_namespace):
-    with MinioService(name="minio", port=9000, target_port=9000, namespace=model_namespace.name, client=client) as ms:
-        yield ms
 
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmarks only run with --run-benchmarks")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
 
-@pytest.fixture(scope="function")
-def minio_pod(client, model_namespace):
-    with MinioPod(client=client, name="minio", namespace=model_namespace.name, image=MINIO_IMAGE) as mp:
-        yield mp
 
+@pytest.fixture(scope="session")
+def client():
+    # Nothing talks to the cluster when replaying a cassette
+    if replaying():
+        yield None
+        return
+    yield DynamicClient(client=kubernetes.config.new_client_from_config())
 
-@pytest.fixture(scope="function")
-def aws_minio_data_connection_secret(client, model_namespace):
-    with MinioSecret(client=client, name="aws-connection-minio-data-connection",
-                     namespace=model_namespace.name,
-                     # Dummy AWS values
-                     aws_access_key_id="VEhFQUNDRVNTS0VZ",
-                     aws_default_region="dXMtc291dGg=",
-                     aws_s3_bucket="bW9kZWxtZXNoLWV4YW1wbGUtbW9kZWxz",
-                     aws_s3_endpoint="aHR0cDovL21pbmlvOjkwMDA=",
-                     aws_secret_access_key="VEhFU0VDUkVUS0VZ") as ms:
-        yield ms
 
+def create_cluster_monitoring_config(client):
+    config_yaml = yaml.dump({'enableUserWorkload': 'true'})
+    return ConfigMap(client=client,
+                     name="cluster-monitoring-config",
+                     namespace="openshift-monitoring",
+                     data={'config.yaml': config_yaml
+                           })
 
-@pytest.fixture(scope="function")
-def minio_bucket(minio_service, minio_pod, aws_minio_data_connection_secret):
-    yield minio_service, minio_pod, aws_minio_data_connection_secret
 
+def create_user_workload_monitoring_config(client):
+    config_yaml = yaml.dump({
+        'prometheus': {
+            'logLevel': 'debug',
+            'retention': '15d'
+        }
+    })
+    return ConfigMap(client=client,
+                     name="user-workload-monitoring-config",
+                     namespace="openshift-user-workload-monitoring",
+                     data={'config.yaml': config_yaml
+                           })
 
-@pytest.fixture(scope="function")
-def ovms_runtime(client, minio_bucket, model_namespace):
+
+def create_minio_secret(client, namespace):
+    return MinioSecret(client=client, name="aws-connection-minio-data-connection",
+                       namespace=namespace.name,
+                       # Dummy AWS values
+                       aws_access_key_id="VEhFQUNDRVNTS0VZ",
+                       aws_default_region="dXMtc291dGg=",
+                       aws_s3_bucket="bW9kZWxtZXNoLWV4YW1wbGUtbW9kZWxz",
+                       aws_s3_endpoint="aHR0cDovL21pbmlvOjkwMDA=",
+                       aws_secret_access_key="VEhFU0VDUkVUS0VZ")
+
+
+def create_ovms_runtime(client, namespace):
     supported_model_formats = [
         {
             "name": OPENVINO_MODEL_FORMAT,
@@ -144,27 +184,279 @@ def ovms_runtime(client, minio_bucket, model_namespace):
         }
     ]
 
-    with ServingRuntime(client=client,
-                        name=OVMS_RUNTIME,
-                        namespace=model_namespace.name,
-                        image=OVMS_QUAY_IMAGE,
-                        supported_model_formats=supported_model_formats,
-                        containers=containers,
-                        grpc_endpoint=8085,
-                        grpc_data_endpoint=8001,
-                        server_type=OVMS,
-                        ) as ovms:
-        yield ovms
+    return ServingRuntime(client=client,
+                          name=OVMS_RUNTIME,
+                          namespace=namespace.name,
+                          image=OVMS_QUAY_IMAGE,
+                          supported_model_formats=supported_model_formats,
+                          containers=containers,
+                          grpc_endpoint=8085,
+                          grpc_data_endpoint=8001,
+                          server_type=OVMS,
+                          )
+
+
+def create_onnx_loan_model_alpha_inference_service(client, namespace):
+    return create_onnx_loan_model_inference_service(client=client, namespace=namespace,
+                                                    name=worker_scoped_name("demo-loan-nn-onnx-alpha"))
+
+
+def create_onnx_loan_model_inference_service(client, namespace, name):
+    return InferenceService(client=client,
+                            name=name,
+                            namespace=namespace.name,
+                            path="onnx/loan_model_alpha_august.onnx",
+                            storage_name="aws-connection-minio-data-connection",
+                            model_format_name=ONNX,
+                            runtime=OVMS_RUNTIME)
+
+
+def create_trustyai_database_secret(client, namespace):
+    return TrustyAIDatabaseSecret(client=client,
+                                  name=TRUSTYAI_DATABASE_SECRET,
+                                  namespace=namespace.name,
+                                  database_kind=MARIADB,
+                                  database_service=MARIADB,
+                                  database_port=MARIADB_PORT,
+                                  database_name=MARIADB_DATABASE,
+                                  database_username=MARIADB_USER,
+                                  database_password=MARIADB_PASSWORD)
+
+
+def trustyai_database_steps(client, namespace):
+    return [
+        ProvisioningStep(name="mariadb_service",
+                         create=lambda _: MariaDBService(name=MARIADB, port=MARIADB_PORT, namespace=namespace.name,
+                                                         client=client)),
+        ProvisioningStep(name="mariadb_pod",
+                         create=lambda _: MariaDBPod(client=client, name=MARIADB, namespace=namespace.name,
+                                                     image=MARIADB_IMAGE, database=MARIADB_DATABASE,
+                                                     user=MARIADB_USER, password=MARIADB_PASSWORD),
+                         ready=lambda pod: wait_for_resource(resource=pod, condition=is_pod_ready)),
+        ProvisioningStep(name="trustyai_database_secret",
+                         create=lambda _: create_trustyai_database_secret(client=client, namespace=namespace)),
+    ]
+
+
+def model_topology_steps(client, namespace, trustyai_config=None):
+    # trustyai_config: TrustyAIService storage/data/metrics settings, the defaults are CSV on a PVC
+    trustyai_config = trustyai_config or {}
+    database_steps = []
+    if trustyai_config.get("storage_format") == TRUSTYAI_DATABASE_STORAGE:
+        database_steps = trustyai_database_steps(client=client, namespace=namespace)
+
+    return database_steps + [
+        ProvisioningStep(name="modelmesh_serviceaccount",
+                         create=lambda _: ServiceAccount(client=client, name="modelmesh-serving-sa",
+                                                         namespace=namespace.name)),
+        ProvisioningStep(name="trustyai_service",
+                         create=lambda _: TrustyAIService(name=TRUSTYAI_SERVICE, namespace=namespace.name,
+                                                          client=client, **trustyai_config),
+                         depends_on=("modelmesh_serviceaccount",) + tuple(step.name for step in database_steps),
+                         ready=lambda trusty: wait_for_resource(resource=trusty,
+                                                                condition=is_trustyai_service_ready)),
+        ProvisioningStep(name="minio_service",
+                         create=lambda _: MinioService(name="minio", port=9000, target_port=9000,
+                                                       namespace=namespace.name, client=client)),
+        ProvisioningStep(name="minio_pod",
+                         create=lambda _: MinioPod(client=client, name="minio", namespace=namespace.name,
+                                                   image=MINIO_IMAGE),
+                         ready=lambda mp: wait_for_resource(resource=mp, condition=is_pod_running)),
+        ProvisioningStep(name="aws_minio_data_connection_secret",
+                         create=lambda _: create_minio_secret(client=client, namespace=namespace)),
+        ProvisioningStep(name="ovms_runtime",
+                         create=lambda _: create_ovms_runtime(client=client, namespace=namespace),
+                         depends_on=("minio_service", "minio_pod", "aws_minio_data_connection_secret")),
+        # Model pods only get the payload processor env once TrustyAI is deployed, the readiness wait covers that
+        ProvisioningStep(name="onnx_loan_model_alpha_inference_service",
+                         create=lambda _: create_onnx_loan_model_alpha_inference_service(client=client,
+                                                                                         namespace=namespace),
+                         depends_on=("ovms_runtime",),
+                         ready=lambda _: wait_for_model_pods(client=client, namespace=namespace)),
+    ]
+
+
+def cluster_monitoring_steps(client):
+    return [
+        ProvisioningStep(name="cluster_monitoring_config",
+                         create=lambda _: create_cluster_monitoring_config(client=client)),
+        ProvisioningStep(name="user_workload_monitoring_config",
+                         create=lambda _: create_user_workload_monitoring_config(client=client)),
+    ]
+
+
+@pytest.fixture(scope="session")
+def cluster_monitoring(client, tmp_path_factory):
+    cassette = get_active_cassette()
+    if replaying():
+        recorded = cassette.value(key="cluster_monitoring", compute=None)
+        yield {name: RecordedResource(**resource) for name, resource in recorded.items()}
+        return
+
+    # The monitoring ConfigMaps are cluster-wide, so only the first xdist worker creates them and the last deletes them
+    state_dir = tmp_path_factory.getbasetemp()
+    if get_worker_id():
+        state_dir = state_dir.parent
+    shared_resources = SharedClusterResources(state_dir=state_dir, name="cluster-monitoring")
+    steps = cluster_monitoring_steps(client=client)
+
+    shared_resources.acquire(setup=Provisioner(steps=steps).provision)
+    resources = {step.name: step.create({}) for step in steps}
+    if cassette is not None:
+        cassette.value(key="cluster_monitoring",
+                       compute=lambda: {name: describe_resource(resource=resource)
+                                        for name, resource in resources.items()})
+    yield resources
+
+    def teardown():
+        # The last worker did not provision these, so it tears them down from the steps, in reverse order
+        for step in reversed(steps):
+            step.create({}).clean_up()
+
+    shared_resources.release(teardown=teardown)
+
+
+@pytest.fixture(scope="session")
+def cluster_monitoring_config(cluster_monitoring):
+    yield cluster_monitoring["cluster_monitoring_config"]
+
+
+@pytest.fixture(scope="session")
+def user_workload_monitoring_config(cluster_monitoring):
+    yield cluster_monitoring["user_workload_monitoring_config"]
+
+
+def reset_model_topology(client, lease):
+    reset_trustyai_service(client=client,
+                           namespace=lease.namespace,
+                           model_ids=[lease.resources["onnx_loan_model_alpha_inference_service"].name],
+                           storage_format=lease.resources["trustyai_service"].storage_format)
+
+
+@pytest.fixture(scope="session")
+def model_topology_steps_factory():
+    # For benchmarks that lease namespaces from their own pool, e.g. with another TrustyAI configuration
+    yield model_topology_steps
+
+
+@pytest.fixture(scope="session")
+def model_topology_reset():
+    yield reset_model_topology
+
+
+@pytest.fixture(scope="session")
+def namespace_pool(request, client, cluster_monitoring):
+    if replaying():
+        yield None
+        return
+
+    pool = NamespacePool(client=client,
+                         steps_factory=model_topology_steps,
+                         reset=reset_model_topology,
+                         size=request.config.getoption("--namespace-pool-size"),
+                         name_prefix=worker_scoped_name("model-namespace"),
+                         labels={"modelmesh-enabled": "true"})
+    pool.warm()
+    yield pool
+    close_all_trustyai_clients()
+    pool.close()
+
+
+@pytest.fixture(scope="function")
+def model_lease(request, namespace_pool):
+    cassette = get_active_cassette()
+    if replaying():
+        yield recorded_lease(description=cassette.value(key=f"lease/{request.node.nodeid}", compute=None))
+        return
+
+    lease = namespace_pool.lease()
+    if cassette is not None:
+        cassette.value(key=f"lease/{request.node.nodeid}", compute=lambda: describe_lease(lease=lease))
+    yield lease
+    namespace_pool.release(lease=lease)
+
+
+@pytest.fixture(scope="function")
+def model_namespace(model_lease):
+    yield model_lease.namespace
+
+
+@pytest.fixture(scope="function")
+def model_topology(model_lease):
+    yield model_lease.resources
+
+
+@pytest.fixture(scope="function")
+def modelmesh_serviceaccount(model_topology):
+    yield model_topology["modelmesh_serviceaccount"]
 
 
 @pytest.fixture(scope="function")
-def onnx_loan_model_alpha_inference_service(client, model_namespace, ovms_runtime):
-    with InferenceService(client=client,
-                          name="demo-loan-nn-onnx-alpha",
-                          namespace=model_namespace.name,
-                          path="onnx/loan_model_alpha_august.onnx",
-                          storage_name="aws-connection-minio-data-connection",
-                          model_format_name=ONNX,
-                          runtime=OVMS_RUNTIME) as inference_service:
-        wait_for_model_pods(client=client, namespace=model_namespace)
-        yield inference_service
+def trustyai_service(model_topology):
+    yield model_topology["trustyai_service"]
+
+
+@pytest.fixture(scope="function")
+def trustyai_client(client, model_namespace, trustyai_service):
+    yield get_trustyai_client(client=client, namespace=model_namespace)
+
+
+@pytest.fixture(scope="function")
+def minio_service(model_topology):
+    yield model_topology["minio_service"]
+
+
+@pytest.fixture(scope="function")
+def minio_pod(model_topology):
+    yield model_topology["minio_pod"]
+
+
+@pytest.fixture(scope="function")
+def aws_minio_data_connection_secret(model_topology):
+    yield model_topology["aws_minio_data_connection_secret"]
+
+
+@pytest.fixture(scope="function")
+def minio_bucket(minio_service, minio_pod, aws_minio_data_connection_secret):
+    yield minio_service, minio_pod, aws_minio_data_connection_secret
+
+
+@pytest.fixture(scope="function")
+def ovms_runtime(model_topology):
+    yield model_topology["ovms_runtime"]
+
+
+@pytest.fixture(scope="function")
+def onnx_loan_model_alpha_inference_service(model_topology):
+    yield model_topology["onnx_loan_model_alpha_inference_service"]
+
+
+@pytest.fixture(scope="function")
+def onnx_loan_model_factory(client, model_namespace, onnx_loan_model_alpha_inference_service):
+    """
+    Deploys copies of the alpha model (same ONNX artifact and runtime, distinct names) into the leased namespace.
+
+    `deploy(count)` creates the InferenceServices concurrently, waits for all of them to load in a
+    single watch and returns them. Everything deployed is removed when the test ends.
+    """
+    provisioners = []
+
+    def deploy(count, name_prefix="demo-loan-nn-onnx-copy", timeout=DEFAULT_WAIT_TIMEOUT):
+        names = [worker_scoped_name(f"{name_prefix}-{len(provisioners)}-{index}") for index in range(count)]
+        provisioner = Provisioner(steps=[
+            ProvisioningStep(name=name,
+                             create=lambda _, name=name: create_onnx_loan_model_inference_service(
+                                 client=client, namespace=model_namespace, name=name))
+            for name in names])
+        provisioners.append(provisioner)
+        resources = provisioner.provision()
+        try:
+            wait_for_inference_services(client=client, namespace=model_namespace, names=names, timeout=timeout)
+        except TimeoutError:
+            provisioner.teardown()
+            raise
+        return [resources[name] for name in names]
+
+    yield deploy
+    for provisioner in reversed(provisioners):
+        provisioner.teardown()
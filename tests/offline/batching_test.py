@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.batching import rebatch_rows, BatchSizeTuner
+from utils.payload_generator import load_payload_rows
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def test_rebatch_rows_merges_and_splits():
+    row_arrays = [np.arange(7 * 2).reshape(7, 2), np.arange(3 * 2).reshape(3, 2), np.arange(12 * 2).reshape(12, 2)]
+    batches = list(rebatch_rows(row_arrays=row_arrays, rows_per_request=5))
+
+    assert [len(batch) for batch in batches] == [5, 5, 5, 5, 2]
+    np.testing.assert_array_equal(np.concatenate(batches), np.concatenate(row_arrays))
+
+
+def test_rebatch_rows_cycles_to_total_rows():
+    batches = list(rebatch_rows(row_arrays=[np.arange(3).reshape(3, 1)], rows_per_request=4, total_rows=10))
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert np.concatenate(batches).ravel().tolist() == [0, 1, 2, 0, 1, 2, 0, 1, 2, 0]
+
+
+
+@pytest.mark.parametrize("rows_per_request", [0, -1])
+def test_rebatch_rows_rejects_non_positive_sizes(rows_per_request):
+    with pytest.raises(ValueError, match="rows_per_request must be positive"):
+        rebatch_rows(row_arrays=[np.arange(3).reshape(3, 1)], rows_per_request=rows_per_request)
+
+
+@pytest.mark.parametrize("fake_server_config", [{"latency": 0.1, "max_request_bytes": 100_000}])
+def test_batch_size_tuner_stops_at_rejected_size(fake_trustyai_client):
+    tuner = BatchSizeTuner(trustyai_client=fake_trustyai_client,
+                           inference_service_name=FAKE_MODEL_NAME,
+                           row_arrays=[load_payload_rows(data_path=TRAINING_DATA_PATH)],
+                           candidate_sizes=(250, 500, 1000, 2000),
+                           requests_per_probe=2,
+                           max_concurrency=1)
+    tuning = tuner.tune()
+
+    # A fixed per-request latency favours the largest size the server still accepts
+    assert tuning.rows_per_request == 1000
+    assert [probe.rows_per_request for probe in tuning.probes] == [250, 500, 1000, 2000]
+    assert tuning.probes[-1].errors == 2
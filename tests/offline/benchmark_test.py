@@ -0,0 +1,51 @@
+import math
+
+import pytest
+
+from utils.benchmark import BenchmarkReport, percentile, latency_summary
+
+
+def test_percentile_interpolates_between_ranks():
+    values = [4, 1, 3, 2]
+    assert percentile(values=values, percent=0) == 1
+    assert percentile(values=values, percent=50) == 2.5
+    assert percentile(values=values, percent=90) == pytest.approx(3.7)
+    assert percentile(values=values, percent=100) == 4
+    assert math.isnan(percentile(values=[], percent=50))
+
+
+def test_latency_summary():
+    summary = latency_summary(latencies=[0.1, 0.2, 0.3])
+    assert summary["p50"] == 0.2
+    assert summary["mean"] == pytest.approx(0.2)
+    assert summary["max"] == 0.3
+    assert summary["count"] == 3
+
+    empty = latency_summary(latencies=[])
+    assert empty["count"] == 0
+    assert math.isnan(empty["mean"]) and math.isnan(empty["p99"])
+
+
+def report(**metrics):
+    benchmark_report = BenchmarkReport()
+    for metric, (value, higher_is_better) in metrics.items():
+        benchmark_report.record(benchmark="load", metric=metric, value=value, unit="",
+                                higher_is_better=higher_is_better)
+    return benchmark_report
+
+
+def test_compare_flags_changes_beyond_tolerance():
+    baseline = report(rows_per_s=(1000, True), latency_p99=(1.0, False), bytes_sent=(100, False))
+    current = report(rows_per_s=(700, True), latency_p99=(1.1, False), bytes_sent=(130, False),
+                     new_metric=(5, False))
+
+    regressions = current.compare(baseline=baseline, tolerance=0.2)
+    assert [(regression.metric, regression.baseline, regression.current) for regression in regressions] == \
+        [("rows_per_s", 1000, 700), ("bytes_sent", 100, 130)]
+    assert str(regressions[0]) == "load.rows_per_s: 1000 -> 700 (-30.0%)"
+
+
+def test_compare_skips_non_positive_and_missing_baselines():
+    baseline = report(errors=(0, False), memory_bytes_growth=(-1000, False), latency_p50=(math.nan, False))
+    current = report(errors=(2, False), memory_bytes_growth=(5000, False), latency_p50=(0.5, False))
+    assert current.compare(baseline=baseline) == []
@@ -0,0 +1,61 @@
+import http
+
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.cassette import Cassette, CassetteMissError, RECORD_MODE, REPLAY_MODE
+from utils.constants import TRUSTYAI_MODEL_METADATA_ENDPOINT
+from utils.ingestion import IngestionEngine, load_payload_files
+from utils.tensor_encoding import load_encoded_payload_files, BINARY_ENCODING
+from utils.token_provider import StaticTokenProvider
+from utils.trustyai_client import TrustyAIClient
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def cassette_client(url, inference_url, cassette):
+    return TrustyAIClient(trustyai_url=url,
+                          token_provider=StaticTokenProvider(token="fake-token"),
+                          inference_url_resolver=lambda _: inference_url,
+                          cassette=cassette)
+
+
+def run_session(trustyai_client):
+    engine = IngestionEngine(trustyai_client=trustyai_client, inference_service_name=FAKE_MODEL_NAME, max_concurrency=1)
+    outputs = {}
+    for encoding, payloads in (("json", load_payload_files(data_path=TRAINING_DATA_PATH)),
+                               ("binary", load_encoded_payload_files(data_path=TRAINING_DATA_PATH,
+                                                                     encoding=BINARY_ENCODING))):
+        for result in engine.send(payloads=payloads):
+            outputs[(encoding, result.name)] = result.response.json()["outputs"]
+    return outputs, trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0)
+
+
+def test_replay_serves_recorded_session_without_server(tmp_path, fake_trustyai_server):
+    path = tmp_path / "session.cassette.json.gz"
+    url, inference_url = fake_trustyai_server.url, fake_trustyai_server.inference_url(model_name=FAKE_MODEL_NAME)
+
+    recording = Cassette(path=path, mode=RECORD_MODE)
+    with cassette_client(url=url, inference_url=inference_url, cassette=recording) as trustyai_client:
+        recorded = run_session(trustyai_client=trustyai_client)
+    recording.save()
+    fake_trustyai_server.stop()
+
+    replay = Cassette(path=path, mode=REPLAY_MODE)
+    with cassette_client(url=url, inference_url=inference_url, cassette=replay) as trustyai_client:
+        assert run_session(trustyai_client=trustyai_client) == recorded
+
+        with pytest.raises(CassetteMissError):
+            trustyai_client.request(endpoint=f"{TRUSTYAI_MODEL_METADATA_ENDPOINT}/unknown-model",
+                                    method=http.HTTPMethod.GET)
+
+
+def test_replay_fails_on_unrecorded_value(tmp_path):
+    recording = Cassette(path=tmp_path / "values.cassette.json.gz", mode=RECORD_MODE)
+    assert recording.value(key="route/ns/trustyai-service", compute=lambda: "https://trustyai") == "https://trustyai"
+    recording.save()
+
+    replay = Cassette(path=tmp_path / "values.cassette.json.gz", mode=REPLAY_MODE)
+    assert replay.value(key="route/ns/trustyai-service", compute=None) == "https://trustyai"
+    with pytest.raises(CassetteMissError):
+        replay.value(key="route/ns/other", compute=None)
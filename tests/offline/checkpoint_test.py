@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.checkpoint import CheckpointJournal
+from utils.ingestion import IngestionEngine, IngestionResult, load_payload_files, wait_for_observations
+from utils.tensor_encoding import make_payload, load_encoded_payload_files, BINARY_ENCODING
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def upload(trustyai_client, journal, payloads):
+    # Same steps as send_data_to_inference_service, without the cluster lookups
+    start_obs = trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0)
+    journal.open(observations=start_obs)
+    engine = IngestionEngine(trustyai_client=trustyai_client, inference_service_name=FAKE_MODEL_NAME,
+                             on_result=journal.record)
+    results = engine.send(payloads=journal.pending(payloads=payloads))
+    barrier = wait_for_observations(trustyai_client=trustyai_client, model_id=FAKE_MODEL_NAME,
+                                    expected_observations=start_obs + sum(result.rows for result in results),
+                                    timeout=10)
+    journal.confirm(observations=barrier.observations)
+    journal.close()
+    return results
+
+
+def test_resume_skips_ingested_payloads(tmp_path, fake_trustyai_client):
+    payloads = list(load_payload_files(data_path=TRAINING_DATA_PATH))
+    total_rows = sum(payload.rows for payload in payloads)
+    path = tmp_path / "upload.journal"
+
+    # The first attempt dies after half the payloads, before anything was confirmed
+    journal = CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME).open(observations=0)
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME,
+                             max_concurrency=1, on_result=journal.record)
+    engine.send(payloads=payloads[:len(payloads) // 2])
+    # Accepted by the model but lost before reaching TrustyAI
+    lost = payloads[len(payloads) // 2]
+    journal.record(payload=lost, result=IngestionResult(name=lost.name, status_code=200, rows=lost.rows))
+    journal.close()
+
+    results = upload(trustyai_client=fake_trustyai_client,
+                     journal=CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME), payloads=payloads)
+    assert sorted(result.name for result in results) == [payload.name for payload in payloads[len(payloads) // 2:]]
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0) == total_rows
+
+    # Everything is confirmed now, so a third attempt sends nothing
+    assert upload(trustyai_client=fake_trustyai_client,
+                  journal=CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME), payloads=payloads) == []
+    # Without resuming, the journal starts over
+    journal = CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME, resume=False).open(observations=total_rows)
+    assert len(list(journal.pending(payloads=payloads))) == len(payloads)
+    journal.close()
+
+
+def test_changed_batches_are_resent(tmp_path, fake_trustyai_client):
+    rows = np.arange(20, dtype=np.float64).reshape(2, 10)
+    path = tmp_path / "upload.journal"
+    upload(trustyai_client=fake_trustyai_client, journal=CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME),
+           payloads=[make_payload(name="batch-0", rows=rows)])
+
+    journal = CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME).open(observations=2)
+    pending = journal.pending(payloads=[make_payload(name="batch-0", rows=rows),
+                                        make_payload(name="batch-0", rows=rows + 1)])
+    assert [payload.array[0, 0] for payload in pending] == [1.0]
+    journal.close()
+
+
+def test_resume_across_encodings(tmp_path, fake_trustyai_client):
+    path = tmp_path / "upload.journal"
+    upload(trustyai_client=fake_trustyai_client, journal=CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME),
+           payloads=load_payload_files(data_path=TRAINING_DATA_PATH))
+    observations = fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0)
+
+    # The rows are hashed, not the request body, so the binary payloads are already ingested
+    journal = CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME).open(observations=observations)
+    assert list(journal.pending(payloads=load_encoded_payload_files(data_path=TRAINING_DATA_PATH,
+                                                                    encoding=BINARY_ENCODING))) == []
+    journal.close()
+
+    # Other batch boundaries don't match any journaled payload
+    with pytest.raises(ValueError, match="rows per request"):
+        CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME).open(observations=observations, rows_per_request=7)
+
+
+def test_compaction_keeps_journal_until_replaced(tmp_path, fake_trustyai_client, monkeypatch):
+    path = tmp_path / "upload.journal"
+    upload(trustyai_client=fake_trustyai_client, journal=CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME),
+           payloads=load_payload_files(data_path=TRAINING_DATA_PATH))
+    journaled = path.read_text()
+    observations = fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0)
+
+    # Killed while the compacted journal is being written
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(os, "fsync", crash)
+    with pytest.raises(KeyboardInterrupt):
+        CheckpointJournal(path=path, model_id=FAKE_MODEL_NAME).open(observations=observations)
+    assert path.read_text() == journaled
+    assert os.listdir(tmp_path) == ["upload.journal"]
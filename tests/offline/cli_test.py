@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.cli import main
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+@pytest.fixture
+def target_args(fake_trustyai_server):
+    yield ["--trustyai-url", fake_trustyai_server.url, "--token", "fake-token", "-m", FAKE_MODEL_NAME,
+           "--inference-url", f"{fake_trustyai_server.url}/v2/models/{{model}}/infer"]
+
+
+def run_cli(argv, capsys):
+    exit_code = main(argv=argv)
+    return exit_code, json.loads(capsys.readouterr().out)
+
+
+def test_send_then_metrics(tmp_path, target_args, capsys):
+    checkpoint = str(tmp_path / "upload.journal")
+    exit_code, output = run_cli(argv=["send", *target_args, TRAINING_DATA_PATH, "--checkpoint", checkpoint],
+                                capsys=capsys)
+    assert exit_code == 0
+    assert output["observations"] == output["rows_sent"] > 0
+
+    # Everything is in the journal, so resuming sends nothing
+    exit_code, resumed = run_cli(argv=["send", *target_args, TRAINING_DATA_PATH, "--checkpoint", checkpoint],
+                                 capsys=capsys)
+    assert exit_code == 0
+    assert resumed["requests"] == 0
+    assert resumed["observations"] == output["observations"]
+
+    exit_code, output = run_cli(argv=["metrics", *target_args, "--protected-attribute", "customer_data_input-3",
+                                      "--outcome-name", "predict"], capsys=capsys)
+    assert exit_code == 0
+    assert output["batch_size"] == resumed["observations"]
+    assert -1 <= output["value"] <= 1
+
+
+def test_send_rejects_non_positive_rows_per_request(target_args, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(argv=["send", *target_args, TRAINING_DATA_PATH, "--rows-per-request", "0"])
+    assert exit_info.value.code == 2
+    assert "--rows-per-request: must be a positive integer" in capsys.readouterr().err
+
+
+def test_bench_reports_open_loop_run(tmp_path, target_args, capsys):
+    exit_code, output = run_cli(argv=["bench", *target_args, TRAINING_DATA_PATH, "--rate", "20", "--duration", "0.5",
+                                      "--report", str(tmp_path / "report.json")], capsys=capsys)
+    assert exit_code == 0
+    assert output["latency_count"] == 10
+    assert "missed_schedule" in output
+    assert (tmp_path / "report.json").exists()
+
+
+def test_send_to_url_skips_cluster_imports(target_args):
+    code = "import sys, utils.cli; exit_code = utils.cli.main(sys.argv[1:]); " \
+           "print(sorted(set(sys.modules) & {'kubernetes', 'ocp_resources'}), file=sys.stderr); sys.exit(exit_code)"
+    process = subprocess.run([sys.executable, "-c", code, "send", *target_args, TRAINING_DATA_PATH],
+                             capture_output=True, text=True)
+    assert process.returncode == 0, process.stderr
+    assert process.stderr.strip().splitlines()[-1] == "[]"
+
+
+def test_startup_defers_heavy_imports():
+    code = "import sys, utils.cli; utils.cli.build_parser(); print(sorted(set(sys.modules) & " \
+           "{'requests', 'numpy', 'kubernetes', 'ocp_resources'}))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
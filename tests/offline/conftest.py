@@ -0,0 +1,24 @@
+import pytest
+
+from utils.fake_server import FakeTrustyAIServer
+
+FAKE_MODEL_NAME = "demo-loan-nn-onnx-alpha"
+
+
+@pytest.fixture(scope="function")
+def fake_server_config():
+    # Overridden with indirect parametrization or a local fixture to change latency, error rates, etc.
+    yield {}
+
+
+@pytest.fixture(scope="function")
+def fake_trustyai_server(fake_server_config):
+    with FakeTrustyAIServer(**fake_server_config) as server:
+        server.add_model(model_name=FAKE_MODEL_NAME)
+        yield server
+
+
+@pytest.fixture(scope="function")
+def fake_trustyai_client(fake_trustyai_server):
+    with fake_trustyai_server.create_client() as trustyai_client:
+        yield trustyai_client
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.constants import LOAN_MODEL_INPUT_MAPPINGS, LOAN_MODEL_OUTPUT_MAPPINGS, TRUSTYAI_SPD_ENDPOINT, \
+    TRUSTYAI_DIR_ENDPOINT
+from utils.fairness import FairnessAccumulator, group_counts, statistical_parity_difference, \
+    disparate_impact_ratio, SPD, DIR
+from utils.ingestion import IngestionEngine
+from utils.payload_store import PayloadStore
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def loan_accumulator():
+    return FairnessAccumulator(protected_attribute="Is Male-Identifying?",
+                               privileged_attribute=1.0,
+                               unprivileged_attribute=0.0,
+                               outcome_name="Will Default?",
+                               favorable_outcome=0,
+                               input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                               output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+
+
+def test_streaming_windows_match_full_recomputation():
+    rng = np.random.default_rng(seed=0)
+    rows = rng.integers(0, 2, size=(5000, 11)).astype(np.float64)
+    outcomes = rng.integers(0, 2, size=5000).astype(np.float64)
+
+    accumulator = loan_accumulator()
+    for start in range(0, len(rows), 700):
+        accumulator.update(rows=rows[start:start + 700], outcomes=outcomes[start:start + 700])
+    assert accumulator.observations == len(rows)
+
+    for batch_size in (1, 10, 699, 701, 4999, 5000, 100000, None):
+        window = slice(-batch_size, None) if batch_size else slice(None)
+        counts = group_counts(protected=rows[window, 3], outcomes=outcomes[window], privileged=1.0,
+                              unprivileged=0.0, favorable=0).sum(axis=0)
+        assert accumulator.spd(batch_size=batch_size) == pytest.approx(statistical_parity_difference(counts=counts))
+        assert accumulator.dir(batch_size=batch_size) == pytest.approx(disparate_impact_ratio(counts=counts),
+                                                                       nan_ok=True)
+
+
+@pytest.mark.parametrize("metric, endpoint", [(SPD, TRUSTYAI_SPD_ENDPOINT), (DIR, TRUSTYAI_DIR_ENDPOINT)])
+def test_local_metrics_match_trustyai(tmp_path, fake_trustyai_client, metric, endpoint):
+    accumulator = loan_accumulator()
+    # Sequential sending, so TrustyAI stores the rows in the order they were folded in locally
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME,
+                             max_concurrency=1, on_result=accumulator.observe)
+    results = engine.send(payloads=PayloadStore(cache_dir=tmp_path).payloads(data_path=TRAINING_DATA_PATH))
+    assert accumulator.observations == sum(result.rows for result in results)
+
+    fake_trustyai_client.apply_name_mappings(model_id=FAKE_MODEL_NAME,
+                                             input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                             output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+    for batch_size in (100, 1000, accumulator.observations):
+        response = fake_trustyai_client.get_fairness_metrics(model_id=FAKE_MODEL_NAME,
+                                                             protected_attribute=accumulator.protected_attribute,
+                                                             privileged_attribute=1.0,
+                                                             unprivileged_attribute=0.0,
+                                                             outcome_name=accumulator.outcome_name,
+                                                             favorable_outcome=0,
+                                                             batch_size=batch_size,
+                                                             endpoint=endpoint)
+        accumulator.check(response=response, metric=metric, batch_size=batch_size)
@@ -0,0 +1,116 @@
+import http
+
+import pytest
+import requests
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.constants import LOAN_MODEL_INPUT_MAPPINGS, LOAN_MODEL_OUTPUT_MAPPINGS, TRUSTYAI_MODEL_METADATA_ENDPOINT
+from utils.ingestion import IngestionEngine, load_payload_files, wait_for_observations
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def send_training_data(trustyai_client, **kwargs):
+    engine = IngestionEngine(trustyai_client=trustyai_client, inference_service_name=FAKE_MODEL_NAME, **kwargs)
+    return engine.send(payloads=load_payload_files(data_path=TRAINING_DATA_PATH))
+
+
+@pytest.mark.parametrize("fake_server_config", [{"ingestion_delay": 0.5, "latency": 0.01}])
+def test_concurrent_send_waits_for_async_ingestion(fake_trustyai_client):
+    results = send_training_data(trustyai_client=fake_trustyai_client, max_concurrency=4)
+
+    assert all(result.ok for result in results)
+    rows = sum(result.rows for result in results)
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0) < rows
+
+    barrier = wait_for_observations(trustyai_client=fake_trustyai_client,
+                                    model_id=FAKE_MODEL_NAME,
+                                    expected_observations=rows,
+                                    timeout=10)
+    assert barrier.reached
+    assert barrier.observations == rows
+
+
+@pytest.mark.parametrize("fake_server_config", [{"error_rate": 0.3, "seed": 1}])
+def test_send_retries_injected_failures(fake_trustyai_client):
+    results = send_training_data(trustyai_client=fake_trustyai_client, max_retries=10, backoff_factor=0.001)
+
+    assert all(result.ok for result in results)
+    assert any(result.attempts > 1 for result in results)
+
+
+@pytest.mark.parametrize("fake_server_config", [{"single_model_metadata": False}])
+def test_metadata_falls_back_to_full_listing(fake_trustyai_server, fake_trustyai_client):
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME) == 0
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME) == 0
+    assert fake_trustyai_server.request_counts[TRUSTYAI_MODEL_METADATA_ENDPOINT] == 1
+
+
+@pytest.mark.parametrize("fake_server_config", [{"single_model_metadata": False}])
+def test_missing_single_model_route_falls_back_to_full_listing(fake_trustyai_server, fake_trustyai_client):
+    # Without the route /info/{model_id} is a 404 like an unknown model, the listing tells them apart
+    results = send_training_data(trustyai_client=fake_trustyai_client)
+    rows = sum(result.rows for result in results)
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0) == rows
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0) == rows
+    assert fake_trustyai_server.request_counts[f"{TRUSTYAI_MODEL_METADATA_ENDPOINT}/{{model_id}}"] == 1
+    assert fake_trustyai_server.request_counts[TRUSTYAI_MODEL_METADATA_ENDPOINT] == 2
+
+
+def test_unknown_model_keeps_single_model_metadata(fake_trustyai_server, fake_trustyai_client):
+    # The model is not in the listing either, so it has no data yet and later lookups still use /info/{model_id}
+    assert fake_trustyai_client.get_datapoint_counter(model_id="not-deployed-yet", max_age=0) == 0
+    send_training_data(trustyai_client=fake_trustyai_client)
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0) > 0
+    assert fake_trustyai_server.request_counts[f"{TRUSTYAI_MODEL_METADATA_ENDPOINT}/{{model_id}}"] == 2
+    assert fake_trustyai_server.request_counts[TRUSTYAI_MODEL_METADATA_ENDPOINT] == 1
+
+
+def test_spd_after_name_mappings(fake_trustyai_client):
+    send_training_data(trustyai_client=fake_trustyai_client)
+    response = fake_trustyai_client.apply_name_mappings(model_id=FAKE_MODEL_NAME,
+                                                        input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                                        output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = fake_trustyai_client.get_fairness_metrics(model_id=FAKE_MODEL_NAME,
+                                                         protected_attribute="Is Male-Identifying?",
+                                                         privileged_attribute=1.0,
+                                                         unprivileged_attribute=0.0,
+                                                         outcome_name="Will Default?",
+                                                         favorable_outcome=0,
+                                                         batch_size=5000)
+    assert response.status_code == http.HTTPStatus.OK
+    assert -1 <= response.json()["value"] <= 1
+
+
+def test_failing_payloads_do_not_abort_the_batch(fake_trustyai_client, monkeypatch):
+    infer = fake_trustyai_client.infer
+    payloads = list(load_payload_files(data_path=TRAINING_DATA_PATH))
+    broken, flaky, timed_out = payloads[0].name, payloads[1].name, payloads[2].name
+    attempts = {}
+
+    def unreliable_infer(inference_service_name, data, headers=None, timeout=None):
+        name = next(payload.name for payload in payloads if payload.data is data)
+        attempts[name] = attempts.get(name, 0) + 1
+        if name == broken:
+            raise RuntimeError("token refresh failed")
+        if name == flaky and attempts[name] == 1:
+            raise requests.ConnectionError("connection refused")
+        if name == timed_out:
+            # The model may have stored the rows already, so this one is not retried
+            raise requests.ReadTimeout("read timed out")
+        return infer(inference_service_name=inference_service_name, data=data, headers=headers, timeout=timeout)
+
+    monkeypatch.setattr(fake_trustyai_client, "infer", unreliable_infer)
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME,
+                             backoff_factor=0.001)
+    results = {result.name: result for result in engine.send(payloads=payloads)}
+
+    assert len(results) == len(payloads)
+    assert results[broken].error == "RuntimeError: token refresh failed"
+    assert results[broken].attempts == 1
+    assert results[flaky].ok and results[flaky].attempts == 2
+    assert results[timed_out].error == "ReadTimeout: read timed out"
+    assert results[timed_out].attempts == 1
+    assert all(result.ok for name, result in results.items() if name not in (broken, timed_out))
@@ -0,0 +1,41 @@
+from tests.offline.conftest import FAKE_MODEL_NAME
+from tests.offline.fairness_test import loan_accumulator
+from utils.constants import LOAN_MODEL_INPUT_MAPPINGS, LOAN_MODEL_OUTPUT_MAPPINGS, TRUSTYAI_SPD_ENDPOINT, \
+    TRUSTYAI_DIR_ENDPOINT
+from utils.fairness import SPD, DIR
+from utils.ingestion import IngestionEngine
+from utils.metric_sweep import MetricSweep, metric_grid
+from utils.payload_store import PayloadStore
+
+TRAINING_DATA_PATH = "./data/training"
+BATCH_SIZES = (100, 1000, 5000)
+
+
+def test_metric_sweep_deduplicates_and_caches(tmp_path, fake_trustyai_server, fake_trustyai_client):
+    accumulator = loan_accumulator()
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME,
+                             max_concurrency=1, on_result=accumulator.observe)
+    engine.send(payloads=PayloadStore(cache_dir=tmp_path).payloads(data_path=TRAINING_DATA_PATH))
+    fake_trustyai_client.apply_name_mappings(model_id=FAKE_MODEL_NAME,
+                                             input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                             output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+
+    grid = metric_grid(protected_attributes=list(LOAN_MODEL_INPUT_MAPPINGS.values()),
+                       batch_sizes=BATCH_SIZES,
+                       outcome_name="Will Default?",
+                       favorable_outcome=0,
+                       metrics=(SPD, DIR))
+    sweep = MetricSweep(trustyai_client=fake_trustyai_client, model_id=FAKE_MODEL_NAME)
+    rows = sweep.run(metric_requests=grid + grid[:5])
+
+    assert len(rows) == len(grid) == 2 * len(LOAN_MODEL_INPUT_MAPPINGS) * len(BATCH_SIZES)
+    assert all(row.error is None and not row.cached for row in rows)
+    counts = fake_trustyai_server.request_counts
+    assert counts[TRUSTYAI_SPD_ENDPOINT] + counts[TRUSTYAI_DIR_ENDPOINT] == len(grid)
+
+    protected_rows = [row for row in rows if row.protected_attribute == accumulator.protected_attribute]
+    for row in protected_rows:
+        assert row.value == accumulator.metric(metric=row.metric, batch_size=row.batch_size)
+
+    assert all(row.cached for row in sweep.run(metric_requests=grid))
+    assert counts[TRUSTYAI_SPD_ENDPOINT] + counts[TRUSTYAI_DIR_ENDPOINT] == len(grid)
@@ -0,0 +1,37 @@
+from kubernetes.dynamic.resource import ResourceField
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.benchmark import BenchmarkReport, run_multi_model_load
+from utils.ingestion import load_payload_files
+from utils.waiters import all_present, is_inference_service_loaded
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def test_multi_model_load_reports_every_model(fake_trustyai_server, fake_trustyai_client):
+    model_ids = [FAKE_MODEL_NAME] + [f"{FAKE_MODEL_NAME}-copy-{index}" for index in range(3)]
+    for model_id in model_ids[1:]:
+        fake_trustyai_server.add_model(model_name=model_id)
+    payloads = list(load_payload_files(data_path=TRAINING_DATA_PATH))
+
+    benchmark_report = BenchmarkReport()
+    loads = run_multi_model_load(trustyai_client=fake_trustyai_client, model_ids=model_ids, payloads=payloads,
+                                 concurrency=2, benchmark_report=benchmark_report, benchmark="scale_out")
+
+    rows = sum(payload.rows for payload in payloads)
+    assert [load.model_id for load in loads] == model_ids
+    assert all(load.barrier.reached and load.barrier.observations == rows for load in loads)
+    metrics = benchmark_report.results["scale_out"]
+    assert all(f"{model_id}_rows_per_s_ingested" in metrics for model_id in model_ids)
+    assert metrics["latency_count"]["value"] == len(model_ids) * len(payloads)
+    assert metrics["errors"]["value"] == 0
+
+
+def test_all_present_waits_for_every_inference_service():
+    loaded = ResourceField(params={"status": {"modelStatus": {"states": {"activeModelState": "Loaded"}}}})
+    loading = ResourceField(params={"status": {"modelStatus": {"states": {"activeModelState": "Loading"}}}})
+    condition = all_present(names=["a", "b"], condition=is_inference_service_loaded)
+
+    assert not condition({"a": loaded})
+    assert not condition({"a": loaded, "b": loading})
+    assert condition({"a": loaded, "b": loaded, "c": loading})
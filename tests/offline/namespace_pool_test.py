@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from utils import namespace_pool
+from utils.namespace_pool import NamespacePool
+from utils.provisioning import ProvisioningStep
+
+
+class FakeNamespace:
+    # Stands in for ocp_resources' Namespace, records what the pool does with it
+    class Status:
+        ACTIVE = "Active"
+
+    created = []
+
+    def __init__(self, client, name, label, teardown):
+        self.name = name
+        self.labels = label
+        self.deleted = False
+        FakeNamespace.created.append(self)
+
+    def deploy(self):
+        pass
+
+    def wait_for_status(self, status, timeout):
+        pass
+
+    def delete(self, wait):
+        self.deleted = True
+
+
+class StubResource:
+    def __init__(self, name):
+        self.name = name
+
+    def deploy(self):
+        pass
+
+    def clean_up(self):
+        pass
+
+
+@pytest.fixture
+def fake_namespaces(monkeypatch):
+    monkeypatch.setattr(namespace_pool, "Namespace", FakeNamespace)
+    monkeypatch.setattr(FakeNamespace, "created", [])
+    yield FakeNamespace.created
+
+
+def topology_steps(client, namespace):
+    return [ProvisioningStep(name="pod", create=lambda resources: StubResource(name=f"{namespace.name}-pod"))]
+
+
+def create_pool(reset, size=2):
+    return NamespacePool(client=None, steps_factory=topology_steps, reset=reset, size=size, name_prefix="test",
+                         labels={"modelmesh-enabled": "true"})
+
+
+def test_leases_are_reset_and_reused(fake_namespaces):
+    resets = []
+    pool = create_pool(reset=lambda client, lease: resets.append(lease.namespace.name))
+    pool.warm()
+
+    lease = pool.lease()
+    assert lease.resources["pod"].name == f"{lease.namespace.name}-pod"
+    assert lease.namespace.labels == {"modelmesh-enabled": "true"}
+    pool.release(lease=lease)
+    assert resets == [lease.namespace.name]
+
+    # Both warm namespaces are handed out before a fresh one is created
+    leased = {pool.lease().namespace.name, pool.lease().namespace.name}
+    assert leased == {"test-0", "test-1"}
+    assert len(fake_namespaces) == 2
+
+    pool.close()
+    assert all(namespace.deleted for namespace in fake_namespaces)
+
+
+def test_failed_reset_replaces_the_namespace(fake_namespaces):
+    def failing_reset(client, lease):
+        raise RuntimeError("observations left after reset")
+
+    pool = create_pool(reset=failing_reset, size=1)
+    pool.warm()
+    lease = pool.lease()
+    pool.release(lease=lease)
+
+    assert lease.namespace.deleted
+    replacement = pool.lease()
+    assert replacement.namespace is not lease.namespace and not replacement.namespace.deleted
+    assert [namespace.name for namespace in fake_namespaces] == ["test-0", "test-1"]
+    pool.close()
+
+
+def test_exhausted_pool_provisions_on_demand(fake_namespaces):
+    pool = create_pool(reset=lambda client, lease: None, size=1)
+    pool.warm()
+    first, second = pool.lease(), pool.lease()
+
+    assert first.namespace.name != second.namespace.name
+    assert len(fake_namespaces) == 2
+    pool.close()
+    assert all(namespace.deleted for namespace in fake_namespaces)
+
+
+def test_lease_waits_for_background_provisioning(fake_namespaces, monkeypatch):
+    provisioned = threading.Event()
+    wait_for_status = FakeNamespace.wait_for_status
+
+    def slow_wait_for_status(self, status, timeout):
+        provisioned.wait(timeout=5)
+        wait_for_status(self, status=status, timeout=timeout)
+
+    monkeypatch.setattr(FakeNamespace, "wait_for_status", slow_wait_for_status)
+    pool = create_pool(reset=lambda client, lease: None, size=1)
+    pool.warm()
+    threading.Timer(0.05, provisioned.set).start()
+    assert pool.lease().namespace.name == "test-0"
+    pool.close()
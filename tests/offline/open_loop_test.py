@@ -0,0 +1,68 @@
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.benchmark import BenchmarkReport
+from utils.ingestion import load_payload_files
+from utils.open_loop import OpenLoopScheduler, arrival_schedule, constant_profile, ramp_profile, step_profile, \
+    spike_profile, POISSON_ARRIVALS
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def test_arrival_schedule_follows_profile():
+    steps = list(arrival_schedule(profile=step_profile(rates=(10, 20), step_duration=1), weights=[1] * 100))
+    assert len(steps) == 30
+    assert steps[:2] == [0.0, 0.1]
+    assert steps[10:12] == pytest.approx([1.0, 1.05])
+
+    # Rate from 0 to 20 over 2s: 20 arrivals, a quarter of them in the first second
+    ramp = list(arrival_schedule(profile=ramp_profile(start_rate=0, end_rate=20, duration=2), weights=[1] * 100))
+    assert len(ramp) == 20
+    assert sum(time < 1 for time in ramp) == 5
+
+    # A rows/s target spaces requests by their row count
+    rows = list(arrival_schedule(profile=constant_profile(rate=100, duration=1), weights=[25] * 100))
+    assert rows == [0.0, 0.25, 0.5, 0.75]
+
+    poisson = list(arrival_schedule(profile=spike_profile(base_rate=100, spike_rate=1000, duration=10,
+                                                          spike_start=4, spike_duration=1),
+                                    weights=[1] * 10000, arrivals=POISSON_ARRIVALS, seed=0))
+    assert len(poisson) == pytest.approx(1900, rel=0.1)
+    assert sum(4 <= time < 5 for time in poisson) == pytest.approx(1000, rel=0.1)
+
+
+
+def test_empty_segments_are_skipped():
+    # The spike runs to the end of the profile, so there is no base rate segment after it
+    profile = spike_profile(base_rate=1, spike_rate=5, duration=10, spike_start=5, spike_duration=5)
+    assert [segment.duration for segment in profile.segments] == [5, 5]
+    schedule = list(arrival_schedule(profile=profile, weights=[1] * 100))
+    assert len(schedule) == 30
+    assert schedule[5:7] == pytest.approx([5.0, 5.2])
+
+    # Nothing arrives during a zero rate step
+    idle = list(arrival_schedule(profile=step_profile(rates=(0, 2), step_duration=1), weights=[1] * 100))
+    assert idle == [1.0, 1.5]
+
+
+@pytest.mark.parametrize("fake_server_config", [{"latency": 0.05}])
+def test_latency_includes_time_behind_slow_requests(fake_trustyai_client):
+    # One worker serves 20 requests/s against a schedule of 40/s
+    scheduler = OpenLoopScheduler(trustyai_client=fake_trustyai_client,
+                                  inference_service_name=FAKE_MODEL_NAME,
+                                  profile=constant_profile(rate=40, duration=1),
+                                  max_concurrency=1)
+    run = scheduler.run(payloads=load_payload_files(data_path=TRAINING_DATA_PATH))
+
+    assert len(run.results) == 40
+    assert all(result.ok for result in run.results)
+    assert len(run.missed) > 20
+    last = max(run.results, key=lambda result: result.intended_time)
+    assert last.latency > 0.5 > last.service_time
+
+    benchmark_report = BenchmarkReport()
+    run.record(benchmark_report=benchmark_report, benchmark="open_loop")
+    metrics = benchmark_report.results["open_loop"]
+    assert metrics["missed_schedule"]["value"] == len(run.missed)
+    assert metrics["latency_p99"]["value"] > metrics["service_time_p99"]["value"]
+    assert metrics["segment0_target_rate"]["value"] == 40
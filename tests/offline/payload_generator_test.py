@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.constants import LOAN_MODEL_INPUT_MAPPINGS, LOAN_MODEL_OUTPUT_MAPPINGS
+from utils.fake_server import loan_model_predict
+from utils.ingestion import IngestionEngine
+from utils.payload_generator import SyntheticPayloadGenerator, load_payload_rows, LOAN_MODEL_PROTECTED_INDEX
+
+TRAINING_DATA_PATH = "./data/training"
+GENERATED_ROWS = 20000
+
+
+@pytest.fixture(scope="module")
+def training_rows():
+    yield load_payload_rows(data_path=TRAINING_DATA_PATH)
+
+
+def test_column_sampling_keeps_group_share(training_rows):
+    generator = SyntheticPayloadGenerator(rows=training_rows, seed=0)
+    rows = generator.sample(size=GENERATED_ROWS)
+
+    assert rows.shape == (GENERATED_ROWS, training_rows.shape[1])
+    assert set(np.unique(rows[:, LOAN_MODEL_PROTECTED_INDEX])) <= {0.0, 1.0}
+    assert rows[:, LOAN_MODEL_PROTECTED_INDEX].mean() == pytest.approx(
+        training_rows[:, LOAN_MODEL_PROTECTED_INDEX].mean(), abs=0.02)
+
+
+def test_bias_requires_outcomes(training_rows):
+    with pytest.raises(ValueError, match="bias requires outcomes"):
+        SyntheticPayloadGenerator(rows=training_rows, bias=-0.15, seed=0)
+
+
+def test_generated_payloads_have_known_spd(training_rows, fake_trustyai_client):
+    generator = SyntheticPayloadGenerator(rows=training_rows,
+                                          outcomes=loan_model_predict(rows=training_rows),
+                                          favorable_outcome=0.0,
+                                          bias=-0.15,
+                                          seed=0)
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME)
+    results = engine.send(payloads=generator.payloads(total_rows=GENERATED_ROWS))
+    assert sum(result.rows for result in results) == GENERATED_ROWS
+
+    fake_trustyai_client.apply_name_mappings(model_id=FAKE_MODEL_NAME,
+                                             input_mappings=LOAN_MODEL_INPUT_MAPPINGS,
+                                             output_mappings=LOAN_MODEL_OUTPUT_MAPPINGS)
+    response = fake_trustyai_client.get_fairness_metrics(model_id=FAKE_MODEL_NAME,
+                                                         protected_attribute="Is Male-Identifying?",
+                                                         privileged_attribute=1.0,
+                                                         unprivileged_attribute=0.0,
+                                                         outcome_name="Will Default?",
+                                                         favorable_outcome=0.0,
+                                                         batch_size=GENERATED_ROWS)
+    assert response.json()["value"] == pytest.approx(generator.expected_spd, abs=0.03)
@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.ingestion import IngestionEngine, load_payload_files
+from utils import payload_store
+from utils.payload_store import PayloadStore, PayloadValidationError, HASH_INVALIDATION
+from utils.tensor_encoding import BINARY_ENCODING, JSON_ENCODING
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+@pytest.fixture
+def data_path(tmp_path):
+    path = tmp_path / "data"
+    shutil.copytree(TRAINING_DATA_PATH, path)
+    yield path
+
+
+def test_payload_store_serves_cached_payloads(tmp_path, data_path):
+    store = PayloadStore(cache_dir=tmp_path / "cache")
+    cached = list(store.payloads(data_path=data_path))
+    parsed = list(load_payload_files(data_path=data_path))
+
+    assert [payload.rows for payload in cached] == [payload.rows for payload in parsed]
+    assert [payload.data.tobytes() for payload in cached] == [payload.data for payload in parsed]
+
+    # A fresh store reads the index written by the first one instead of parsing the files again
+    reopened = PayloadStore(cache_dir=tmp_path / "cache")
+    assert reopened.index == store.index
+
+
+def test_payload_store_shares_cache_dir(tmp_path, data_path):
+    # Two stores on one directory, like two xdist workers: neither overwrites the other's entries
+    file_paths = [os.path.join(data_path, file_name) for file_name in sorted(os.listdir(data_path))]
+    first, second = PayloadStore(cache_dir=tmp_path / "cache"), PayloadStore(cache_dir=tmp_path / "cache")
+    first.entry(file_path=file_paths[0])
+    second.entry(file_path=file_paths[1])
+
+    assert sorted(PayloadStore(cache_dir=tmp_path / "cache").index) == sorted(file_paths[:2])
+    assert os.listdir(tmp_path / "cache").count("index.json") == 1
+
+
+def test_payload_store_reuses_mappings(tmp_path, data_path):
+    with PayloadStore(cache_dir=tmp_path / "cache") as store:
+        file_path = os.path.join(data_path, sorted(os.listdir(data_path))[0])
+        first, second = store.payload(file_path=file_path), store.payload(file_path=file_path)
+        assert first.data.chunks[0].obj is second.data.chunks[0].obj
+        assert len(store._bodies) == 1
+    assert not store._bodies
+
+
+@pytest.mark.parametrize("encoding", [JSON_ENCODING, BINARY_ENCODING])
+def test_payload_store_hashes_each_payload_once(tmp_path, data_path, monkeypatch, encoding):
+    store = PayloadStore(cache_dir=tmp_path / "cache", invalidation=HASH_INVALIDATION)
+    file_path = os.path.join(data_path, sorted(os.listdir(data_path))[0])
+    store.entry(file_path=file_path)
+
+    hashed = []
+    file_sha256 = payload_store.file_sha256
+
+    def counting_sha256(file_path):
+        hashed.append(file_path)
+        return file_sha256(file_path=file_path)
+
+    monkeypatch.setattr(payload_store, "file_sha256", counting_sha256)
+    payload = store.payload(file_path=file_path, encoding=encoding)
+    if payload.json_fallback is not None:
+        payload.json_fallback()
+    assert len(hashed) == 1
+
+
+def test_payload_store_invalidates_changed_files(tmp_path, data_path):
+    store = PayloadStore(cache_dir=tmp_path / "cache")
+    file_path = os.path.join(data_path, sorted(os.listdir(data_path))[0])
+    rows = store.load_rows(file_path=file_path)
+
+    with open(file_path) as file:
+        payload = json.load(file)
+    payload["inputs"][0]["data"] = rows[:1].tolist()
+    payload["inputs"][0]["shape"] = [1, 11]
+    with open(file_path, "w") as file:
+        json.dump(payload, file)
+
+    np.testing.assert_array_equal(store.load_rows(file_path=file_path), rows[:1])
+
+    payload["inputs"][0]["shape"] = [2, 11]
+    with open(file_path, "w") as file:
+        json.dump(payload, file)
+    with pytest.raises(PayloadValidationError):
+        store.load_rows(file_path=file_path)
+
+
+@pytest.mark.parametrize("encoding", [JSON_ENCODING, BINARY_ENCODING])
+def test_payload_store_payloads_are_sent(tmp_path, fake_trustyai_client, encoding):
+    store = PayloadStore(cache_dir=tmp_path / "cache")
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME)
+    results = engine.send(payloads=store.payloads(data_path=TRAINING_DATA_PATH, encoding=encoding))
+
+    assert all(result.ok and not result.fell_back_to_json for result in results)
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0) == \
+        sum(result.rows for result in results)
@@ -0,0 +1,84 @@
+import pytest
+
+from utils.provisioning import Provisioner, ProvisioningStep, ProvisioningError
+
+
+class StubResource:
+    def __init__(self, name, events, fail=False):
+        self.name = name
+        self.events = events
+        self.fail = fail
+
+    def deploy(self):
+        self.events.append(("deploy", self.name))
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+
+    def clean_up(self):
+        self.events.append(("clean_up", self.name))
+
+
+def stub_step(name, events, depends_on=(), fail=False, ready=None):
+    return ProvisioningStep(name=name, create=lambda resources: StubResource(name=name, events=events, fail=fail),
+                            depends_on=depends_on, ready=ready)
+
+
+def test_waves_follow_dependencies():
+    events = []
+    provisioner = Provisioner(steps=[stub_step(name="service", events=events, depends_on=("pod", "secret")),
+                                     stub_step(name="pod", events=events, depends_on=("secret",)),
+                                     stub_step(name="secret", events=events),
+                                     stub_step(name="config", events=events)])
+    assert [[step.name for step in wave] for wave in provisioner.waves()] == [["secret", "config"], ["pod"],
+                                                                            ["service"]]
+
+
+def test_waves_reject_unknown_dependencies_and_cycles():
+    events = []
+    with pytest.raises(ProvisioningError, match="unknown steps"):
+        Provisioner(steps=[stub_step(name="pod", events=events, depends_on=("missing",))]).waves()
+    with pytest.raises(ProvisioningError, match="Dependency cycle"):
+        Provisioner(steps=[stub_step(name="a", events=events, depends_on=("b",)),
+                           stub_step(name="b", events=events, depends_on=("a",)),
+                           stub_step(name="c", events=events)]).waves()
+
+
+def test_steps_see_earlier_resources_and_tear_down_in_reverse():
+    events = []
+    seen = {}
+
+    def create_pod(resources):
+        seen.update(resources)
+        return StubResource(name="pod", events=events)
+
+    with Provisioner(steps=[stub_step(name="secret", events=events),
+                            ProvisioningStep(name="pod", create=create_pod, depends_on=("secret",)),
+                            stub_step(name="service", events=events, depends_on=("pod",))]) as provisioner:
+        assert list(seen) == ["secret"]
+        assert list(provisioner.resources) == ["secret", "pod", "service"]
+        del events[:]
+
+    assert events == [("clean_up", "service"), ("clean_up", "pod"), ("clean_up", "secret")]
+    assert [timing.index for timing in provisioner.teardown_timings] == [2, 1, 0]
+    assert not provisioner.resources
+
+
+def test_failed_wave_tears_down_what_was_deployed():
+    events = []
+
+    def never_ready(resource):
+        raise TimeoutError(f"{resource.name} never got ready")
+
+    provisioner = Provisioner(steps=[stub_step(name="secret", events=events),
+                                     stub_step(name="pod", events=events, depends_on=("secret",),
+                                               ready=never_ready),
+                                     stub_step(name="broken", events=events, depends_on=("secret",), fail=True),
+                                     stub_step(name="service", events=events, depends_on=("pod",))])
+    with pytest.raises(ProvisioningError, match="Failed to provision wave 1") as error:
+        provisioner.provision()
+
+    assert isinstance(error.value.__cause__, (TimeoutError, RuntimeError))
+    # The pod deployed but never got ready, it is cleaned up before the wave it depends on
+    cleaned_up = [name for event, name in events if event == "clean_up"]
+    assert cleaned_up == ["pod", "secret"]
+    assert ("deploy", "service") not in events
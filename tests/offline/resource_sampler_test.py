@@ -0,0 +1,33 @@
+import pytest
+
+from utils.benchmark import BenchmarkReport
+from utils.resource_sampler import ResourceSampler, ResourceSample, parse_cpu, parse_memory
+
+
+@pytest.mark.parametrize("quantity, cores", [("250m", 0.25), ("1500000n", 0.0015), ("2", 2.0), ("10u", 0.00001)])
+def test_parse_cpu(quantity, cores):
+    assert parse_cpu(quantity=quantity) == pytest.approx(cores)
+
+
+@pytest.mark.parametrize("quantity, memory", [("512Mi", 512 * 2 ** 20), ("1G", 10 ** 9), ("2048", 2048)])
+def test_parse_memory(quantity, memory):
+    assert parse_memory(quantity=quantity) == memory
+
+
+def test_summary_per_phase_and_pod_group():
+    sampler = ResourceSampler(client=None, namespace=None)
+    for time, cpu, memory in ((0, 0.5, 100), (5, 1.5, 300)):
+        for container in ("ovms", "mm"):
+            sampler.samples.append(ResourceSample(time=time, phase="load", group="modelmesh", pod="modelmesh-serving-0",
+                                                  container=container, cpu_cores=cpu, memory_bytes=memory))
+
+    usage = sampler.summary()["load"]["modelmesh"]
+    assert usage["samples"] == 2
+    assert usage["cpu_cores_mean"] == pytest.approx(2.0)
+    assert usage["cpu_cores_max"] == pytest.approx(3.0)
+    assert usage["memory_bytes_growth"] == 400
+
+    report = BenchmarkReport()
+    sampler.record(benchmark_report=report, benchmark="resources")
+    assert report.results["resources"]["load_modelmesh_memory_bytes_max"]["value"] == 600
+    assert len(report.to_dict()["series"]["resources"]["resource_usage"]["samples"]) == 4
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.ingestion import IngestionEngine
+from utils.tensor_encoding import encode_binary_payload, decode_binary_payload, load_encoded_payload_files, \
+    BINARY_ENCODING
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+def test_binary_payload_round_trip():
+    rows = np.arange(33, dtype=np.float64).reshape(3, 11)
+    body, headers = encode_binary_payload(rows=rows, input_name="customer_data_input")
+
+    decoded, input_name = decode_binary_payload(body=body.tobytes(),
+                                                header_length=int(headers["Inference-Header-Content-Length"]))
+    assert input_name == "customer_data_input"
+    np.testing.assert_array_equal(decoded, rows)
+    assert len(body) == len(body.tobytes())
+
+
+def test_binary_payload_size_is_eight_bytes_per_value():
+    for payload in load_encoded_payload_files(data_path=TRAINING_DATA_PATH, encoding=BINARY_ENCODING):
+        assert payload.data.tensor.nbytes == payload.rows * 11 * 8
+        assert len(payload.data) == len(payload.data.header) + payload.data.tensor.nbytes
+
+
+@pytest.mark.parametrize("fake_server_config, fell_back", [({"binary_data": True}, False),
+                                                           ({"binary_data": False}, True)])
+def test_binary_send_falls_back_to_json(fake_trustyai_client, fell_back):
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME)
+    results = engine.send(payloads=load_encoded_payload_files(data_path=TRAINING_DATA_PATH, encoding=BINARY_ENCODING))
+
+    assert all(result.ok for result in results)
+    assert all(result.fell_back_to_json == fell_back for result in results)
+    assert fake_trustyai_client.get_datapoint_counter(model_id=FAKE_MODEL_NAME, max_age=0) == \
+        sum(result.rows for result in results)
@@ -0,0 +1,81 @@
+import http
+
+import kubernetes
+import pytest
+
+from utils import token_provider
+from utils.token_provider import TokenProvider, TokenNotFoundError
+from utils.trustyai_client import TrustyAIClient
+
+
+class StubConfiguration:
+    # The parts of kubernetes.client.Configuration read by TokenProvider
+    def __init__(self, tokens, refresh=True):
+        self.tokens = iter(tokens)
+        self.api_key = {"authorization": f"Bearer {next(self.tokens)}"}
+        self.refresh_api_key_hook = self.refresh if refresh else None
+        self.refreshes = 0
+
+    def refresh(self, configuration):
+        self.refreshes += 1
+        configuration.api_key = {"BearerToken": next(self.tokens)}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(token_provider, "monotonic", lambda: now[0])
+    yield now
+
+
+def test_token_is_cached_until_ttl_expires(clock):
+    configuration = StubConfiguration(tokens=["first", "second"])
+    provider = TokenProvider(configuration=configuration, ttl=60)
+
+    assert provider.get_token() == "first"
+    clock[0] += 59
+    assert provider.get_token() == "first"
+    assert configuration.refreshes == 0
+
+    clock[0] += 2
+    assert provider.get_token() == "second"
+    assert configuration.refreshes == 1
+
+
+def test_reload_reads_kubeconfig_without_refresh_hook(clock, monkeypatch):
+    configuration = StubConfiguration(tokens=["first"], refresh=False)
+    loads = []
+
+    def load_kube_config(config_file, client_configuration):
+        loads.append(config_file)
+        client_configuration.api_key = {"authorization": "Bearer reloaded"}
+
+    monkeypatch.setattr(kubernetes.config, "load_kube_config", load_kube_config)
+    provider = TokenProvider(configuration=configuration, config_file="kubeconfig")
+    assert provider.get_token() == "first"
+
+    provider.invalidate()
+    assert provider.get_token() == "reloaded"
+    assert loads == ["kubeconfig"]
+
+
+def test_missing_token_raises():
+    configuration = StubConfiguration(tokens=["unused"])
+    configuration.api_key = {}
+    with pytest.raises(TokenNotFoundError):
+        TokenProvider(configuration=configuration).get_token()
+
+
+@pytest.mark.parametrize("fake_server_config", [{"token": "first"}])
+def test_client_refreshes_token_after_unauthorized(fake_trustyai_server):
+    configuration = StubConfiguration(tokens=["first", "second"])
+    with TrustyAIClient(trustyai_url=fake_trustyai_server.url,
+                        token_provider=TokenProvider(configuration=configuration)) as trustyai_client:
+        assert trustyai_client.get_model_metadata().status_code == http.HTTPStatus.OK
+
+        # The server rotates its token, the cached one is rejected once and reloaded
+        fake_trustyai_server.token = "second"
+        assert trustyai_client.get_model_metadata().status_code == http.HTTPStatus.OK
+        assert configuration.refreshes == 1
+        assert trustyai_client.get_model_metadata().status_code == http.HTTPStatus.OK
+        assert configuration.refreshes == 1
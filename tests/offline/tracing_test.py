@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from tests.offline.conftest import FAKE_MODEL_NAME
+from utils.ingestion import IngestionEngine, load_payload_files
+from utils import tracing
+from utils.tracing import Tracer, HISTOGRAM_BOUNDS
+
+TRAINING_DATA_PATH = "./data/training"
+
+
+@pytest.fixture
+def enabled_tracer(monkeypatch):
+    # A separate tracer, so a session traced with --trace-report is left alone
+    local_tracer = Tracer(enabled=True)
+    monkeypatch.setattr(tracing, "tracer", local_tracer)
+    yield local_tracer
+
+
+def test_disabled_tracer_records_nothing():
+    disabled_tracer = Tracer()
+    with disabled_tracer.span("phase") as span:
+        assert span is None
+    assert not disabled_tracer.spans and not disabled_tracer.histograms
+
+
+def test_spans_nest_and_export_as_otlp(tmp_path):
+    local_tracer = Tracer(enabled=True)
+    with local_tracer.span("outer", model="a"):
+        for _ in range(3):
+            with local_tracer.span("inner"):
+                pass
+    with pytest.raises(ValueError), local_tracer.span("failing"):
+        raise ValueError("boom")
+
+    summary = local_tracer.summary()
+    assert summary["inner"]["count"] == 3
+    assert summary["outer"]["total"] >= summary["inner"]["total"]
+
+    local_tracer.write(path=tmp_path / "trace.jsonl")
+    with open(tmp_path / "trace.jsonl") as file:
+        traces, metrics = [json.loads(line) for line in file]
+
+    spans = {span["name"]: span for span in traces["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert spans["inner"]["parentSpanId"] == spans["outer"]["spanId"]
+    assert spans["inner"]["traceId"] == spans["outer"]["traceId"]
+    assert spans["outer"]["attributes"] == [{"key": "model", "value": {"stringValue": "a"}}]
+    assert spans["failing"]["status"]["code"] == 2
+
+    histograms = {metric["name"]: metric["histogram"]["dataPoints"][0]
+                  for metric in metrics["resourceMetrics"][0]["scopeMetrics"][0]["metrics"]}
+    assert histograms["inner"]["count"] == "3"
+    assert len(histograms["inner"]["bucketCounts"]) == len(HISTOGRAM_BOUNDS) + 1
+
+
+def test_ingestion_hot_path_is_traced(enabled_tracer, fake_trustyai_client):
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME)
+    results = engine.send(payloads=load_payload_files(data_path=TRAINING_DATA_PATH))
+
+    summary = enabled_tracer.summary()
+    assert summary["ingestion.send_one"]["count"] == len(results)
+    assert summary["http.request"]["count"] >= len(results)
+
+
+def test_executor_spans_keep_their_parent(enabled_tracer, fake_trustyai_client):
+    engine = IngestionEngine(trustyai_client=fake_trustyai_client, inference_service_name=FAKE_MODEL_NAME)
+    with tracing.span("upload") as upload:
+        engine.send(payloads=load_payload_files(data_path=TRAINING_DATA_PATH))
+
+    send_spans = [span for span in enabled_tracer.spans if span.name == "ingestion.send_one"]
+    assert send_spans and all(span.parent is upload for span in send_spans)
+    assert {span.trace_id for span in send_spans} == {upload.trace_id}
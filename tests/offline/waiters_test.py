@@ -0,0 +1,111 @@
+import http
+
+import pytest
+from kubernetes.client.rest import ApiException
+from kubernetes.dynamic.resource import ResourceField
+
+from utils.waiters import wait_for_resources, all_present, is_pod_running, is_pod_ready, is_inference_service_loaded
+
+
+def resource_field(value):
+    # Nested like the dynamic client's ResourceInstance, so fields are reachable with "." notation
+    if isinstance(value, dict):
+        return ResourceField(params={key: resource_field(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return [resource_field(item) for item in value]
+    return value
+
+
+def pod(name, resource_version, phase="Running", ready=None):
+    status = {"phase": phase}
+    if ready is not None:
+        status["conditions"] = [{"type": "Ready", "status": str(ready)}]
+    return resource_field({"metadata": {"name": name, "resourceVersion": resource_version}, "status": status})
+
+
+class FakeResourceApi:
+    # Serves scripted listings and watch streams, in order, and records where each watch resumed
+    def __init__(self, listings, watches):
+        self.listings = list(listings)
+        self.watches = list(watches)
+        self.watched_versions = []
+
+    def get(self, namespace, label_selector=None, field_selector=None):
+        items, resource_version = self.listings.pop(0)
+        return resource_field({"items": items, "metadata": {"resourceVersion": resource_version}})
+
+    def watch(self, namespace, label_selector=None, field_selector=None, resource_version=None, timeout=None):
+        self.watched_versions.append(resource_version)
+        events = self.watches.pop(0) if self.watches else []
+        if isinstance(events, Exception):
+            raise events
+        yield from events
+
+
+class FakeClient:
+    def __init__(self, resource_api):
+        self.resources = self
+        self.resource_api = resource_api
+
+    def get(self, api_version, kind):
+        return self.resource_api
+
+
+def wait(resource_api, names, timeout=5):
+    return wait_for_resources(client=FakeClient(resource_api=resource_api), api_version="v1", kind="Pod",
+                              namespace="test", condition=all_present(names=names, condition=is_pod_running),
+                              timeout=timeout)
+
+
+def test_watch_resumes_from_listing():
+    resource_api = FakeResourceApi(
+        listings=[([pod(name="a", resource_version="10", phase="Pending")], "10")],
+        watches=[[{"type": "ADDED", "object": pod(name="b", resource_version="11")},
+                  {"type": "DELETED", "object": pod(name="b", resource_version="12")},
+                  {"type": "BOOKMARK", "object": pod(name="a", resource_version="13", phase="Pending")},
+                  {"type": "MODIFIED", "object": pod(name="a", resource_version="14")}]])
+
+    resources = wait(resource_api=resource_api, names=["a"])
+    assert list(resources) == ["a"]
+    assert resources["a"].metadata.resourceVersion == "14"
+    assert resource_api.watched_versions == ["10"]
+
+
+def test_relists_after_gone():
+    resource_api = FakeResourceApi(
+        listings=[([pod(name="a", resource_version="10", phase="Pending")], "10"),
+                  ([pod(name="a", resource_version="20", phase="Pending")], "20")],
+        watches=[ApiException(status=http.HTTPStatus.GONE, reason="Gone"),
+                 [{"type": "MODIFIED", "object": pod(name="a", resource_version="21")}]])
+
+    assert wait(resource_api=resource_api, names=["a"])["a"].metadata.resourceVersion == "21"
+    assert resource_api.watched_versions == ["10", "20"]
+
+
+def test_other_api_errors_are_raised():
+    resource_api = FakeResourceApi(listings=[([], "10")],
+                                   watches=[ApiException(status=http.HTTPStatus.FORBIDDEN, reason="Forbidden")])
+    with pytest.raises(ApiException):
+        wait(resource_api=resource_api, names=["a"])
+
+
+def test_times_out_when_condition_never_holds():
+    resource_api = FakeResourceApi(listings=[([pod(name="a", resource_version="10", phase="Pending")], "10")],
+                                   watches=[])
+    with pytest.raises(TimeoutError, match="Timed out after 0.1s"):
+        wait(resource_api=resource_api, names=["a"], timeout=0.1)
+
+
+def test_pod_ready_needs_running_and_ready_condition():
+    assert not is_pod_ready(pod(name="a", resource_version="1"))
+    assert not is_pod_ready(pod(name="a", resource_version="1", ready=False))
+    assert not is_pod_ready(pod(name="a", resource_version="1", phase="Pending", ready=True))
+    assert is_pod_ready(pod(name="a", resource_version="1", ready=True))
+
+
+def test_inference_service_loaded_by_model_state_or_ready_condition():
+    assert is_inference_service_loaded(resource_field({"status": {"conditions": [
+        {"type": "Ready", "status": "True"}]}}))
+    assert not is_inference_service_loaded(resource_field({"status": {"modelStatus": {
+        "states": {"activeModelState": "Pending"}}}}))
+    assert not is_inference_service_loaded(resource_field({"metadata": {"name": "a"}}))
@@ -0,0 +1,76 @@
+import multiprocessing
+
+import pytest
+
+from utils.worker_coordination import SharedClusterResources, worker_scoped_name
+
+
+def record(log_path, event):
+    with open(log_path, "a") as log_file:
+        log_file.write(f"{event}\n")
+
+
+def read_events(log_path):
+    with open(log_path) as log_file:
+        return log_file.read().split()
+
+
+def share_resources(state_dir, log_path, start):
+    shared_resources = SharedClusterResources(state_dir=state_dir, name="cluster-monitoring")
+    shared_resources.acquire(setup=lambda: record(log_path=log_path, event="setup"))
+    start.wait()
+    shared_resources.release(teardown=lambda: record(log_path=log_path, event="teardown"))
+
+
+def test_first_acquire_sets_up_and_last_release_tears_down(tmp_path):
+    events = []
+    shared_resources = SharedClusterResources(state_dir=str(tmp_path), name="cluster-monitoring")
+
+    for _ in range(3):
+        shared_resources.acquire(setup=lambda: events.append("setup"))
+    for _ in range(3):
+        shared_resources.release(teardown=lambda: events.append("teardown"))
+    assert events == ["setup", "teardown"]
+
+    # Once everyone released, the next acquire sets up again
+    shared_resources.acquire(setup=lambda: events.append("setup"))
+    assert events == ["setup", "teardown", "setup"]
+
+
+def test_failed_setup_is_retried_by_the_next_worker(tmp_path):
+    shared_resources = SharedClusterResources(state_dir=str(tmp_path), name="cluster-monitoring")
+
+    def failing_setup():
+        raise RuntimeError("monitoring config rejected")
+
+    with pytest.raises(RuntimeError):
+        shared_resources.acquire(setup=failing_setup)
+
+    events = []
+    shared_resources.acquire(setup=lambda: events.append("setup"))
+    assert events == ["setup"]
+
+
+def test_workers_share_one_setup_and_teardown(tmp_path):
+    context = multiprocessing.get_context("fork")
+    log_path = str(tmp_path / "events.log")
+    # Every worker acquires before any releases, so the resources are set up exactly once
+    start = context.Barrier(parties=4)
+    workers = [context.Process(target=share_resources,
+                               kwargs={"state_dir": str(tmp_path), "log_path": log_path, "start": start})
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    assert read_events(log_path=log_path) == ["setup", "teardown"]
+
+
+def test_worker_scoped_name(monkeypatch):
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+    assert worker_scoped_name("model-namespace") == "model-namespace"
+
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw3")
+    assert worker_scoped_name("model-namespace") == "model-namespace-gw3"
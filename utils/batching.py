@@ -0,0 +1,167 @@
+import logging
+from dataclasses import dataclass, field
+from time import monotonic
+
+import numpy as np
+
+from utils.benchmark import latency_summary
+from utils.ingestion import IngestionEngine, DEFAULT_MAX_CONCURRENCY
+from utils.payload_generator import DEFAULT_ROWS_PER_REQUEST
+from utils.tensor_encoding import load_payload_arrays, make_payload, DEFAULT_INPUT_NAME, JSON_ENCODING
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CANDIDATE_BATCH_SIZES = (250, 500, 1000, 2000, 4000, 8000, 16000)
+DEFAULT_REQUESTS_PER_PROBE = 8
+# Stop probing once rows/s falls this far below the best size seen so far
+DEFAULT_THROUGHPUT_DROP = 0.1
+# A latency cliff: p95 latency per row grows by more than this factor over the best size seen so far
+DEFAULT_LATENCY_CLIFF_FACTOR = 2.0
+
+
+def rebatch_rows(row_arrays, rows_per_request, total_rows=None):
+    """
+    Merges or splits a stream of row arrays into arrays of exactly `rows_per_request` rows.
+
+    The last array may be shorter. With `total_rows`, the input is cycled until that many rows are produced.
+    """
+    # Checked before the generator starts, so a bad size fails at the call instead of when sending
+    if rows_per_request <= 0:
+        raise ValueError(f"rows_per_request must be positive, got {rows_per_request}")
+    return _rebatch_rows(row_arrays=row_arrays, rows_per_request=rows_per_request, total_rows=total_rows)
+
+
+def _rebatch_rows(row_arrays, rows_per_request, total_rows):
+    row_arrays = [rows for rows in row_arrays if len(rows)]
+    if total_rows is None or not row_arrays:
+        total_rows = sum(len(rows) for rows in row_arrays)
+
+    pending = []
+    pending_rows = 0
+    produced = 0
+    while produced < total_rows:
+        for rows in row_arrays:
+            while len(rows) and produced < total_rows:
+                take = min(len(rows), rows_per_request - pending_rows, total_rows - produced)
+                pending.append(rows[:take])
+                pending_rows += take
+                produced += take
+                rows = rows[take:]
+                if pending_rows == rows_per_request:
+                    yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+                    pending, pending_rows = [], 0
+
+    if pending:
+        yield np.concatenate(pending)
+
+
+def rebatch_payload_files(data_path, rows_per_request=DEFAULT_ROWS_PER_REQUEST, total_rows=None,
+                          encoding=JSON_ENCODING, payload_store=None):
+    if payload_store is not None:
+        row_arrays = payload_store.row_arrays(data_path=data_path)
+    else:
+        row_arrays = [rows for _, rows, _ in load_payload_arrays(data_path=data_path)]
+
+    for index, rows in enumerate(rebatch_rows(row_arrays=row_arrays, rows_per_request=rows_per_request,
+                                              total_rows=total_rows)):
+        yield make_payload(name=f"batch-{rows_per_request}-{index}", rows=rows, input_name=DEFAULT_INPUT_NAME,
+                           encoding=encoding)
+
+
+@dataclass
+class BatchSizeProbe:
+    rows_per_request: int
+    requests: int
+    errors: int
+    rows_per_s: float
+    latency: dict
+
+    @property
+    def latency_per_row(self):
+        return self.latency["p95"] / self.rows_per_request
+
+
+@dataclass
+class BatchSizeTuning:
+    rows_per_request: int
+    probes: list = field(default_factory=list)
+
+
+class BatchSizeTuner:
+    """
+    Finds the rows-per-request that gives the highest inference throughput.
+
+    Candidate sizes are probed in increasing order by sending `requests_per_probe` rebatched requests at
+    each size. Probing stops at the first size that produces errors, hits a latency cliff (p95 latency per
+    row grows by `latency_cliff_factor` over the best size) or loses throughput, and the best size seen
+    is kept. Probe traffic is real inference traffic, so it is also ingested by TrustyAI.
+    """
+
+    def __init__(self,
+                 trustyai_client,
+                 inference_service_name,
+                 row_arrays,
+                 candidate_sizes=DEFAULT_CANDIDATE_BATCH_SIZES,
+                 requests_per_probe=DEFAULT_REQUESTS_PER_PROBE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 encoding=JSON_ENCODING,
+                 throughput_drop=DEFAULT_THROUGHPUT_DROP,
+                 latency_cliff_factor=DEFAULT_LATENCY_CLIFF_FACTOR):
+        self.trustyai_client = trustyai_client
+        self.inference_service_name = inference_service_name
+        self.row_arrays = list(row_arrays)
+        self.candidate_sizes = sorted(candidate_sizes)
+        self.requests_per_probe = requests_per_probe
+        self.max_concurrency = max_concurrency
+        self.encoding = encoding
+        self.throughput_drop = throughput_drop
+        self.latency_cliff_factor = latency_cliff_factor
+
+    def probe(self, rows_per_request):
+        batches = rebatch_rows(row_arrays=self.row_arrays,
+                               rows_per_request=rows_per_request,
+                               total_rows=rows_per_request * self.requests_per_probe)
+        payloads = [make_payload(name=f"probe-{rows_per_request}-{index}", rows=rows, encoding=self.encoding)
+                    for index, rows in enumerate(batches)]
+        engine = IngestionEngine(trustyai_client=self.trustyai_client,
+                                 inference_service_name=self.inference_service_name,
+                                 max_concurrency=self.max_concurrency,
+                                 max_retries=0)
+
+        start_time = monotonic()
+        results = engine.send(payloads=payloads)
+        seconds = monotonic() - start_time
+
+        sent = [result for result in results if result.ok]
+        probe = BatchSizeProbe(rows_per_request=rows_per_request,
+                               requests=len(results),
+                               errors=len(results) - len(sent),
+                               rows_per_s=sum(result.rows for result in sent) / seconds,
+                               latency=latency_summary(latencies=[result.latency for result in sent]))
+        logger.info(f"{rows_per_request} rows/request: {probe.rows_per_s:.0f} rows/s, "
+                    f"p95 {probe.latency['p95']:.3f}s, {probe.errors} errors")
+        return probe
+
+    def tune(self):
+        tuning = BatchSizeTuning(rows_per_request=self.candidate_sizes[0])
+        best = None
+        for rows_per_request in self.candidate_sizes:
+            probe = self.probe(rows_per_request=rows_per_request)
+            tuning.probes.append(probe)
+
+            if probe.errors:
+                logger.info(f"Stopping at {rows_per_request} rows/request: {probe.errors} errors")
+                break
+            if best is not None and probe.latency_per_row > best.latency_per_row * self.latency_cliff_factor:
+                logger.info(f"Stopping at {rows_per_request} rows/request: latency cliff")
+                break
+            if best is not None and probe.rows_per_s < best.rows_per_s * (1 - self.throughput_drop):
+                logger.info(f"Stopping at {rows_per_request} rows/request: throughput dropped")
+                break
+            if best is None or probe.rows_per_s > best.rows_per_s:
+                best = probe
+
+        if best is not None:
+            tuning.rows_per_request = best.rows_per_request
+        logger.info(f"Tuned batch size: {tuning.rows_per_request} rows/request")
+        return tuning
@@ -0,0 +1,246 @@
+import json
+import logging
+import math
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from time import monotonic
+
+from utils.ingestion import IngestionEngine, wait_for_observations
+from utils.tracing import in_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGRESSION_TOLERANCE = 0.2
+# Concurrency of the fixed-load benchmarks that other benchmarks compare against
+FIXED_LOAD_CONCURRENCY = 4
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(values, percent):
+    # Linear interpolation between closest ranks, same as numpy's default method
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * percent / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def latency_summary(latencies):
+    summary = {f"p{percent}": percentile(values=latencies, percent=percent) for percent in LATENCY_PERCENTILES}
+    summary["mean"] = sum(latencies) / len(latencies) if latencies else math.nan
+    summary["max"] = max(latencies) if latencies else math.nan
+    summary["count"] = len(latencies)
+    return summary
+
+
+@dataclass
+class Regression:
+    benchmark: str
+    metric: str
+    baseline: float
+    current: float
+
+    def __str__(self):
+        change = (self.current - self.baseline) / self.baseline if self.baseline else math.inf
+        return f"{self.benchmark}.{self.metric}: {self.baseline:.4g} -> {self.current:.4g} ({change:+.1%})"
+
+
+class BenchmarkReport:
+    """
+    Machine-readable benchmark results: benchmark name -> metric name -> value.
+
+    Every metric records whether higher is better, so two reports can be compared without knowing
+    what the individual benchmarks measure.
+    """
+
+    def __init__(self, results=None, environment=None, series=None):
+        self.results = results or {}
+        # benchmark name -> series name -> raw time series, kept next to the summary metrics
+        self.series = series or {}
+        self.environment = environment or {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "host": platform.node(),
+        }
+
+    def record(self, benchmark, metric, value, unit, higher_is_better=False):
+        self.results.setdefault(benchmark, {})[metric] = {
+            "value": value,
+            "unit": unit,
+            "higher_is_better": higher_is_better,
+        }
+
+    def record_latencies(self, benchmark, latencies, prefix="latency"):
+        for name, value in latency_summary(latencies=latencies).items():
+            if name == "count":
+                self.record(benchmark=benchmark, metric=f"{prefix}_count", value=value, unit="requests",
+                            higher_is_better=True)
+            else:
+                self.record(benchmark=benchmark, metric=f"{prefix}_{name}", value=value, unit="s")
+
+    def record_series(self, benchmark, name, series):
+        self.series.setdefault(benchmark, {})[name] = series
+
+    def to_dict(self):
+        return {"environment": self.environment, "results": self.results, "series": self.series}
+
+    def write(self, path):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            data = json.load(file)
+        return cls(results=data["results"], environment=data.get("environment"), series=data.get("series"))
+
+    def compare(self, baseline, tolerance=DEFAULT_REGRESSION_TOLERANCE):
+        regressions = []
+        for benchmark, metrics in self.results.items():
+            for metric, current in metrics.items():
+                reference = baseline.results.get(benchmark, {}).get(metric)
+                if reference is None or not isinstance(current["value"], (int, float)):
+                    continue
+                if math.isnan(current["value"]) or math.isnan(reference["value"]):
+                    continue
+                # A relative tolerance means nothing against a zero or negative baseline (e.g. errors or
+                # memory growth), where any change would count as a regression
+                if reference["value"] <= 0:
+                    continue
+
+                if current["higher_is_better"]:
+                    regressed = current["value"] < reference["value"] * (1 - tolerance)
+                else:
+                    regressed = current["value"] > reference["value"] * (1 + tolerance)
+                if regressed:
+                    regressions.append(Regression(benchmark=benchmark, metric=metric,
+                                                  baseline=reference["value"], current=current["value"]))
+        return regressions
+
+
+def run_ingestion_load(trustyai_client, model_id, payloads, concurrency, benchmark_report, benchmark,
+                       resource_sampler=None):
+    engine = IngestionEngine(trustyai_client=trustyai_client, inference_service_name=model_id,
+                             max_concurrency=concurrency)
+    start_obs = trustyai_client.get_datapoint_counter(model_id=model_id, max_age=0)
+
+    with resource_sampler.phase(name=benchmark) if resource_sampler is not None else nullcontext():
+        start_time = monotonic()
+        results = engine.send(payloads=payloads)
+        send_seconds = monotonic() - start_time
+
+        sent = [result for result in results if result.ok]
+        barrier = wait_for_observations(trustyai_client=trustyai_client,
+                                        model_id=model_id,
+                                        expected_observations=start_obs + sum(result.rows for result in sent),
+                                        start_time=start_time)
+
+    benchmark_report.record_latencies(benchmark=benchmark, latencies=[result.latency for result in sent])
+    benchmark_report.record(benchmark=benchmark, metric="requests_per_s", value=len(sent) / send_seconds,
+                            unit="requests/s", higher_is_better=True)
+    benchmark_report.record(benchmark=benchmark, metric="rows_per_s_ingested",
+                            value=(barrier.observations - start_obs) / barrier.lag, unit="rows/s",
+                            higher_is_better=True)
+    benchmark_report.record(benchmark=benchmark, metric="bytes_sent", value=sum(result.bytes_sent for result in sent),
+                            unit="bytes")
+    benchmark_report.record(benchmark=benchmark, metric="ingestion_lag", value=barrier.lag - send_seconds,
+                            unit="s")
+    benchmark_report.record(benchmark=benchmark, metric="errors", value=len(results) - len(sent),
+                            unit="requests")
+    benchmark_report.record(benchmark=benchmark, metric="json_fallbacks",
+                            value=sum(result.fell_back_to_json for result in results), unit="requests")
+    return results, barrier
+
+
+def repeat_payloads(payloads, repeats):
+    # Unique names per repeat, so results and checkpoint journals tell the copies apart
+    for repeat in range(repeats):
+        for payload in payloads:
+            yield replace(payload, name=f"{repeat}/{payload.name}")
+
+
+def run_load(trustyai_client, inference_service, payloads, concurrency, benchmark_report, benchmark,
+             resource_sampler=None):
+    # run_ingestion_load for benchmarks, which fail when a request fails or TrustyAI doesn't ingest everything
+    results, barrier = run_ingestion_load(trustyai_client=trustyai_client,
+                                          model_id=inference_service.name,
+                                          payloads=payloads,
+                                          concurrency=concurrency,
+                                          benchmark_report=benchmark_report,
+                                          benchmark=benchmark,
+                                          resource_sampler=resource_sampler)
+
+    failed = [result for result in results if not result.ok]
+    assert not failed, f"{len(failed)} requests failed"
+    assert barrier.reached, f"Only {barrier.observations}/{barrier.expected_observations} observations ingested"
+
+
+@dataclass
+class ModelLoad:
+    model_id: str
+    results: list
+    send_seconds: float
+    start_observations: int
+    barrier: object
+
+    @property
+    def rows_per_s_ingested(self):
+        return (self.barrier.observations - self.start_observations) / self.barrier.lag
+
+
+def _load_model(trustyai_client, model_id, payloads, concurrency, start_time):
+    engine = IngestionEngine(trustyai_client=trustyai_client, inference_service_name=model_id,
+                             max_concurrency=concurrency)
+    start_obs = trustyai_client.get_datapoint_counter(model_id=model_id, max_age=0)
+    results = engine.send(payloads=payloads)
+    send_seconds = monotonic() - start_time
+    barrier = wait_for_observations(trustyai_client=trustyai_client,
+                                    model_id=model_id,
+                                    expected_observations=start_obs + sum(result.rows for result in results
+                                                                          if result.ok),
+                                    start_time=start_time)
+    return ModelLoad(model_id=model_id, results=results, send_seconds=send_seconds, start_observations=start_obs,
+                     barrier=barrier)
+
+
+def run_multi_model_load(trustyai_client, model_ids, payloads, concurrency, benchmark_report, benchmark,
+                         resource_sampler=None):
+    """
+    Sends the same payloads to every model at once, each with its own `concurrency`, and records the
+    ingestion rate of every model next to the aggregate.
+    """
+    payloads = list(payloads)
+    with resource_sampler.phase(name=benchmark) if resource_sampler is not None else nullcontext(), \
+            ThreadPoolExecutor(max_workers=len(model_ids)) as executor:
+        start_time = monotonic()
+        loads = list(executor.map(in_context(lambda model_id: _load_model(trustyai_client=trustyai_client,
+                                                                          model_id=model_id, payloads=payloads,
+                                                                          concurrency=concurrency,
+                                                                          start_time=start_time)),
+                                  model_ids))
+        send_seconds = monotonic() - start_time
+
+    results = [result for load in loads for result in load.results]
+    sent = [result for result in results if result.ok]
+    rates = [load.rows_per_s_ingested for load in loads]
+    for load, rate in zip(loads, rates):
+        benchmark_report.record(benchmark=benchmark, metric=f"{load.model_id}_rows_per_s_ingested", value=rate,
+                                unit="rows/s", higher_is_better=True)
+    benchmark_report.record_latencies(benchmark=benchmark, latencies=[result.latency for result in sent])
+    benchmark_report.record(benchmark=benchmark, metric="requests_per_s", value=len(sent) / send_seconds,
+                            unit="requests/s", higher_is_better=True)
+    benchmark_report.record(benchmark=benchmark, metric="rows_per_s_ingested",
+                            value=sum(load.barrier.observations - load.start_observations for load in loads)
+                            / max(load.barrier.lag for load in loads),
+                            unit="rows/s", higher_is_better=True)
+    benchmark_report.record(benchmark=benchmark, metric="model_rows_per_s_ingested_min", value=min(rates),
+                            unit="rows/s", higher_is_better=True)
+    benchmark_report.record(benchmark=benchmark, metric="model_rows_per_s_ingested_mean",
+                            value=sum(rates) / len(rates), unit="rows/s", higher_is_better=True)
+    benchmark_report.record(benchmark=benchmark, metric="errors", value=len(results) - len(sent), unit="requests")
+    return loads
@@ -0,0 +1,205 @@
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+RECORD_MODE = "record"
+REPLAY_MODE = "replay"
+CASSETTE_VERSION = 1
+# Request headers that take part in the fingerprint, everything else (auth, user agent, ...) varies between runs
+FINGERPRINT_HEADERS = ("Content-Type", "Inference-Header-Content-Length")
+
+_active_cassette = None
+
+
+class CassetteMissError(Exception):
+    pass
+
+
+def request_body_bytes(body):
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode()
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return bytes(body)
+    # Iterable bodies (BufferBody) give a fresh pass over their chunks every time
+    return b"".join(bytes(chunk) for chunk in body)
+
+
+def request_fingerprint(method, url, headers, body):
+    digest = hashlib.sha256()
+    digest.update(f"{method} {url}\n".encode())
+    for header in FINGERPRINT_HEADERS:
+        digest.update(f"{header}: {headers.get(header, '')}\n".encode())
+    try:
+        # Key order of JSON bodies is not significant
+        digest.update(json.dumps(json.loads(body), sort_keys=True).encode())
+    except (ValueError, UnicodeDecodeError):
+        digest.update(body)
+    return digest.hexdigest()[:32]
+
+
+class Cassette:
+    """
+    On-disk record of the HTTP interactions and cluster lookups of a test run.
+
+    In record mode, responses are stored per request fingerprint (method, URL, relevant headers and body)
+    in the order they were received, together with named values such as routes and fixture leases. In
+    replay mode the same sequence is served back without a cluster, repeating the last response of a
+    fingerprint once its sequence is used up (e.g. extra polls), and anything never recorded raises
+    `CassetteMissError`.
+    """
+
+    def __init__(self, path, mode):
+        if mode not in (RECORD_MODE, REPLAY_MODE):
+            raise ValueError(f"Unknown cassette mode {mode}")
+        self.path = path
+        self.mode = mode
+        self.interactions = {}
+        self.values = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+
+        if mode == REPLAY_MODE:
+            with gzip.open(path, "rt") as file:
+                data = json.load(file)
+            if data.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Cassette {path} has version {data.get('version')}, expected {CASSETTE_VERSION}")
+            self.interactions = data["interactions"]
+            self.values = data["values"]
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY_MODE
+
+    def save(self):
+        if self.mode != RECORD_MODE:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, gzip.open(self.path, "wt") as file:
+            json.dump({"version": CASSETTE_VERSION, "interactions": self.interactions, "values": self.values}, file)
+        logger.info(f"Recorded {sum(len(responses) for responses in self.interactions.values())} HTTP responses "
+                    f"and {len(self.values)} values to {self.path}")
+
+    def value(self, key, compute):
+        """
+        Returns `compute()` and records it under `key`, or the recorded value when replaying.
+        """
+        if self.replaying:
+            if key not in self.values:
+                raise CassetteMissError(f"No value recorded for {key} in {self.path}")
+            return self.values[key]
+
+        value = compute()
+        with self._lock:
+            self.values[key] = value
+        return value
+
+    def record_response(self, fingerprint, response):
+        with self._lock:
+            self.interactions.setdefault(fingerprint, []).append({
+                "status_code": response.status_code,
+                "reason": response.reason,
+                "headers": dict(response.headers),
+                "body": base64.b64encode(response.content).decode(),
+            })
+
+    def replay_response(self, fingerprint, request):
+        with self._lock:
+            responses = self.interactions.get(fingerprint)
+            if not responses:
+                raise CassetteMissError(f"No response recorded for {request.method} {request.url} "
+                                        f"(fingerprint {fingerprint}) in {self.path}")
+            position = self._positions.get(fingerprint, 0)
+            self._positions[fingerprint] = position + 1
+            recorded = responses[min(position, len(responses) - 1)]
+
+        response = Response()
+        response.status_code = recorded["status_code"]
+        response.reason = recorded["reason"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response._content = base64.b64decode(recorded["body"])
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(0)
+        return response
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    Transport adapter that records the responses of `adapter` into a cassette, or replays them without sending.
+    """
+
+    def __init__(self, cassette, adapter):
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        fingerprint = request_fingerprint(method=request.method, url=request.url, headers=request.headers,
+                                          body=request_body_bytes(body=request.body))
+        if self.cassette.replaying:
+            return self.cassette.replay_response(fingerprint=fingerprint, request=request)
+
+        response = self.adapter.send(request, **kwargs)
+        self.cassette.record_response(fingerprint=fingerprint, response=response)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+def get_active_cassette():
+    return _active_cassette
+
+
+def set_active_cassette(cassette):
+    global _active_cassette
+    _active_cassette = cassette
+
+
+class RecordedResource:
+    # Stand-in for a cluster resource during replay, with the simple attributes it had when recorded
+    def __init__(self, kind, name, namespace=None, attributes=None):
+        self.kind = kind
+        self.name = name
+        self.namespace = namespace
+        for key, value in (attributes or {}).items():
+            setattr(self, key, value)
+
+
+class RecordedLease:
+    def __init__(self, namespace, resources):
+        self.namespace = namespace
+        self.resources = resources
+
+
+def describe_resource(resource):
+    attributes = {key: value for key, value in vars(resource).items()
+                  if not key.startswith("_") and key not in ("kind", "name", "namespace")
+                  and isinstance(value, (str, int, float, bool))}
+    return {"kind": resource.kind, "name": resource.name, "namespace": getattr(resource, "namespace", None),
+            "attributes": attributes}
+
+
+def describe_lease(lease):
+    return {"namespace": describe_resource(resource=lease.namespace),
+            "resources": {name: describe_resource(resource=resource) for name, resource in lease.resources.items()}}
+
+
+def recorded_lease(description):
+    return RecordedLease(namespace=RecordedResource(**description["namespace"]),
+                         resources={name: RecordedResource(**resource)
+                                    for name, resource in description["resources"].items()})
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from utils.tensor_encoding import FP64_LITTLE_ENDIAN
+
+logger = logging.getLogger(__name__)
+
+START_EVENT = "start"
+SENT_EVENT = "sent"
+CONFIRMED_EVENT = "confirmed"
+
+
+def payload_rows(payload):
+    if payload.array is not None:
+        return payload.array
+    body = payload.data if isinstance(payload.data, (bytes, bytearray, memoryview)) else b"".join(payload.data)
+    try:
+        tensor = json.loads(body)["inputs"][0]
+        return np.asarray(tensor["data"], dtype=FP64_LITTLE_ENDIAN).reshape(tensor["shape"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def payload_sha256(payload):
+    # Hash of the rows as little-endian float64, so the same batch matches whatever encoding it was sent with
+    digest = hashlib.sha256()
+    rows = payload_rows(payload=payload)
+    if rows is not None:
+        digest.update(json.dumps(list(rows.shape)).encode())
+        digest.update(memoryview(np.ascontiguousarray(rows, dtype=FP64_LITTLE_ENDIAN)).cast("B"))
+    elif isinstance(payload.data, (bytes, bytearray, memoryview)):
+        digest.update(payload.data)
+    else:
+        for chunk in payload.data:
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CheckpointJournal:
+    """
+    Append-only journal of the payloads of an upload that TrustyAI has ingested, to resume it after a failure.
+
+    Every payload the model accepted is appended as `sent` (name, content hash, rows) as soon as its
+    response arrives, and `confirm` marks everything sent so far once TrustyAI's observation counter
+    has caught up. When resuming, sent but unconfirmed payloads are reconciled against the counter:
+    they are accepted in the order they were sent for as long as their rows fit in the observations
+    added since the last confirmation, the rest are sent again. Payloads are only skipped when both
+    name and hash match, so a file that changed since is re-sent. The hash covers the decoded rows,
+    so switching encodings keeps the journal valid, but payload names and boundaries depend on
+    `rows_per_request`, so resuming with a different value is refused.
+
+    Skipped payloads don't reach the ingestion engine, so neither does their `on_result` callback.
+    """
+
+    def __init__(self, path, model_id, resume=True):
+        self.path = path
+        self.model_id = model_id
+        self.resume = resume
+        self.confirmed = {}
+        self.sent = {}
+        self.observations = None
+        self.rows_per_request = None
+        # Hashes computed by `pending`, reused when the payload's result is recorded
+        self._hashes = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        events = []
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # A write cut short by the failure we are resuming from
+                    logger.warning(f"Ignoring truncated line in checkpoint journal {self.path}")
+        return events
+
+    def _replay_events(self, events):
+        for event in events:
+            if event["event"] == START_EVENT:
+                if event["model_id"] != self.model_id:
+                    raise ValueError(f"Checkpoint journal {self.path} belongs to model {event['model_id']}, "
+                                     f"not {self.model_id}")
+                if event.get("rows_per_request") != self.rows_per_request:
+                    raise ValueError(f"Checkpoint journal {self.path} was written with rows per request "
+                                     f"{event.get('rows_per_request')}, not {self.rows_per_request}")
+            elif event["event"] == SENT_EVENT:
+                self.sent[(event["name"], event["sha256"])] = event["rows"]
+            elif event["event"] == CONFIRMED_EVENT:
+                self.confirmed.update(self.sent)
+                self.sent = {}
+                self.observations = event["observations"]
+
+    def open(self, observations, rows_per_request=None):
+        """
+        Loads the journal (when resuming) against TrustyAI's current observation count and starts appending.
+        """
+        self.confirmed, self.sent, self.observations = {}, {}, None
+        self.rows_per_request = rows_per_request
+        if self.resume and os.path.exists(self.path):
+            self._replay_events(events=self._read())
+
+        if self.observations is not None and observations < self.observations:
+            logger.warning(f"Model {self.model_id} has {observations} observations, fewer than the "
+                           f"{self.observations} in checkpoint journal {self.path}, starting over")
+            self.confirmed, self.sent = {}, {}
+        elif self.observations is not None:
+            ingested_rows = observations - self.observations
+            reconciled = 0
+            for key, rows in self.sent.items():
+                if rows > ingested_rows:
+                    break
+                self.confirmed[key] = rows
+                ingested_rows -= rows
+                reconciled += 1
+            logger.info(f"Resuming upload to {self.model_id} from {self.path}: {len(self.confirmed)} payloads "
+                        f"({self.confirmed_rows} rows) already ingested, "
+                        f"{len(self.sent) - reconciled} unconfirmed payloads to re-send")
+        self.sent = {}
+        self.observations = observations
+
+        # Rewritten in compacted form, so the journal never grows past one line per payload. The old journal
+        # is only replaced once the new one is on disk, a crash in between leaves one of the two intact.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        events = [{"event": START_EVENT, "model_id": self.model_id, "rows_per_request": rows_per_request}]
+        events.extend({"event": SENT_EVENT, "name": name, "sha256": sha256, "rows": rows}
+                      for (name, sha256), rows in self.confirmed.items())
+        events.append({"event": CONFIRMED_EVENT, "observations": observations})
+        with tempfile.NamedTemporaryFile("w", dir=directory, prefix=f"{os.path.basename(self.path)}.",
+                                         delete=False) as file:
+            try:
+                file.writelines(json.dumps(event) + "\n" for event in events)
+                file.flush()
+                os.fsync(file.fileno())
+            except BaseException:
+                os.unlink(file.name)
+                raise
+        os.replace(file.name, self.path)
+        self._file = open(self.path, "a")
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _append(self, event):
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+
+    def pending(self, payloads):
+        # Payloads not yet ingested, in their original order
+        for payload in payloads:
+            sha256 = payload_sha256(payload=payload)
+            if (payload.name, sha256) in self.confirmed:
+                logger.debug(f"Skipping {payload.name}, already ingested")
+                continue
+            with self._lock:
+                self._hashes[payload.name] = sha256
+            yield payload
+
+    def record(self, payload, result):
+        # Ingestion engine `on_result` callback
+        with self._lock:
+            sha256 = self._hashes.pop(payload.name, None)
+        if not result.ok:
+            return
+        event = {"event": SENT_EVENT, "name": payload.name, "sha256": sha256 or payload_sha256(payload=payload),
+                 "rows": result.rows}
+        with self._lock:
+            self.sent[(event["name"], event["sha256"])] = event["rows"]
+            self._append(event=event)
+
+    def confirm(self, observations):
+        with self._lock:
+            self.confirmed.update(self.sent)
+            self.sent = {}
+            self.observations = observations
+            self._append(event={"event": CONFIRMED_EVENT, "observations": observations})
+
+    @property
+    def confirmed_rows(self):
+        return sum(self.confirmed.values())
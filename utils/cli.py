@@ -0,0 +1,248 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Only the standard library is imported up front. requests, numpy and kubernetes are imported by the
+# subcommand that needs them, so --help and argument errors return immediately.
+DESCRIPTION = "Send data, request metrics and run open-loop load against an already deployed TrustyAI service"
+
+TOKEN_ENV_VAR = "TRUSTYAI_TOKEN"
+# Placeholder for the model name in --inference-url
+MODEL_PLACEHOLDER = "{model}"
+# Same values as in utils.tensor_encoding and utils.open_loop, which are not imported at startup
+ENCODINGS = ("json", "binary")
+ARRIVALS = ("constant", "poisson")
+RATE_UNITS = ("requests", "rows")
+PROFILES = ("constant", "ramp", "steps", "spike")
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+
+def trustyai_client_from_args(args):
+    from utils.trustyai_client import TrustyAIClient
+    from utils.token_provider import StaticTokenProvider
+
+    if args.trustyai_url:
+        token = args.token or os.environ.get(TOKEN_ENV_VAR)
+        if not token:
+            raise SystemExit(f"--token or ${TOKEN_ENV_VAR} is required with --trustyai-url")
+        inference_url = args.inference_url
+
+        def resolve_inference_url(name):
+            if inference_url is None:
+                raise ValueError("--inference-url is required to send inference requests with --trustyai-url")
+            return inference_url.replace(MODEL_PLACEHOLDER, name)
+
+        return TrustyAIClient(trustyai_url=args.trustyai_url.rstrip("/"),
+                              token_provider=StaticTokenProvider(token=token),
+                              inference_url_resolver=resolve_inference_url,
+                              verify=args.verify)
+
+    # Routes and token come from the current kubeconfig context, nothing is provisioned
+    import kubernetes
+    from kubernetes.dynamic import DynamicClient
+    from ocp_resources.namespace import Namespace
+
+    client = DynamicClient(client=kubernetes.config.new_client_from_config())
+    token_provider = StaticTokenProvider(token=args.token) if args.token else None
+    return TrustyAIClient.from_routes(client=client, namespace=Namespace(client=client, name=args.namespace),
+                                      token_provider=token_provider, verify=args.verify)
+
+
+def send(args):
+    from utils.checkpoint import CheckpointJournal
+    from utils.upload import send_data
+
+    checkpoint = None
+    if args.checkpoint:
+        checkpoint = CheckpointJournal(path=args.checkpoint, model_id=args.model, resume=not args.restart)
+    with trustyai_client_from_args(args=args) as trustyai_client:
+        results, errors = send_data(trustyai_client=trustyai_client,
+                                    model_id=args.model,
+                                    data_path=args.data_path,
+                                    max_concurrency=args.concurrency,
+                                    barrier_timeout=args.barrier_timeout,
+                                    encoding=args.encoding,
+                                    rows_per_request=args.rows_per_request,
+                                    checkpoint=checkpoint)
+        observations = trustyai_client.get_datapoint_counter(model_id=args.model, max_age=0)
+
+    sent = [result for result in results if result.ok]
+    output = {
+        "model": args.model,
+        "requests": len(results),
+        "rows_sent": sum(result.rows for result in sent),
+        "bytes_sent": sum(result.bytes_sent for result in sent),
+        "observations": observations,
+        "errors": errors or [],
+    }
+    return output, not errors
+
+
+def metrics(args):
+    from utils.metric_sweep import METRIC_ENDPOINTS
+
+    with trustyai_client_from_args(args=args) as trustyai_client:
+        batch_size = args.batch_size or trustyai_client.get_datapoint_counter(model_id=args.model, max_age=0)
+        response = trustyai_client.get_fairness_metrics(model_id=args.model,
+                                                        protected_attribute=args.protected_attribute,
+                                                        privileged_attribute=args.privileged_attribute,
+                                                        unprivileged_attribute=args.unprivileged_attribute,
+                                                        outcome_name=args.outcome_name,
+                                                        favorable_outcome=args.favorable_outcome,
+                                                        batch_size=batch_size,
+                                                        endpoint=METRIC_ENDPOINTS[args.metric.upper()])
+    output = {"model": args.model, "metric": args.metric, "batch_size": batch_size,
+              "status_code": response.status_code}
+    if response.ok:
+        output["value"] = response.json()["value"]
+    else:
+        output["error"] = response.text[:200]
+    return output, response.ok
+
+
+def profile_from_args(args):
+    from utils.open_loop import constant_profile, ramp_profile, step_profile, spike_profile
+
+    if args.profile == "ramp":
+        return ramp_profile(start_rate=args.rate, end_rate=args.end_rate, duration=args.duration)
+    if args.profile == "steps":
+        rates = [float(rate) for rate in args.rates.split(",")]
+        return step_profile(rates=rates, step_duration=args.duration / len(rates))
+    if args.profile == "spike":
+        return spike_profile(base_rate=args.rate, spike_rate=args.spike_rate, duration=args.duration,
+                             spike_start=args.spike_start, spike_duration=args.spike_duration)
+    return constant_profile(rate=args.rate, duration=args.duration)
+
+
+def bench(args):
+    from utils.benchmark import BenchmarkReport
+    from utils.ingestion import load_payload_files
+    from utils.open_loop import OpenLoopScheduler
+    from utils.tensor_encoding import load_encoded_payload_files, JSON_ENCODING
+
+    if args.encoding == JSON_ENCODING:
+        payloads = list(load_payload_files(data_path=args.data_path))
+    else:
+        payloads = list(load_encoded_payload_files(data_path=args.data_path, encoding=args.encoding))
+
+    profile = profile_from_args(args=args)
+    with trustyai_client_from_args(args=args) as trustyai_client:
+        scheduler = OpenLoopScheduler(trustyai_client=trustyai_client,
+                                      inference_service_name=args.model,
+                                      profile=profile,
+                                      arrivals=args.arrivals,
+                                      rate_unit=args.rate_unit,
+                                      max_concurrency=args.concurrency,
+                                      seed=args.seed)
+        run = scheduler.run(payloads=payloads)
+
+    benchmark_report = BenchmarkReport()
+    run.record(benchmark_report=benchmark_report, benchmark=profile.name)
+    if args.report:
+        benchmark_report.write(path=args.report)
+    output = {name: metric["value"] for name, metric in benchmark_report.results[profile.name].items()}
+    # Missed schedule slots are a result, not a failure: they show where the model saturates
+    return {"model": args.model, "profile": profile.name, "arrivals": args.arrivals, **output}, \
+        all(result.ok for result in run.results)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="trustyai-load", description=DESCRIPTION)
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress to stderr")
+
+    target = argparse.ArgumentParser(add_help=False)
+    group = target.add_argument_group("target")
+    endpoints = group.add_mutually_exclusive_group(required=True)
+    endpoints.add_argument("-n", "--namespace", help="Namespace with a deployed TrustyAI service, found through "
+                                                     "the routes of the current kubeconfig context")
+    endpoints.add_argument("--trustyai-url", help="TrustyAI service URL, instead of looking up routes")
+    group.add_argument("--inference-url",
+                       help=f"Inference URL used with --trustyai-url, {MODEL_PLACEHOLDER} is replaced by the model "
+                            f"name, e.g. https://host/v2/models/{MODEL_PLACEHOLDER}/infer")
+    group.add_argument("--token", help=f"Bearer token, defaults to ${TOKEN_ENV_VAR} or the kubeconfig token")
+    group.add_argument("--verify", action="store_true", help="Verify TLS certificates")
+    group.add_argument("-m", "--model", required=True, help="InferenceService / TrustyAI model id")
+
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    send_parser = subparsers.add_parser("send", parents=[target], help="Send payload files and wait for TrustyAI")
+    send_parser.add_argument("data_path", help="Directory of KServe v2 JSON payload files")
+    send_parser.add_argument("-c", "--concurrency", type=int, default=4)
+    send_parser.add_argument("--encoding", choices=ENCODINGS, default="json")
+    send_parser.add_argument("--rows-per-request", type=positive_int, default=None,
+                             help="Rebatch the payload files into requests of this many rows")
+    send_parser.add_argument("--barrier-timeout", type=float, default=120,
+                             help="Seconds to wait for TrustyAI to count the observations")
+    send_parser.add_argument("--checkpoint", default=None,
+                             help="Journal of ingested payloads, payloads already in it are skipped")
+    send_parser.add_argument("--restart", action="store_true", help="Start the --checkpoint journal over")
+    send_parser.set_defaults(handler=send)
+
+    metrics_parser = subparsers.add_parser("metrics", parents=[target], help="Request a fairness metric")
+    metrics_parser.add_argument("--metric", choices=("spd", "dir"), default="spd")
+    metrics_parser.add_argument("--protected-attribute", required=True)
+    metrics_parser.add_argument("--privileged-attribute", type=float, default=1.0)
+    metrics_parser.add_argument("--unprivileged-attribute", type=float, default=0.0)
+    metrics_parser.add_argument("--outcome-name", required=True)
+    metrics_parser.add_argument("--favorable-outcome", type=float, default=0)
+    metrics_parser.add_argument("--batch-size", type=int, default=None,
+                                help="Defaults to the model's current observation count")
+    metrics_parser.set_defaults(handler=metrics)
+
+    bench_parser = subparsers.add_parser("bench", parents=[target],
+                                         help="Drive /infer at a target rate (open loop) and report latency")
+    bench_parser.add_argument("data_path", help="Directory of KServe v2 JSON payload files, sent in a cycle")
+    bench_parser.add_argument("--profile", choices=PROFILES, default="constant")
+    bench_parser.add_argument("--rate", type=float, default=10, help="Target rate, the start rate of a ramp and the "
+                                                                      "base rate of a spike")
+    bench_parser.add_argument("--end-rate", type=float, default=None, help="Final rate of a ramp")
+    bench_parser.add_argument("--rates", default=None, help="Comma separated rates of a steps profile")
+    bench_parser.add_argument("--spike-rate", type=float, default=None)
+    bench_parser.add_argument("--spike-start", type=float, default=None)
+    bench_parser.add_argument("--spike-duration", type=float, default=None)
+    bench_parser.add_argument("--duration", type=float, default=60, help="Seconds, split evenly between steps")
+    bench_parser.add_argument("--rate-unit", choices=RATE_UNITS, default="requests")
+    bench_parser.add_argument("--arrivals", choices=ARRIVALS, default="constant")
+    bench_parser.add_argument("-c", "--concurrency", type=int, default=10)
+    bench_parser.add_argument("--encoding", choices=ENCODINGS, default="json")
+    bench_parser.add_argument("--seed", type=int, default=None)
+    bench_parser.add_argument("--report", default=None, help="Also write a benchmark report JSON to this path")
+    bench_parser.set_defaults(handler=bench)
+    return parser
+
+
+def validate_args(parser, args):
+    if args.command != "bench":
+        return
+    required = {"ramp": ("end_rate",), "steps": ("rates",), "spike": ("spike_rate", "spike_start", "spike_duration")}
+    missing = [name for name in required.get(args.profile, ()) if getattr(args, name) is None]
+    if missing:
+        parser.error(f"--profile {args.profile} requires "
+                     f"{', '.join('--' + name.replace('_', '-') for name in missing)}")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    validate_args(parser=parser, args=args)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    output, ok = args.handler(args)
+    json.dump(output, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
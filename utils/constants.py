@@ -14,14 +14,47 @@ TRUSTYAI_API_GROUP = "trustyai.opendatahub.io"
 # TrustyAI
 TRUSTYAI_SERVICE = "trustyai-service"
 MM_PAYLOAD_PROCESSORS = "MM_PAYLOAD_PROCESSORS"
+TRUSTYAI_STORAGE_FOLDER = "/inputs"
+TRUSTYAI_PVC_STORAGE = "PVC"
+TRUSTYAI_DATABASE_STORAGE = "DATABASE"
+TRUSTYAI_CSV_DATA_FORMAT = "CSV"
+TRUSTYAI_DATABASE_SECRET = "db-credentials"
 
 # TrustyAI Endpoints
 TRUSTYAI_SPD_ENDPOINT = "/metrics/group/fairness/spd/"
+TRUSTYAI_DIR_ENDPOINT = "/metrics/group/fairness/dir/"
 TRUSTYAI_NAMES_ENDPOINT = "/info/names"
 TRUSTYAI_MODEL_METADATA_ENDPOINT = "/info"
+TRUSTYAI_SINGLE_MODEL_METADATA_ENDPOINT = "/info/{model_id}"
 
 # InferenceService
+INFERENCE_SERVICE_API_VERSION = f"{KSERVE_API_GROUP}/v1beta1"
 INFERENCE_ENDPOINT = "/infer"
+MODELMESH_SERVING = "modelmesh-serving"
+
+# Loan model
+LOAN_MODEL_INPUT_MAPPINGS = {
+    "customer_data_input-0": "Number of Children",
+    "customer_data_input-1": "Total Income",
+    "customer_data_input-2": "Number of Total Family Members",
+    "customer_data_input-3": "Is Male-Identifying?",
+    "customer_data_input-4": "Owns Car?",
+    "customer_data_input-5": "Owns Realty?",
+    "customer_data_input-6": "Is Partnered?",
+    "customer_data_input-7": "Is Employed?",
+    "customer_data_input-8": "Live with Parents?",
+    "customer_data_input-9": "Age",
+    "customer_data_input-10": "Length of Employment?"
+}
+LOAN_MODEL_OUTPUT_MAPPINGS = {"predict": "Will Default?"}
 
 # Minio
 MINIO_IMAGE = "quay.io/trustyai/modelmesh-minio-examples:gauss"
+
+# MariaDB, storage backend for TrustyAI database mode
+MARIADB = "mariadb"
+MARIADB_IMAGE = "quay.io/sclorg/mariadb-105-c9s:latest"
+MARIADB_PORT = 3306
+MARIADB_DATABASE = "trustyai_database"
+MARIADB_USER = "trustyai"
+MARIADB_PASSWORD = "trustyai"
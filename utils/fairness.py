@@ -0,0 +1,171 @@
+import json
+import logging
+import math
+import threading
+
+import numpy as np
+
+from utils.tensor_encoding import BinaryBody, decode_binary_payload, FP64_LITTLE_ENDIAN
+
+logger = logging.getLogger(__name__)
+
+SPD = "SPD"
+DIR = "DIR"
+# Absolute tolerance when comparing local metrics with the ones computed by TrustyAI
+DEFAULT_METRIC_TOLERANCE = 1e-6
+INITIAL_CAPACITY = 1024
+
+# Columns of the running counts
+PRIVILEGED_TOTAL, PRIVILEGED_FAVORABLE, UNPRIVILEGED_TOTAL, UNPRIVILEGED_FAVORABLE = range(4)
+
+
+class FairnessMismatchError(AssertionError):
+    pass
+
+
+def group_counts(protected, outcomes, privileged, unprivileged, favorable):
+    protected = np.asarray(protected)
+    favorable_outcomes = np.asarray(outcomes) == favorable
+    privileged_rows = protected == privileged
+    unprivileged_rows = protected == unprivileged
+    return np.stack([privileged_rows,
+                     privileged_rows & favorable_outcomes,
+                     unprivileged_rows,
+                     unprivileged_rows & favorable_outcomes], axis=1).astype(np.int64)
+
+
+def statistical_parity_difference(counts):
+    # Same convention as TrustyAI: 0 when either group is empty
+    if not counts[PRIVILEGED_TOTAL] or not counts[UNPRIVILEGED_TOTAL]:
+        return 0.0
+    return (counts[UNPRIVILEGED_FAVORABLE] / counts[UNPRIVILEGED_TOTAL]
+            - counts[PRIVILEGED_FAVORABLE] / counts[PRIVILEGED_TOTAL])
+
+
+def disparate_impact_ratio(counts):
+    if not counts[PRIVILEGED_TOTAL] or not counts[UNPRIVILEGED_TOTAL] or not counts[PRIVILEGED_FAVORABLE]:
+        return math.nan
+    return ((counts[UNPRIVILEGED_FAVORABLE] / counts[UNPRIVILEGED_TOTAL])
+            / (counts[PRIVILEGED_FAVORABLE] / counts[PRIVILEGED_TOTAL]))
+
+
+METRICS = {
+    SPD: statistical_parity_difference,
+    DIR: disparate_impact_ratio,
+}
+
+
+def resolve_column(name, mappings):
+    # Mapped names ("Is Male-Identifying?") back to the model's own names ("customer_data_input-3")
+    original_names = {mapped: original for original, mapped in (mappings or {}).items()}
+    return original_names.get(name, name)
+
+
+def payload_array(payload):
+    if payload.array is not None:
+        return np.asarray(payload.array)
+    if isinstance(payload.data, BinaryBody):
+        rows, _ = decode_binary_payload(body=payload.data.tobytes(), header_length=payload.data.header.nbytes)
+        return rows
+    data = payload.data.tobytes() if hasattr(payload.data, "tobytes") else payload.data
+    tensor = json.loads(data)["inputs"][0]
+    return np.asarray(tensor["data"], dtype=FP64_LITTLE_ENDIAN).reshape(tensor["shape"])
+
+
+class FairnessAccumulator:
+    """
+    Local, vectorized SPD and DIR over the data sent to a model, for cross-checking TrustyAI.
+
+    Attributes and outcomes are given by their mapped names, as in TrustyAI metric requests, and are
+    resolved through the same name mappings sent with `apply_trustyai_name_mappings`.
+
+    Rows are folded in as they are sent (pass `observe` as the ingestion engine's `on_result`). Prefix
+    sums of the four group counts are kept per row, so the metric over the last `batch_size` rows is
+    two lookups, however many rows have been sent. Requests sent concurrently can reach TrustyAI in a
+    different order than they complete here, so windows smaller than the whole dataset only match
+    TrustyAI exactly for sequential sending.
+    """
+
+    def __init__(self,
+                 protected_attribute,
+                 privileged_attribute,
+                 unprivileged_attribute,
+                 outcome_name,
+                 favorable_outcome,
+                 input_mappings=None,
+                 output_mappings=None):
+        self.protected_attribute = protected_attribute
+        self.privileged_attribute = privileged_attribute
+        self.unprivileged_attribute = unprivileged_attribute
+        self.outcome_name = outcome_name
+        self.favorable_outcome = favorable_outcome
+
+        protected_column = resolve_column(name=protected_attribute, mappings=input_mappings)
+        self.protected_index = int(protected_column.rsplit("-", 1)[1])
+        self.output_name = resolve_column(name=outcome_name, mappings=output_mappings)
+
+        self._cumulative = np.zeros((INITIAL_CAPACITY + 1, 4), dtype=np.int64)
+        self._observations = 0
+        self._lock = threading.Lock()
+
+    @property
+    def observations(self):
+        return self._observations
+
+    def update(self, rows, outcomes):
+        rows = np.asarray(rows)
+        counts = group_counts(protected=rows[:, self.protected_index],
+                              outcomes=np.asarray(outcomes).reshape(len(rows), -1)[:, 0],
+                              privileged=self.privileged_attribute,
+                              unprivileged=self.unprivileged_attribute,
+                              favorable=self.favorable_outcome)
+
+        with self._lock:
+            start = self._observations
+            end = start + len(counts)
+            if end + 1 > len(self._cumulative):
+                grown = np.zeros((max(end + 1, 2 * len(self._cumulative)), 4), dtype=np.int64)
+                grown[:start + 1] = self._cumulative[:start + 1]
+                self._cumulative = grown
+            np.cumsum(counts, axis=0, out=self._cumulative[start + 1:end + 1])
+            self._cumulative[start + 1:end + 1] += self._cumulative[start]
+            self._observations = end
+
+    def update_from_response(self, rows, response):
+        outputs = next(output for output in response.json()["outputs"] if output["name"] == self.output_name)
+        self.update(rows=rows, outcomes=outputs["data"])
+
+    def observe(self, payload, result):
+        if result.ok:
+            self.update_from_response(rows=payload_array(payload=payload), response=result.response)
+
+    def counts(self, batch_size=None):
+        with self._lock:
+            end = self._observations
+            start = max(end - batch_size, 0) if batch_size else 0
+            return self._cumulative[end] - self._cumulative[start]
+
+    def metric(self, metric=SPD, batch_size=None):
+        return METRICS[metric](counts=self.counts(batch_size=batch_size))
+
+    def spd(self, batch_size=None):
+        return self.metric(metric=SPD, batch_size=batch_size)
+
+    def dir(self, batch_size=None):
+        return self.metric(metric=DIR, batch_size=batch_size)
+
+    def check(self, response, metric=SPD, batch_size=None, tolerance=DEFAULT_METRIC_TOLERANCE):
+        """
+        Compares a TrustyAI metric response with the local value over the same window.
+        """
+        server_value = response.json()["value"]
+        local_value = self.metric(metric=metric, batch_size=batch_size)
+        server_undefined = server_value is None or math.isnan(server_value)
+        if server_undefined or math.isnan(local_value):
+            matches = server_undefined and math.isnan(local_value)
+        else:
+            matches = math.isclose(server_value, local_value, rel_tol=0, abs_tol=tolerance)
+        if not matches:
+            raise FairnessMismatchError(f"{metric} from TrustyAI is {server_value}, expected {local_value} "
+                                        f"over the last {batch_size or self.observations} observations")
+        return local_value
@@ -0,0 +1,334 @@
+import http
+import json
+import logging
+import random
+import re
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from time import monotonic, sleep
+
+from utils.constants import TRUSTYAI_SPD_ENDPOINT, TRUSTYAI_DIR_ENDPOINT, TRUSTYAI_NAMES_ENDPOINT, \
+    TRUSTYAI_MODEL_METADATA_ENDPOINT, INFERENCE_ENDPOINT
+from utils.fairness import group_counts, METRICS, SPD, DIR
+from utils.tensor_encoding import decode_binary_payload, INFERENCE_HEADER_CONTENT_LENGTH
+from utils.token_provider import StaticTokenProvider
+from utils.trustyai_client import TrustyAIClient
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_PATH_PATTERN = re.compile(rf"^/v2/models/(?P<model>[^/]+){INFERENCE_ENDPOINT}$")
+SPD_THRESHOLD = 0.1
+DIR_LOWER_THRESHOLD = 0.8
+DIR_UPPER_THRESHOLD = 1.2
+
+
+def loan_model_predict(rows):
+    # Stand-in for the ONNX loan model: flags low income applicants with dependants as likely to default
+    return [1.0 if row[1] < 150000 and row[0] > 0 else 0.0 for row in rows]
+
+
+@dataclass
+class FakeModel:
+    predict: callable = loan_model_predict
+    output_name: str = "predict"
+    # (available at, input rows, output values), visible to TrustyAI once available at has passed
+    batches: list = field(default_factory=list)
+    input_mappings: dict = field(default_factory=dict)
+    output_mappings: dict = field(default_factory=dict)
+    input_name: str = None
+    input_width: int = 0
+
+    def ingested_batches(self, now):
+        return [batch for batch in self.batches if batch[0] <= now]
+
+    def observations(self, now):
+        return sum(len(batch[1]) for batch in self.ingested_batches(now=now))
+
+
+class FakeTrustyAIServer:
+    """
+    Local stand-in for the TrustyAI service and the KServe v2 REST endpoint of ModelMesh.
+
+    Implements `/infer`, `/info`, `/info/{model_id}`, `/info/names` and the SPD metric endpoint.
+    Latency, error rates and the delay before inferences show up in TrustyAI are configurable, and
+    random failures are drawn from a seeded generator so runs are reproducible.
+    """
+
+    def __init__(self,
+                 host="127.0.0.1",
+                 port=0,
+                 latency=0.0,
+                 trustyai_latency=0.0,
+                 error_rate=0.0,
+                 trustyai_error_rate=0.0,
+                 ingestion_delay=0.0,
+                 single_model_metadata=True,
+                 binary_data=True,
+                 max_request_bytes=None,
+                 token=None,
+                 seed=0):
+        self.latency = latency
+        self.trustyai_latency = trustyai_latency
+        self.error_rate = error_rate
+        self.trustyai_error_rate = trustyai_error_rate
+        self.ingestion_delay = ingestion_delay
+        self.single_model_metadata = single_model_metadata
+        self.binary_data = binary_data
+        # Like ModelMesh's memBufferBytes: larger requests are rejected
+        self.max_request_bytes = max_request_bytes
+        self.token = token
+        self.models = {}
+        self.request_counts = {}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inference_url(self, model_name):
+        return f"{self.url}/v2/models/{model_name}{INFERENCE_ENDPOINT}"
+
+    def add_model(self, model_name, **kwargs):
+        with self._lock:
+            self.models[model_name] = FakeModel(**kwargs)
+
+    def create_client(self, **kwargs):
+        return TrustyAIClient(trustyai_url=self.url,
+                              token_provider=StaticTokenProvider(token=self.token or "fake-token"),
+                              inference_url_resolver=self.inference_url,
+                              **kwargs)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-trustyai", daemon=True)
+        self._thread.start()
+        logger.debug(f"Fake TrustyAI server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _should_fail(self, error_rate):
+        if not error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < error_rate
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_GET(self):
+                server._dispatch(handler=self, method=http.HTTPMethod.GET)
+
+            def do_POST(self):
+                server._dispatch(handler=self, method=http.HTTPMethod.POST)
+
+            def do_DELETE(self):
+                server._dispatch(handler=self, method=http.HTTPMethod.DELETE)
+
+        return Handler
+
+    def _dispatch(self, handler, method):
+        content_length = int(handler.headers.get("Content-Length", 0))
+        body = handler.rfile.read(content_length) if content_length else b""
+        path = handler.path.split("?", 1)[0]
+
+        if self.token is not None and handler.headers.get("Authorization") != f"Bearer {self.token}":
+            return self._respond(handler=handler, status=http.HTTPStatus.UNAUTHORIZED, body={"error": "Unauthorized"})
+
+        inference_match = INFERENCE_PATH_PATTERN.match(path)
+        if inference_match:
+            self._count(endpoint=INFERENCE_ENDPOINT)
+            sleep(self.latency)
+            if self.max_request_bytes is not None and len(body) > self.max_request_bytes:
+                return self._respond(handler=handler, status=http.HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                     body={"error": f"Request larger than {self.max_request_bytes} bytes"})
+            if self._should_fail(error_rate=self.error_rate):
+                return self._respond(handler=handler, status=http.HTTPStatus.SERVICE_UNAVAILABLE,
+                                     body={"error": "Injected failure"})
+            return self._infer(handler=handler, model_name=inference_match.group("model"), body=body)
+
+        sleep(self.trustyai_latency)
+        if self._should_fail(error_rate=self.trustyai_error_rate):
+            return self._respond(handler=handler, status=http.HTTPStatus.SERVICE_UNAVAILABLE,
+                                 body={"error": "Injected failure"})
+
+        if path == TRUSTYAI_MODEL_METADATA_ENDPOINT and method == http.HTTPMethod.GET:
+            self._count(endpoint=TRUSTYAI_MODEL_METADATA_ENDPOINT)
+            with self._lock:
+                metadata = [self._model_metadata(model_id=model_id) for model_id in self.models]
+            return self._respond(handler=handler, status=http.HTTPStatus.OK, body=metadata)
+
+        if path == TRUSTYAI_NAMES_ENDPOINT and method in (http.HTTPMethod.POST, http.HTTPMethod.DELETE):
+            self._count(endpoint=TRUSTYAI_NAMES_ENDPOINT)
+            return self._names(handler=handler, method=method, request=json.loads(body))
+
+        if path in (TRUSTYAI_SPD_ENDPOINT, TRUSTYAI_DIR_ENDPOINT) and method == http.HTTPMethod.POST:
+            self._count(endpoint=path)
+            return self._group_fairness(handler=handler, request=json.loads(body), endpoint=path)
+
+        if path.startswith(f"{TRUSTYAI_MODEL_METADATA_ENDPOINT}/") and method == http.HTTPMethod.GET:
+            self._count(endpoint=f"{TRUSTYAI_MODEL_METADATA_ENDPOINT}/{{model_id}}")
+            if not self.single_model_metadata:
+                # Like a TrustyAI build without the route
+                return self._respond(handler=handler, status=http.HTTPStatus.NOT_FOUND,
+                                     body={"error": f"No route {path}"})
+            model_id = path[len(TRUSTYAI_MODEL_METADATA_ENDPOINT) + 1:]
+            with self._lock:
+                if model_id not in self.models:
+                    return self._respond(handler=handler, status=http.HTTPStatus.NOT_FOUND,
+                                         body={"error": f"Model {model_id} not found"})
+                metadata = self._model_metadata(model_id=model_id)
+            return self._respond(handler=handler, status=http.HTTPStatus.OK, body=metadata)
+
+        return self._respond(handler=handler, status=http.HTTPStatus.NOT_FOUND, body={"error": f"No route {path}"})
+
+    def _respond(self, handler, status, body):
+        data = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _model_metadata(self, model_id):
+        model = self.models[model_id]
+        return {
+            "modelId": model_id,
+            "observations": model.observations(now=monotonic()),
+            "data": {
+                "inputSchema": {f"{model.input_name}-{index}": "DOUBLE" for index in range(model.input_width)},
+                "outputSchema": {model.output_name: "DOUBLE"},
+            },
+            "inputMapping": model.input_mappings,
+            "outputMapping": model.output_mappings,
+        }
+
+    def _infer(self, handler, model_name, body):
+        with self._lock:
+            model = self.models.get(model_name)
+        if model is None:
+            return self._respond(handler=handler, status=http.HTTPStatus.NOT_FOUND,
+                                 body={"error": f"Model {model_name} not found"})
+
+        header_length = handler.headers.get(INFERENCE_HEADER_CONTENT_LENGTH)
+        if header_length is not None and not self.binary_data:
+            return self._respond(handler=handler, status=http.HTTPStatus.BAD_REQUEST,
+                                 body={"error": "Binary tensor data is not supported"})
+
+        try:
+            rows, input_name = decode_inference_rows(body=body, header_length=header_length)
+        except (ValueError, KeyError, IndexError) as e:
+            return self._respond(handler=handler, status=http.HTTPStatus.BAD_REQUEST, body={"error": str(e)})
+
+        outputs = model.predict(rows)
+        with self._lock:
+            model.input_name = input_name
+            model.input_width = len(rows[0]) if rows else model.input_width
+            model.batches.append((monotonic() + self.ingestion_delay, rows, outputs))
+
+        return self._respond(handler=handler, status=http.HTTPStatus.OK, body={
+            "model_name": model_name,
+            "id": str(uuid.uuid4()),
+            "outputs": [{"name": model.output_name, "datatype": "FP64", "shape": [len(outputs), 1], "data": outputs}],
+        })
+
+    def _names(self, handler, method, request):
+        with self._lock:
+            model = self.models.get(request.get("modelId"))
+            if model is None:
+                return self._respond(handler=handler, status=http.HTTPStatus.NOT_FOUND,
+                                     body={"error": f"Model {request.get('modelId')} not found"})
+            if method == http.HTTPMethod.POST:
+                model.input_mappings = request.get("inputMapping", {})
+                model.output_mappings = request.get("outputMapping", {})
+            else:
+                model.input_mappings = {}
+                model.output_mappings = {}
+        return self._respond(handler=handler, status=http.HTTPStatus.OK, body={})
+
+    def _group_fairness(self, handler, request, endpoint):
+        with self._lock:
+            model = self.models.get(request.get("modelId"))
+            if model is None:
+                return self._respond(handler=handler, status=http.HTTPStatus.NOT_FOUND,
+                                     body={"error": f"Model {request.get('modelId')} not found"})
+            batches = model.ingested_batches(now=monotonic())
+            input_columns = {name: column for column, name in model.input_mappings.items()}
+            output_columns = {name: column for column, name in model.output_mappings.items()}
+
+        protected_column = input_columns.get(request["protectedAttribute"], request["protectedAttribute"])
+        outcome_column = output_columns.get(request["outcomeName"], request["outcomeName"])
+        if not protected_column.startswith(f"{model.input_name}-") or outcome_column != model.output_name:
+            return self._respond(handler=handler, status=http.HTTPStatus.BAD_REQUEST,
+                                 body={"error": "Unknown protected attribute or outcome"})
+        protected_index = int(protected_column.rsplit("-", 1)[1])
+
+        protected = [row[protected_index] for batch in batches for row in batch[1]]
+        outcomes = [output for batch in batches for output in batch[2]]
+        batch_size = request.get("batchSize") or len(outcomes)
+        protected, outcomes = protected[-batch_size:], outcomes[-batch_size:]
+
+        if endpoint == TRUSTYAI_SPD_ENDPOINT:
+            metric, lower_bound, upper_bound = SPD, -SPD_THRESHOLD, SPD_THRESHOLD
+        else:
+            metric, lower_bound, upper_bound = DIR, DIR_LOWER_THRESHOLD, DIR_UPPER_THRESHOLD
+        # Same metric code as the local cross-check, so the fake can't drift from it
+        counts = group_counts(protected=protected,
+                              outcomes=outcomes,
+                              privileged=request["privilegedAttribute"],
+                              unprivileged=request["unprivilegedAttribute"],
+                              favorable=request["favorableOutcome"]).reshape(-1, 4).sum(axis=0)
+        value = float(METRICS[metric](counts=counts))
+        return self._respond(handler=handler, status=http.HTTPStatus.OK, body={
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "type": "metric",
+            "value": value,
+            "namedValues": None,
+            "specificDefinition": f"{metric} of {value:.4f} over the last {len(outcomes)} observations",
+            "name": metric,
+            "id": str(uuid.uuid4()),
+            "thresholds": {"lowerBound": lower_bound, "upperBound": upper_bound,
+                           "outsideBounds": not lower_bound <= value <= upper_bound},
+        })
+
+
+def decode_inference_rows(body, header_length=None):
+    if header_length is not None:
+        rows, input_name = decode_binary_payload(body=body, header_length=int(header_length))
+        return rows.tolist(), input_name
+
+    request = json.loads(body)
+    tensor = request["inputs"][0]
+    rows, width = tensor["shape"][0], tensor["shape"][1] if len(tensor["shape"]) > 1 else 1
+    data = tensor["data"]
+    if data and isinstance(data[0], list):
+        data = [value for row in data for value in row]
+    return [data[row * width:(row + 1) * width] for row in range(rows)], tensor["name"]
@@ -0,0 +1,253 @@
+import http
+import json
+import logging
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from time import monotonic, sleep
+
+import requests
+
+from utils.tracing import traced, in_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUEST_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 10
+
+DEFAULT_BARRIER_TIMEOUT = 120
+DEFAULT_BARRIER_INITIAL_INTERVAL = 0.2
+DEFAULT_BARRIER_MAX_INTERVAL = 5
+
+BINARY_REJECTED_STATUS_CODES = {
+    http.HTTPStatus.BAD_REQUEST,
+    http.HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+    http.HTTPStatus.NOT_IMPLEMENTED,
+}
+
+# Raised before the request reached the model, so retrying can't store the same rows twice. Other
+# transport errors (e.g. a ReadTimeout on the non-idempotent /infer) may follow a stored request.
+RETRYABLE_EXCEPTIONS = (requests.ConnectionError, requests.ConnectTimeout)
+
+RETRYABLE_STATUS_CODES = {
+    http.HTTPStatus.TOO_MANY_REQUESTS,
+    http.HTTPStatus.BAD_GATEWAY,
+    http.HTTPStatus.SERVICE_UNAVAILABLE,
+    http.HTTPStatus.GATEWAY_TIMEOUT,
+}
+
+
+@dataclass
+class Payload:
+    name: str
+    data: bytes
+    # Known up front for generated payloads, otherwise read from the payload's input shape
+    row_count: int = None
+    headers: dict = None
+    # Builds a JSON encoded copy of a binary payload, used when the runtime rejects binary tensors
+    json_fallback: callable = None
+    # The decoded input rows, when the payload was built from an array
+    array: object = None
+
+    @property
+    def rows(self):
+        return self.row_count if self.row_count is not None else count_payload_rows(data=self.data)
+
+
+@dataclass
+class IngestionResult:
+    name: str
+    status_code: int = None
+    latency: float = 0.0
+    bytes_sent: int = 0
+    rows: int = 0
+    attempts: int = 0
+    fell_back_to_json: bool = False
+    error: str = None
+    response: requests.Response = None
+
+    @property
+    def ok(self):
+        return self.error is None and self.status_code == http.HTTPStatus.OK
+
+
+@dataclass
+class BarrierResult:
+    expected_observations: int
+    observations: int
+    reached: bool
+    lag: float
+    polls: int
+
+
+def count_payload_rows(data):
+    # KServe v2 inputs are row-aligned, so the first input's leading dimension is the row count
+    inputs = json.loads(data)["inputs"]
+    return inputs[0]["shape"][0] if inputs else 0
+
+
+@traced(name="ingestion.wait_for_observations")
+def wait_for_observations(trustyai_client,
+                          model_id,
+                          expected_observations,
+                          timeout=DEFAULT_BARRIER_TIMEOUT,
+                          initial_interval=DEFAULT_BARRIER_INITIAL_INTERVAL,
+                          max_interval=DEFAULT_BARRIER_MAX_INTERVAL,
+                          start_time=None):
+    """
+    Poll TrustyAI until `model_id` has at least `expected_observations` or `timeout` seconds pass.
+
+    The poll interval doubles while the counter is idle and, once it moves, follows the observed
+    ingestion rate so the final read lands close to when the target is reached. `lag` is measured
+    from `start_time` (defaults to now), normally the moment the last payload was sent.
+    """
+    start_time = monotonic() if start_time is None else start_time
+    deadline = monotonic() + timeout
+    interval = initial_interval
+    polls = 0
+    last_observations = None
+    last_poll_time = None
+
+    while True:
+        observations = trustyai_client.get_datapoint_counter(model_id=model_id, max_age=0)
+        poll_time = monotonic()
+        polls += 1
+
+        if observations >= expected_observations:
+            return BarrierResult(expected_observations=expected_observations, observations=observations,
+                                 reached=True, lag=poll_time - start_time, polls=polls)
+
+        if poll_time >= deadline:
+            logger.warning(f"Model {model_id} has {observations}/{expected_observations} observations "
+                           f"after {timeout}s")
+            return BarrierResult(expected_observations=expected_observations, observations=observations,
+                                 reached=False, lag=poll_time - start_time, polls=polls)
+
+        if last_observations is not None and observations > last_observations:
+            rate = (observations - last_observations) / (poll_time - last_poll_time)
+            interval = (expected_observations - observations) / rate
+        else:
+            interval *= 2
+        interval = max(initial_interval, min(max_interval, interval, deadline - poll_time))
+
+        last_observations = observations
+        last_poll_time = poll_time
+        sleep(interval)
+
+
+def load_payload_files(data_path):
+    for file_name in sorted(os.listdir(data_path)):
+        file_path = os.path.join(data_path, file_name)
+        if os.path.isfile(file_path):
+            with open(file_path, "rb") as file:
+                yield Payload(name=file_name, data=file.read())
+
+
+class IngestionEngine:
+    """
+    Sends inference payloads with bounded concurrency, per-request timeouts and exponential backoff.
+
+    At most `max_concurrency` requests are in flight and at most twice that many payloads are held in
+    memory, so `payloads` can be a lazy generator over an arbitrarily large corpus.
+    """
+
+    def __init__(self,
+                 trustyai_client,
+                 inference_service_name,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 timeout=DEFAULT_REQUEST_TIMEOUT,
+                 max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 on_result=None):
+        self.trustyai_client = trustyai_client
+        self.inference_service_name = inference_service_name
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        # Called with (payload, result) from the sending thread once a payload is done
+        self.on_result = on_result
+        self.binary_supported = True
+
+    def _backoff(self, attempt):
+        delay = min(MAX_BACKOFF, self.backoff_factor * 2 ** (attempt - 1))
+        sleep(delay * random.uniform(0.5, 1.0))
+
+    def _fall_back_to_json(self, payload, result):
+        result.fell_back_to_json = True
+        payload = payload.json_fallback()
+        result.bytes_sent = len(payload.data)
+        return payload
+
+    @traced(name="ingestion.send_one")
+    def send_one(self, payload):
+        result = IngestionResult(name=payload.name, bytes_sent=len(payload.data), rows=payload.rows)
+        if payload.json_fallback is not None and not self.binary_supported:
+            payload = self._fall_back_to_json(payload=payload, result=result)
+        start_time = monotonic()
+
+        attempt = 0
+        while attempt <= self.max_retries:
+            attempt += 1
+            result.attempts = attempt
+            try:
+                response = self.trustyai_client.infer(inference_service_name=self.inference_service_name,
+                                                      data=payload.data,
+                                                      headers=payload.headers,
+                                                      timeout=self.timeout)
+            except RETRYABLE_EXCEPTIONS as e:
+                result.error = f"{type(e).__name__}: {e}"
+            except requests.RequestException as e:
+                result.error = f"{type(e).__name__}: {e}"
+                break
+            except Exception as e:
+                # Not a transport error (e.g. a failed token refresh), a retry would fail the same way
+                logger.exception(f"Unexpected error sending {payload.name}")
+                result.error = f"{type(e).__name__}: {e}"
+                break
+            else:
+                result.response = response
+                result.status_code = response.status_code
+                if response.status_code in BINARY_REJECTED_STATUS_CODES and payload.json_fallback is not None:
+                    if self.binary_supported:
+                        logger.info(f"Runtime rejected binary tensor data with HTTP {response.status_code}, "
+                                    f"falling back to JSON")
+                        self.binary_supported = False
+                    payload = self._fall_back_to_json(payload=payload, result=result)
+                    attempt -= 1
+                    continue
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    result.error = None if response.ok else f"HTTP {response.status_code}: {response.text[:200]}"
+                    break
+                result.error = f"HTTP {response.status_code}"
+
+            if attempt <= self.max_retries:
+                logger.debug(f"Retrying {payload.name} after attempt {attempt} failed: {result.error}")
+                self._backoff(attempt=attempt)
+
+        result.latency = monotonic() - start_time
+        if self.on_result is not None:
+            self.on_result(payload, result)
+        return result
+
+    def send(self, payloads):
+        results = []
+        in_flight = set()
+        max_in_flight = self.max_concurrency * 2
+        send_one = in_context(self.send_one)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for payload in payloads:
+                if len(in_flight) >= max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    results.extend(future.result() for future in done)
+                in_flight.add(executor.submit(send_one, payload))
+
+            done, _ = wait(in_flight)
+            results.extend(future.result() for future in done)
+
+        return results
@@ -0,0 +1,151 @@
+import csv
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, fields, replace
+from time import monotonic
+
+import requests
+
+from utils.constants import TRUSTYAI_SPD_ENDPOINT, TRUSTYAI_DIR_ENDPOINT
+from utils.fairness import SPD, DIR
+from utils.ingestion import DEFAULT_MAX_CONCURRENCY
+from utils.tracing import in_context
+
+logger = logging.getLogger(__name__)
+
+METRIC_ENDPOINTS = {
+    SPD: TRUSTYAI_SPD_ENDPOINT,
+    DIR: TRUSTYAI_DIR_ENDPOINT,
+}
+
+
+@dataclass(frozen=True)
+class MetricRequest:
+    metric: str
+    protected_attribute: str
+    privileged_attribute: float
+    unprivileged_attribute: float
+    outcome_name: str
+    favorable_outcome: float
+    batch_size: int
+
+
+@dataclass
+class MetricSweepRow:
+    metric: str
+    protected_attribute: str
+    privileged_attribute: float
+    unprivileged_attribute: float
+    outcome_name: str
+    favorable_outcome: float
+    batch_size: int
+    observations: int
+    value: float = None
+    status_code: int = None
+    latency: float = None
+    cached: bool = False
+    error: str = None
+
+
+def metric_grid(protected_attributes, batch_sizes, outcome_name, favorable_outcome, metrics=(SPD,),
+                privileged_attribute=1.0, unprivileged_attribute=0.0):
+    """
+    Every combination of metric, protected attribute and batch size.
+
+    `protected_attributes` is a list of names sharing the same privileged/unprivileged values, or a dict
+    of name -> (privileged, unprivileged).
+    """
+    if not isinstance(protected_attributes, dict):
+        protected_attributes = {name: (privileged_attribute, unprivileged_attribute) for name in protected_attributes}
+
+    return [MetricRequest(metric=metric,
+                          protected_attribute=name,
+                          privileged_attribute=privileged,
+                          unprivileged_attribute=unprivileged,
+                          outcome_name=outcome_name,
+                          favorable_outcome=favorable_outcome,
+                          batch_size=batch_size)
+            for metric, (name, (privileged, unprivileged)), batch_size
+            in itertools.product(metrics, protected_attributes.items(), batch_sizes)]
+
+
+class MetricSweep:
+    """
+    Runs a grid of TrustyAI metric requests for one model with bounded concurrency.
+
+    Identical requests are sent once, and results are cached on the request plus the model's observation
+    count, so repeating a sweep before new data is ingested costs a single metadata lookup. Requests go
+    through the client's pooled session, which `max_concurrency` should not exceed.
+    """
+
+    def __init__(self, trustyai_client, model_id, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.trustyai_client = trustyai_client
+        self.model_id = model_id
+        self.max_concurrency = max_concurrency
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _fetch(self, request, observations):
+        row = MetricSweepRow(**asdict(request), observations=observations)
+        start_time = monotonic()
+        try:
+            response = self.trustyai_client.get_fairness_metrics(
+                model_id=self.model_id,
+                protected_attribute=request.protected_attribute,
+                privileged_attribute=request.privileged_attribute,
+                unprivileged_attribute=request.unprivileged_attribute,
+                outcome_name=request.outcome_name,
+                favorable_outcome=request.favorable_outcome,
+                batch_size=request.batch_size,
+                endpoint=METRIC_ENDPOINTS[request.metric])
+        except requests.RequestException as e:
+            row.error = f"{type(e).__name__}: {e}"
+        else:
+            row.status_code = response.status_code
+            if response.ok:
+                row.value = response.json()["value"]
+            else:
+                row.error = f"HTTP {response.status_code}: {response.text[:200]}"
+        row.latency = monotonic() - start_time
+
+        if row.error is None:
+            with self._lock:
+                self._cache[(request, observations)] = row
+        return row
+
+    def run(self, metric_requests):
+        observations = self.trustyai_client.get_datapoint_counter(model_id=self.model_id, max_age=0)
+        metric_requests = list(metric_requests)
+        unique_requests = list(dict.fromkeys(metric_requests))
+
+        results = {}
+        pending = []
+        with self._lock:
+            for request in unique_requests:
+                cached = self._cache.get((request, observations))
+                if cached is None:
+                    pending.append(request)
+                else:
+                    results[request] = replace(cached, cached=True)
+        logger.info(f"Metric sweep over {observations} observations: {len(metric_requests)} requests, "
+                    f"{len(unique_requests)} unique, {len(pending)} not cached")
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            rows = executor.map(in_context(lambda request: self._fetch(request=request, observations=observations)),
+                                pending)
+            results.update(zip(pending, rows))
+
+        return [results[request] for request in unique_requests]
+
+
+def write_sweep_csv(rows, path):
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=[field.name for field in fields(MetricSweepRow)])
+        writer.writeheader()
+        writer.writerows(asdict(row) for row in rows)
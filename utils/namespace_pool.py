@@ -0,0 +1,103 @@
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from ocp_resources.namespace import Namespace
+
+from utils.provisioning import Provisioner
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 1
+NAMESPACE_ACTIVE_TIMEOUT = 120
+
+
+@dataclass
+class NamespaceLease:
+    namespace: Namespace
+    provisioner: Provisioner
+
+    @property
+    def resources(self):
+        return self.provisioner.resources
+
+
+class NamespacePool:
+    """
+    Pool of namespaces that each hold a fully deployed test topology.
+
+    Namespaces are provisioned in the background, leased to one test at a time and reset on release
+    instead of being redeployed. Namespaces are deleted without waiting, so the cluster finishes the
+    deletion while the session carries on.
+    """
+
+    def __init__(self, client, steps_factory, reset, size=DEFAULT_POOL_SIZE, name_prefix="model-namespace",
+                 labels=None):
+        self.client = client
+        self.steps_factory = steps_factory
+        self.reset = reset
+        self.size = size
+        self.name_prefix = name_prefix
+        self.labels = labels or {}
+
+        self._index = itertools.count()
+        self._available = queue.SimpleQueue()
+        self._leases = []
+        self._leases_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="namespace-pool")
+
+    def _create_lease(self):
+        namespace = Namespace(client=self.client,
+                              name=f"{self.name_prefix}-{next(self._index)}",
+                              label=self.labels,
+                              teardown=True)
+        namespace.deploy()
+        with self._leases_lock:
+            self._leases.append(namespace)
+        with span("namespace_pool.wait_active"):
+            namespace.wait_for_status(status=Namespace.Status.ACTIVE, timeout=NAMESPACE_ACTIVE_TIMEOUT)
+
+        provisioner = Provisioner(steps=self.steps_factory(client=self.client, namespace=namespace))
+        provisioner.provision()
+        logger.info(f"Namespace {namespace.name} ready in the pool")
+        return NamespaceLease(namespace=namespace, provisioner=provisioner)
+
+    def warm(self):
+        for _ in range(self.size):
+            self._available.put(self._executor.submit(self._create_lease))
+
+    def lease(self):
+        try:
+            future = self._available.get_nowait()
+        except queue.Empty:
+            future = self._executor.submit(self._create_lease)
+        return future.result()
+
+    def release(self, lease):
+        try:
+            self.reset(client=self.client, lease=lease)
+        except Exception:
+            logger.exception(f"Failed to reset namespace {lease.namespace.name}, replacing it")
+            self._delete(namespace=lease.namespace)
+            # Keeps the pool at its size, the replacement is provisioned in the background
+            self._available.put(self._executor.submit(self._create_lease))
+            return
+        self._available.put(self._executor.submit(lambda: lease))
+
+    def _delete(self, namespace):
+        with self._leases_lock:
+            if namespace in self._leases:
+                self._leases.remove(namespace)
+        # Namespace deletion cascades to every resource in the topology
+        namespace.delete(wait=False)
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._leases_lock:
+            namespaces = list(self._leases)
+        for namespace in namespaces:
+            self._delete(namespace=namespace)
@@ -0,0 +1,282 @@
+import itertools
+import logging
+import math
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from time import monotonic, sleep
+
+from utils.benchmark import latency_summary
+from utils.ingestion import IngestionEngine, DEFAULT_REQUEST_TIMEOUT
+from utils.tracing import span, in_context
+from utils.trustyai_client import DEFAULT_POOL_MAXSIZE
+
+logger = logging.getLogger(__name__)
+
+CONSTANT_ARRIVALS = "constant"
+POISSON_ARRIVALS = "poisson"
+REQUESTS_RATE = "requests"
+ROWS_RATE = "rows"
+# A request sent this much later than its intended time counts as a missed schedule slot
+DEFAULT_SCHEDULE_TOLERANCE = 0.01
+
+
+@dataclass
+class RateSegment:
+    # Rate moving linearly from `start_rate` to `end_rate` over `duration` seconds
+    start_rate: float
+    end_rate: float
+    duration: float
+
+    def arrivals(self, elapsed):
+        # Expected arrivals after `elapsed` seconds of the segment, the integral of the rate
+        if self.duration <= 0:
+            return 0.0
+        return self.start_rate * elapsed + (self.end_rate - self.start_rate) * elapsed ** 2 / (2 * self.duration)
+
+    def time_of(self, arrivals):
+        # Inverse of `arrivals`, infinite when the segment never accumulates that many
+        if arrivals <= 0:
+            return 0.0
+        if self.duration <= 0:
+            return math.inf
+        slope = (self.end_rate - self.start_rate) / self.duration
+        if abs(slope) < 1e-12:
+            return arrivals / self.start_rate if self.start_rate > 0 else math.inf
+        return (math.sqrt(max(0.0, self.start_rate ** 2 + 2 * slope * arrivals)) - self.start_rate) / slope
+
+
+@dataclass
+class RateProfile:
+    """
+    Piecewise-linear target rate over time, in requests/s or rows/s.
+
+    Arrival times come from inverting the cumulative rate, so constant arrivals are evenly spaced in
+    "expected arrivals" and Poisson arrivals follow the time-varying rate exactly.
+    """
+
+    name: str
+    segments: list = field(default_factory=list)
+
+    @property
+    def duration(self):
+        return sum(segment.duration for segment in self.segments)
+
+    def segment_at(self, time):
+        elapsed = 0.0
+        for index, segment in enumerate(self.segments):
+            elapsed += segment.duration
+            if time < elapsed:
+                return index
+        return len(self.segments) - 1
+
+    def time_of(self, arrivals):
+        # Time at which `arrivals` expected arrivals have accumulated, None once the profile is over
+        start = 0.0
+        for segment in self.segments:
+            total = segment.arrivals(elapsed=segment.duration)
+            if arrivals < total:
+                return start + segment.time_of(arrivals=arrivals)
+            arrivals -= total
+            start += segment.duration
+        return None
+
+
+def constant_profile(rate, duration):
+    return RateProfile(name=f"constant-{rate:g}", segments=[RateSegment(start_rate=rate, end_rate=rate,
+                                                                        duration=duration)])
+
+
+def ramp_profile(start_rate, end_rate, duration):
+    return RateProfile(name=f"ramp-{start_rate:g}-{end_rate:g}",
+                       segments=[RateSegment(start_rate=start_rate, end_rate=end_rate, duration=duration)])
+
+
+def step_profile(rates, step_duration):
+    return RateProfile(name=f"steps-{'-'.join(f'{rate:g}' for rate in rates)}",
+                       segments=[RateSegment(start_rate=rate, end_rate=rate, duration=step_duration)
+                                 for rate in rates])
+
+
+def spike_profile(base_rate, spike_rate, duration, spike_start, spike_duration):
+    # A spike at the start or running to the end leaves out the empty base rate segment
+    segments = [
+        RateSegment(start_rate=base_rate, end_rate=base_rate, duration=spike_start),
+        RateSegment(start_rate=spike_rate, end_rate=spike_rate, duration=spike_duration),
+        RateSegment(start_rate=base_rate, end_rate=base_rate, duration=duration - spike_start - spike_duration),
+    ]
+    return RateProfile(name=f"spike-{base_rate:g}-{spike_rate:g}",
+                       segments=[segment for segment in segments if segment.duration > 0])
+
+
+def arrival_schedule(profile, weights, arrivals=CONSTANT_ARRIVALS, seed=None):
+    """
+    Yields the intended send time of each request, in seconds from the start of the run.
+
+    Each request uses up its weight (1, or its rows for a rows/s profile) of expected arrivals: exactly
+    with constant arrivals, exponentially distributed with Poisson arrivals.
+    """
+    if arrivals not in (CONSTANT_ARRIVALS, POISSON_ARRIVALS):
+        raise ValueError(f"Unknown arrival process {arrivals}")
+    generator = random.Random(seed)
+    expected = 0.0
+    for weight in weights:
+        if arrivals == POISSON_ARRIVALS:
+            expected += generator.expovariate(1 / weight)
+        time = profile.time_of(arrivals=expected)
+        if time is None:
+            return
+        yield time
+        if arrivals == CONSTANT_ARRIVALS:
+            expected += weight
+
+
+@dataclass
+class ScheduledResult:
+    name: str
+    # Seconds from the start of the run
+    intended_time: float
+    send_time: float
+    end_time: float
+    rows: int
+    status_code: int = None
+    error: str = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def latency(self):
+        # From the intended send time, so time spent waiting behind slow requests is not hidden
+        return self.end_time - self.intended_time
+
+    @property
+    def service_time(self):
+        return self.end_time - self.send_time
+
+    @property
+    def schedule_delay(self):
+        return self.send_time - self.intended_time
+
+
+@dataclass
+class OpenLoopRun:
+    profile: RateProfile
+    rate_unit: str
+    results: list
+    duration: float
+    schedule_tolerance: float = DEFAULT_SCHEDULE_TOLERANCE
+
+    @property
+    def missed(self):
+        return [result for result in self.results if result.schedule_delay > self.schedule_tolerance]
+
+    def record(self, benchmark_report, benchmark):
+        ok = [result for result in self.results if result.ok]
+        benchmark_report.record_latencies(benchmark=benchmark, latencies=[result.latency for result in ok])
+        benchmark_report.record_latencies(benchmark=benchmark, latencies=[result.service_time for result in ok],
+                                          prefix="service_time")
+        benchmark_report.record(benchmark=benchmark, metric="requests_per_s", value=len(ok) / self.duration,
+                                unit="requests/s", higher_is_better=True)
+        benchmark_report.record(benchmark=benchmark, metric="rows_per_s",
+                                value=sum(result.rows for result in ok) / self.duration, unit="rows/s",
+                                higher_is_better=True)
+        benchmark_report.record(benchmark=benchmark, metric="missed_schedule", value=len(self.missed),
+                                unit="requests")
+        benchmark_report.record(benchmark=benchmark, metric="errors", value=len(self.results) - len(ok),
+                                unit="requests")
+
+        # Per profile segment, to see at which target rate the latency takes off
+        for index, segment in enumerate(self.profile.segments):
+            results = [result for result in ok
+                       if self.profile.segment_at(time=result.intended_time) == index]
+            summary = latency_summary(latencies=[result.latency for result in results])
+            benchmark_report.record(benchmark=benchmark, metric=f"segment{index}_target_rate",
+                                    value=(segment.start_rate + segment.end_rate) / 2, unit=f"{self.rate_unit}/s",
+                                    higher_is_better=True)
+            benchmark_report.record(benchmark=benchmark, metric=f"segment{index}_latency_p99", value=summary["p99"],
+                                    unit="s")
+            benchmark_report.record(benchmark=benchmark, metric=f"segment{index}_missed_schedule",
+                                    value=sum(result.schedule_delay > self.schedule_tolerance
+                                              for result in results),
+                                    unit="requests")
+
+
+class OpenLoopScheduler:
+    """
+    Sends inference requests at a target rate, whether or not earlier requests have completed.
+
+    A dispatcher thread submits each payload at its intended time to a pool of `max_concurrency`
+    workers. When the model can't keep up, requests wait for a worker instead of delaying the
+    schedule, and that wait counts towards their latency and shows up as missed schedule slots.
+    Requests are not retried, a retry would be a second arrival. `max_concurrency` should not
+    exceed the client's connection pool size.
+    """
+
+    def __init__(self,
+                 trustyai_client,
+                 inference_service_name,
+                 profile,
+                 arrivals=CONSTANT_ARRIVALS,
+                 rate_unit=REQUESTS_RATE,
+                 max_concurrency=DEFAULT_POOL_MAXSIZE,
+                 timeout=DEFAULT_REQUEST_TIMEOUT,
+                 schedule_tolerance=DEFAULT_SCHEDULE_TOLERANCE,
+                 seed=None):
+        if rate_unit not in (REQUESTS_RATE, ROWS_RATE):
+            raise ValueError(f"Unknown rate unit {rate_unit}")
+        self.engine = IngestionEngine(trustyai_client=trustyai_client,
+                                      inference_service_name=inference_service_name,
+                                      max_concurrency=max_concurrency,
+                                      timeout=timeout,
+                                      max_retries=0)
+        self.profile = profile
+        self.arrivals = arrivals
+        self.rate_unit = rate_unit
+        self.max_concurrency = max_concurrency
+        self.schedule_tolerance = schedule_tolerance
+        self.seed = seed
+
+    def _send(self, payload, intended_time, start_time):
+        send_time = monotonic() - start_time
+        result = self.engine.send_one(payload=payload)
+        return ScheduledResult(name=payload.name,
+                               intended_time=intended_time,
+                               send_time=send_time,
+                               end_time=monotonic() - start_time,
+                               rows=result.rows,
+                               status_code=result.status_code,
+                               error=None if result.ok else result.error or f"HTTP {result.status_code}")
+
+    def run(self, payloads):
+        """
+        Sends `payloads`, cycling through them, until the profile is over.
+        """
+        payloads = list(payloads)
+        schedule_payloads, weight_payloads = itertools.tee(itertools.cycle(payloads))
+        weights = (1 if self.rate_unit == REQUESTS_RATE else payload.rows for payload in weight_payloads)
+        schedule = arrival_schedule(profile=self.profile, weights=weights, arrivals=self.arrivals, seed=self.seed)
+
+        futures = []
+        late_dispatches = 0
+        with span("open_loop.run", profile=self.profile.name, arrivals=self.arrivals), \
+                ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            send = in_context(self._send)
+            start_time = monotonic()
+            for intended_time, payload in zip(schedule, schedule_payloads):
+                delay = intended_time - (monotonic() - start_time)
+                if delay > 0:
+                    sleep(delay)
+                elif delay < -self.schedule_tolerance:
+                    late_dispatches += 1
+                futures.append(executor.submit(send, payload=payload, intended_time=intended_time,
+                                               start_time=start_time))
+            results = [future.result() for future in futures]
+            duration = max(self.profile.duration, monotonic() - start_time)
+
+        run = OpenLoopRun(profile=self.profile, rate_unit=self.rate_unit, results=results, duration=duration,
+                          schedule_tolerance=self.schedule_tolerance)
+        logger.info(f"Open loop {self.profile.name} ({self.arrivals} arrivals): {len(results)} requests, "
+                    f"{len(run.missed)} missed their schedule slot ({late_dispatches} dispatched late)")
+        return run
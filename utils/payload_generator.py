@@ -0,0 +1,139 @@
+import logging
+
+import numpy as np
+
+from utils.tensor_encoding import load_payload_arrays, make_payload, DEFAULT_INPUT_NAME, JSON_ENCODING
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROWS_PER_REQUEST = 250
+# "customer_data_input-3" is mapped to "Is Male-Identifying?"
+LOAN_MODEL_PROTECTED_INDEX = 3
+PRIVILEGED_VALUE = 1.0
+UNPRIVILEGED_VALUE = 0.0
+# Columns with at most this many distinct values are sampled as categorical, the rest from their quantiles
+MAX_DISCRETE_VALUES = 32
+
+
+def load_payload_rows(data_path):
+    return np.concatenate([rows for _, rows, _ in load_payload_arrays(data_path=data_path)])
+
+
+class ColumnDistribution:
+    def __init__(self, values):
+        unique, counts = np.unique(values, return_counts=True)
+        self.discrete = len(unique) <= MAX_DISCRETE_VALUES
+        if self.discrete:
+            self.values = unique
+            self.probabilities = counts / counts.sum()
+        else:
+            self.values = np.sort(values)
+            self.quantiles = np.linspace(0, 1, len(self.values))
+
+    def sample(self, rng, size):
+        if self.discrete:
+            return rng.choice(self.values, size=size, p=self.probabilities)
+        # Inverse CDF sampling, interpolating between the observed order statistics
+        return np.interp(rng.random(size), self.quantiles, self.values)
+
+
+class SyntheticPayloadGenerator:
+    """
+    Streams KServe v2 requests with rows drawn from distributions learned from a reference dataset.
+
+    Without `outcomes`, every column is sampled independently from its distribution within the row's
+    protected group, so group sizes and per-group feature distributions match the reference data.
+
+    With `outcomes` (e.g. the model's predictions for the reference rows), whole reference rows are
+    resampled from each (group, outcome) cell instead, so the model's prediction for every generated row
+    is known. The favorable rate of the unprivileged group is then set to the privileged rate plus `bias`,
+    which makes `expected_spd` the SPD the model will produce on the generated data. `bias` without
+    `outcomes` is rejected.
+    """
+
+    def __init__(self,
+                 rows,
+                 outcomes=None,
+                 favorable_outcome=0.0,
+                 bias=None,
+                 protected_index=LOAN_MODEL_PROTECTED_INDEX,
+                 rows_per_request=DEFAULT_ROWS_PER_REQUEST,
+                 input_name=DEFAULT_INPUT_NAME,
+                 seed=None):
+        self.width = rows.shape[1]
+        self.protected_index = protected_index
+        self.rows_per_request = rows_per_request
+        self.input_name = input_name
+        self.rng = np.random.default_rng(seed)
+
+        groups = {
+            PRIVILEGED_VALUE: rows[:, protected_index] == PRIVILEGED_VALUE,
+            UNPRIVILEGED_VALUE: rows[:, protected_index] == UNPRIVILEGED_VALUE,
+        }
+        self.privileged_share = groups[PRIVILEGED_VALUE].sum() / (groups[PRIVILEGED_VALUE].sum() +
+                                                                   groups[UNPRIVILEGED_VALUE].sum())
+
+        self.outcomes = outcomes
+        if outcomes is None:
+            if bias is not None:
+                # Without outcomes the model's predictions for generated rows are unknown, so no bias can be set
+                raise ValueError("bias requires outcomes for the reference rows")
+            self.columns = {group: [ColumnDistribution(values=rows[mask, column]) for column in range(self.width)]
+                            for group, mask in groups.items()}
+            return
+
+        favorable = np.asarray(outcomes) == favorable_outcome
+        self.cells = {(group, is_favorable): rows[mask & (favorable == is_favorable)]
+                      for group, mask in groups.items() for is_favorable in (True, False)}
+        self.favorable_rates = {group: favorable[mask].mean() for group, mask in groups.items()}
+        if bias is not None:
+            self.favorable_rates[UNPRIVILEGED_VALUE] = float(np.clip(self.favorable_rates[PRIVILEGED_VALUE] + bias,
+                                                                     0, 1))
+        for (group, is_favorable), cell in self.cells.items():
+            rate = self.favorable_rates[group]
+            if len(cell) == 0 and (rate if is_favorable else 1 - rate) > 0:
+                raise ValueError(f"No reference rows for group {group} with favorable={is_favorable}")
+
+    @classmethod
+    def from_payload_files(cls, data_path, **kwargs):
+        return cls(rows=load_payload_rows(data_path=data_path), **kwargs)
+
+    @property
+    def expected_spd(self):
+        if self.outcomes is None:
+            return None
+        return self.favorable_rates[UNPRIVILEGED_VALUE] - self.favorable_rates[PRIVILEGED_VALUE]
+
+    def _sample_group(self, group, size):
+        if self.outcomes is None:
+            batch = np.column_stack([column.sample(rng=self.rng, size=size) for column in self.columns[group]])
+            batch[:, self.protected_index] = group
+            return batch
+
+        favorable = self.rng.random(size) < self.favorable_rates[group]
+        batch = np.empty((size, self.width), dtype=np.float64)
+        for is_favorable, mask in ((True, favorable), (False, ~favorable)):
+            cell = self.cells[(group, is_favorable)]
+            count = int(mask.sum())
+            if count:
+                batch[mask] = cell[self.rng.integers(0, len(cell), size=count)]
+        return batch
+
+    def sample(self, size):
+        privileged = self.rng.random(size) < self.privileged_share
+        batch = np.empty((size, self.width), dtype=np.float64)
+        for group, mask in ((PRIVILEGED_VALUE, privileged), (UNPRIVILEGED_VALUE, ~privileged)):
+            count = int(mask.sum())
+            if count:
+                batch[mask] = self._sample_group(group=group, size=count)
+        return batch
+
+    def batches(self, total_rows):
+        for start in range(0, total_rows, self.rows_per_request):
+            yield self.sample(size=min(self.rows_per_request, total_rows - start))
+
+    def payloads(self, total_rows, encoding=JSON_ENCODING):
+        # Only the current batch is materialized, serialized right before it is handed to the sender
+        for index, batch in enumerate(self.batches(total_rows=total_rows)):
+            yield make_payload(name=f"synthetic-{index:08d}", rows=batch, input_name=self.input_name,
+                               encoding=encoding)
@@ -0,0 +1,209 @@
+import fcntl
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from utils.ingestion import Payload
+from utils.tensor_encoding import BufferBody, encode_binary_payload, FP64_LITTLE_ENDIAN, JSON_ENCODING
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".payload_cache"
+INDEX_FILE = "index.json"
+INDEX_LOCK_FILE = "index.lock"
+MTIME_INVALIDATION = "mtime"
+HASH_INVALIDATION = "hash"
+SUPPORTED_DATATYPES = {"FP64"}
+
+
+class PayloadValidationError(ValueError):
+    pass
+
+
+def validate_payload(file_path, payload):
+    inputs = payload.get("inputs")
+    if not inputs:
+        raise PayloadValidationError(f"{file_path} has no inputs")
+
+    tensor = inputs[0]
+    if tensor.get("datatype") not in SUPPORTED_DATATYPES:
+        raise PayloadValidationError(f"{file_path} has unsupported datatype {tensor.get('datatype')}")
+
+    shape = tensor.get("shape")
+    if not shape or len(shape) != 2:
+        raise PayloadValidationError(f"{file_path} has shape {shape}, expected [rows, columns]")
+
+    rows = np.asarray(tensor["data"], dtype=FP64_LITTLE_ENDIAN)
+    if rows.size != shape[0] * shape[1]:
+        raise PayloadValidationError(f"{file_path} has {rows.size} values, shape {shape} needs {shape[0] * shape[1]}")
+    return rows.reshape(shape), tensor["name"]
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PayloadStore:
+    """
+    Validates payload files once and serves ready-to-send request bodies from an on-disk cache.
+
+    Each file is parsed and checked (datatype, shape, row count) the first time it is seen, and its
+    tensor is saved as a row-major `.npy` array next to an index entry. Later runs memory-map those
+    arrays and the source files, so no JSON is parsed and bodies go to the socket from the page cache.
+    Entries are invalidated when the file's size and mtime change or, with `invalidation="hash"`,
+    when its SHA-256 changes. Processes sharing a cache directory (e.g. pytest-xdist workers) update
+    the index under a file lock.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, invalidation=MTIME_INVALIDATION):
+        self.cache_dir = cache_dir
+        self.invalidation = invalidation
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        self.lock_path = os.path.join(cache_dir, INDEX_LOCK_FILE)
+        self._lock = threading.Lock()
+        # One read-only mapping per source file, shared by every JSON payload of that file
+        self._bodies = {}
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as index_file:
+            return json.load(index_file)
+
+    def _save_index(self):
+        with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, prefix=f"{INDEX_FILE}.", delete=False) as index_file:
+            json.dump(self.index, index_file, indent=1, sort_keys=True)
+        os.replace(index_file.name, self.index_path)
+
+    @contextmanager
+    def _locked_index(self):
+        # Other processes may have added entries since this store last read the index
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.index = self._load_index()
+                yield self.index
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _fingerprint(self, file_path):
+        stat = os.stat(file_path)
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if self.invalidation == HASH_INVALIDATION:
+            fingerprint = {"size": stat.st_size, "sha256": file_sha256(file_path=file_path)}
+        return fingerprint
+
+    def _array_path(self, file_path):
+        return os.path.join(self.cache_dir, f"{hashlib.sha1(file_path.encode()).hexdigest()[:16]}.npy")
+
+    def entry(self, file_path):
+        file_path = os.path.abspath(file_path)
+        fingerprint = self._fingerprint(file_path=file_path)
+
+        entry = self.index.get(file_path)
+        if entry is not None and entry["fingerprint"] == fingerprint and os.path.exists(entry["array_path"]):
+            return entry
+
+        with self._locked_index() as index:
+            entry = index.get(file_path)
+            if entry is not None and entry["fingerprint"] == fingerprint and os.path.exists(entry["array_path"]):
+                return entry
+
+            logger.debug(f"Validating and caching payload {file_path}")
+            with open(file_path) as file:
+                rows, input_name = validate_payload(file_path=file_path, payload=json.load(file))
+            array_path = self._array_path(file_path=file_path)
+            np.save(array_path, rows)
+
+            entry = {
+                "fingerprint": fingerprint,
+                "array_path": array_path,
+                "input_name": input_name,
+                "shape": list(rows.shape),
+            }
+            index[file_path] = entry
+            self._save_index()
+            return entry
+
+    def load_rows(self, file_path):
+        return self._load_array(entry=self.entry(file_path=file_path))
+
+    def _load_array(self, entry):
+        return np.load(entry["array_path"], mmap_mode="r")
+
+    def payload(self, file_path, encoding=JSON_ENCODING):
+        # Validated and fingerprinted once per payload, which in hash mode reads the whole file
+        entry = self.entry(file_path=file_path)
+        array = self._load_array(entry=entry)
+
+        if encoding == JSON_ENCODING:
+            return self._json_payload(file_path=file_path, entry=entry, array=array)
+
+        data, headers = encode_binary_payload(rows=array, input_name=entry["input_name"])
+        return Payload(name=os.path.basename(file_path), data=data, headers=headers, row_count=entry["shape"][0],
+                       array=array,
+                       json_fallback=lambda: self._json_payload(file_path=file_path, entry=entry, array=array))
+
+    def _json_payload(self, file_path, entry, array):
+        # The validated source file already is a JSON request body
+        return Payload(name=os.path.basename(file_path),
+                       data=BufferBody(chunks=[self._body(file_path=file_path, entry=entry)]),
+                       row_count=entry["shape"][0],
+                       array=array)
+
+    def _body(self, file_path, entry):
+        file_path = os.path.abspath(file_path)
+        with self._lock:
+            fingerprint, body = self._bodies.get(file_path, (None, None))
+            if fingerprint != entry["fingerprint"]:
+                if body is not None:
+                    self._close_body(body=body)
+                with open(file_path, "rb") as file:
+                    body = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._bodies[file_path] = (entry["fingerprint"], body)
+            return body
+
+    def _close_body(self, body):
+        try:
+            body.close()
+        except BufferError:
+            # Still referenced by a payload, the mapping goes away with it
+            pass
+
+    def close(self):
+        with self._lock:
+            for _, body in self._bodies.values():
+                self._close_body(body=body)
+            self._bodies.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _file_paths(self, data_path):
+        for file_name in sorted(os.listdir(data_path)):
+            file_path = os.path.join(data_path, file_name)
+            if os.path.isfile(file_path):
+                yield file_path
+
+    def row_arrays(self, data_path):
+        return [self.load_rows(file_path=file_path) for file_path in self._file_paths(data_path=data_path)]
+
+    def payloads(self, data_path, encoding=JSON_ENCODING):
+        for file_path in self._file_paths(data_path=data_path):
+            yield self.payload(file_path=file_path, encoding=encoding)
@@ -0,0 +1,144 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from time import monotonic
+
+from utils.tracing import span, in_context
+
+logger = logging.getLogger(__name__)
+
+
+class ProvisioningError(Exception):
+    pass
+
+
+@dataclass
+class ProvisioningStep:
+    name: str
+    # Called with a dict of step name -> deployed resource for every step provisioned so far
+    create: callable
+    depends_on: tuple = ()
+    ready: callable = None
+
+
+@dataclass
+class WaveTiming:
+    index: int
+    steps: list
+    seconds: float
+
+
+@dataclass
+class Provisioner:
+    """
+    Deploys a set of resources in dependency order, running every independent wave concurrently.
+
+    Resources are created with `deploy()` and removed with `clean_up()` rather than used as context
+    managers, since `Resource.__enter__` installs a signal handler and only works on the main thread.
+    """
+
+    steps: list
+    max_workers: int = None
+    resources: dict = field(default_factory=dict)
+    provision_timings: list = field(default_factory=list)
+    teardown_timings: list = field(default_factory=list)
+    _deployed_waves: list = field(default_factory=list)
+
+    def waves(self):
+        steps_by_name = {step.name: step for step in self.steps}
+        for step in self.steps:
+            unknown = set(step.depends_on) - steps_by_name.keys()
+            if unknown:
+                raise ProvisioningError(f"Step {step.name} depends on unknown steps {sorted(unknown)}")
+
+        waves = []
+        placed = set()
+        while len(placed) < len(steps_by_name):
+            wave = [step for name, step in steps_by_name.items()
+                    if name not in placed and set(step.depends_on) <= placed]
+            if not wave:
+                raise ProvisioningError(f"Dependency cycle between steps {sorted(steps_by_name.keys() - placed)}")
+            waves.append(wave)
+            placed.update(step.name for step in wave)
+        return waves
+
+    def _provision_step(self, step, deployed):
+        resource = step.create(dict(self.resources))
+        with span("provision.deploy", step=step.name):
+            resource.deploy()
+        # Recorded before waiting, so a resource that never gets ready is still torn down
+        deployed.append(resource)
+        if step.ready is not None:
+            with span("provision.ready", step=step.name):
+                step.ready(resource)
+        return resource
+
+    def _teardown_resource(self, resource):
+        if getattr(resource, "teardown", True):
+            with span("provision.teardown", resource=resource.name):
+                resource.clean_up()
+
+    def _run_wave(self, executor, function, items):
+        function = in_context(function)
+        futures = [executor.submit(function, item) for item in items]
+        results, errors = [], []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(None)
+                errors.append(e)
+        return results, errors
+
+    def provision(self):
+        waves = self.waves()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for index, wave in enumerate(waves):
+                start_time = monotonic()
+                deployed = []
+                self._deployed_waves.append(deployed)
+                results, errors = self._run_wave(executor=executor,
+                                                 function=partial(self._provision_step, deployed=deployed),
+                                                 items=wave)
+
+                self.resources.update({step.name: resource for step, resource in zip(wave, results)
+                                       if resource is not None})
+
+                timing = WaveTiming(index=index, steps=[step.name for step in wave], seconds=monotonic() - start_time)
+                self.provision_timings.append(timing)
+                logger.info(f"Provisioned wave {index} {timing.steps} in {timing.seconds:.1f}s")
+
+                if errors:
+                    try:
+                        self.teardown()
+                    except ProvisioningError:
+                        logger.exception("Failed to tear down after a provisioning error")
+                    raise ProvisioningError(f"Failed to provision wave {index} {timing.steps}") from errors[0]
+        return self.resources
+
+    def teardown(self):
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while self._deployed_waves:
+                index = len(self._deployed_waves) - 1
+                wave = self._deployed_waves.pop()
+                start_time = monotonic()
+                _, wave_errors = self._run_wave(executor=executor, function=self._teardown_resource, items=wave)
+                errors.extend(wave_errors)
+
+                timing = WaveTiming(index=index, steps=[resource.name for resource in wave],
+                                    seconds=monotonic() - start_time)
+                self.teardown_timings.append(timing)
+                logger.info(f"Tore down wave {index} {timing.steps} in {timing.seconds:.1f}s")
+        self.resources.clear()
+
+        if errors:
+            raise ProvisioningError("Failed to tear down some resources") from errors[0]
+
+    def __enter__(self):
+        self.provision()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.teardown()
@@ -0,0 +1,192 @@
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from time import monotonic
+
+from kubernetes.dynamic.exceptions import ResourceNotFoundError
+
+from utils.constants import TRUSTYAI_SERVICE, MODELMESH_SERVING
+
+logger = logging.getLogger(__name__)
+
+POD_METRICS_API_VERSION = "metrics.k8s.io/v1beta1"
+# metrics-server refreshes every 15s by default, polling faster only returns duplicate samples
+DEFAULT_SAMPLE_INTERVAL = 5
+# Pod group -> substring of the pod name, same matching as get_trustyai_pod and wait_for_model_pods
+DEFAULT_POD_GROUPS = {
+    "trustyai": TRUSTYAI_SERVICE,
+    "modelmesh": MODELMESH_SERVING,
+}
+IDLE_PHASE = "idle"
+
+CPU_UNITS = {"n": 1e-9, "u": 1e-6, "m": 1e-3}
+MEMORY_UNITS = {
+    "Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40,
+    "k": 10 ** 3, "M": 10 ** 6, "G": 10 ** 9, "T": 10 ** 12,
+}
+
+
+def parse_cpu(quantity):
+    # Kubernetes CPU quantity ("250m", "1234567n", "2") to cores
+    if quantity[-1] in CPU_UNITS:
+        return float(quantity[:-1]) * CPU_UNITS[quantity[-1]]
+    return float(quantity)
+
+
+def parse_memory(quantity):
+    # Kubernetes memory quantity ("512Mi", "1G", "1048576") to bytes
+    for suffix, multiplier in MEMORY_UNITS.items():
+        if quantity.endswith(suffix):
+            return int(float(quantity[:-len(suffix)]) * multiplier)
+    return int(quantity)
+
+
+@dataclass
+class ResourceSample:
+    time: float
+    phase: str
+    group: str
+    pod: str
+    container: str
+    cpu_cores: float
+    memory_bytes: int
+
+
+class ResourceSampler:
+    """
+    Polls the metrics API in the background for the CPU and memory usage of the TrustyAI and ModelMesh pods.
+
+    Every sample is tagged with the phase active when it was taken (see `phase`), so usage can be reported
+    next to the throughput measured in the same phase. If the metrics API is not available the sampler
+    logs a warning and records nothing.
+    """
+
+    def __init__(self, client, namespace, interval=DEFAULT_SAMPLE_INTERVAL, pod_groups=None):
+        self.client = client
+        self.namespace = namespace
+        self.interval = interval
+        self.pod_groups = pod_groups or DEFAULT_POD_GROUPS
+        self.samples = []
+        self.phases = []
+        self._phase = IDLE_PHASE
+        self._start_time = monotonic()
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _group(self, pod_name):
+        return next((group for group, name in self.pod_groups.items() if name in pod_name), None)
+
+    def sample(self):
+        pod_metrics_api = self.client.resources.get(api_version=POD_METRICS_API_VERSION, kind="PodMetrics")
+        now = monotonic() - self._start_time
+        samples = []
+        for pod_metrics in pod_metrics_api.get(namespace=self.namespace.name).items:
+            group = self._group(pod_name=pod_metrics.metadata.name)
+            # The same metrics-server window is returned until the next scrape
+            key = (pod_metrics.metadata.name, pod_metrics.timestamp)
+            if group is None or key in self._seen:
+                continue
+            self._seen.add(key)
+            for container in pod_metrics.containers:
+                samples.append(ResourceSample(time=now,
+                                              phase=self._phase,
+                                              group=group,
+                                              pod=pod_metrics.metadata.name,
+                                              container=container.name,
+                                              cpu_cores=parse_cpu(quantity=container.usage.cpu),
+                                              memory_bytes=parse_memory(quantity=container.usage.memory)))
+        with self._lock:
+            self.samples.extend(samples)
+        return samples
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except ResourceNotFoundError:
+                logger.warning(f"{POD_METRICS_API_VERSION} is not available, resource usage will not be sampled")
+                return
+            except Exception:
+                logger.exception("Failed to sample pod resource usage")
+            self._stop.wait(timeout=self.interval)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @contextmanager
+    def phase(self, name):
+        start = monotonic() - self._start_time
+        previous, self._phase = self._phase, name
+        try:
+            yield
+        finally:
+            self._phase = previous
+            self.phases.append({"name": name, "start": start, "end": monotonic() - self._start_time})
+
+    def summary(self):
+        # phase -> pod group -> usage, summing the containers of every pod in the group per sample time
+        with self._lock:
+            samples = list(self.samples)
+
+        totals = {}
+        for sample in samples:
+            key = (sample.phase, sample.group, sample.time)
+            cpu, memory = totals.get(key, (0.0, 0))
+            totals[key] = (cpu + sample.cpu_cores, memory + sample.memory_bytes)
+
+        summary = {}
+        for (phase, group, _), (cpu, memory) in sorted(totals.items(), key=lambda item: item[0][2]):
+            usage = summary.setdefault(phase, {}).setdefault(group, {"cpu": [], "memory": []})
+            usage["cpu"].append(cpu)
+            usage["memory"].append(memory)
+
+        return {phase: {group: {"samples": len(usage["cpu"]),
+                                "cpu_cores_mean": sum(usage["cpu"]) / len(usage["cpu"]),
+                                "cpu_cores_max": max(usage["cpu"]),
+                                "memory_bytes_max": max(usage["memory"]),
+                                "memory_bytes_growth": usage["memory"][-1] - usage["memory"][0]}
+                        for group, usage in groups.items()}
+                for phase, groups in summary.items()}
+
+    def record(self, benchmark_report, benchmark):
+        for phase, groups in self.summary().items():
+            for group, usage in groups.items():
+                prefix = f"{phase}_{group}"
+                benchmark_report.record(benchmark=benchmark, metric=f"{prefix}_cpu_cores_mean",
+                                        value=usage["cpu_cores_mean"], unit="cores")
+                benchmark_report.record(benchmark=benchmark, metric=f"{prefix}_cpu_cores_max",
+                                        value=usage["cpu_cores_max"], unit="cores")
+                benchmark_report.record(benchmark=benchmark, metric=f"{prefix}_memory_bytes_max",
+                                        value=usage["memory_bytes_max"], unit="bytes")
+                benchmark_report.record(benchmark=benchmark, metric=f"{prefix}_memory_bytes_growth",
+                                        value=usage["memory_bytes_growth"], unit="bytes")
+        with self._lock:
+            samples = [asdict(sample) for sample in self.samples]
+        benchmark_report.record_series(benchmark=benchmark, name="resource_usage",
+                                       series={"phases": self.phases, "samples": samples})
+
+
+@contextmanager
+def sample_resources(client, namespace, benchmark_report, benchmark, interval=DEFAULT_SAMPLE_INTERVAL):
+    # Samples the TrustyAI and ModelMesh pods while the block runs, usage is recorded per phase under `benchmark`
+    with ResourceSampler(client=client, namespace=namespace, interval=interval) as sampler:
+        yield sampler
+    sampler.record(benchmark_report=benchmark_report, benchmark=benchmark)
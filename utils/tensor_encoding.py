@@ -0,0 +1,107 @@
+import json
+import os
+
+import numpy as np
+
+from utils.ingestion import Payload
+
+DEFAULT_INPUT_NAME = "customer_data_input"
+JSON_ENCODING = "json"
+BINARY_ENCODING = "binary"
+INFERENCE_HEADER_CONTENT_LENGTH = "Inference-Header-Content-Length"
+FP64_LITTLE_ENDIAN = np.dtype("<f8")
+
+
+class BufferBody:
+    """
+    Request body sent straight from existing buffers (bytes, NumPy arrays, mmaps) without joining them.
+
+    Defining `__len__` lets requests send a Content-Length instead of chunked encoding, and a fresh
+    iterator per pass lets retries resend the same body.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = [memoryview(chunk).cast("B") for chunk in chunks]
+
+    def __len__(self):
+        return sum(chunk.nbytes for chunk in self.chunks)
+
+    def __iter__(self):
+        yield from self.chunks
+
+    def tobytes(self):
+        return b"".join(self.chunks)
+
+
+class BinaryBody(BufferBody):
+    # JSON inference header followed by the raw tensor bytes
+    def __init__(self, header, tensor):
+        super().__init__(chunks=[header, tensor])
+        self.header, self.tensor = self.chunks
+
+
+def encode_json_payload(rows, input_name=DEFAULT_INPUT_NAME):
+    return json.dumps({
+        "inputs": [{
+            "name": input_name,
+            "shape": list(rows.shape),
+            "datatype": "FP64",
+            "data": rows.tolist(),
+        }]
+    }).encode()
+
+
+def encode_binary_payload(rows, input_name=DEFAULT_INPUT_NAME):
+    # No copy when the array already is C-contiguous little-endian FP64
+    tensor = np.ascontiguousarray(rows, dtype=FP64_LITTLE_ENDIAN)
+    header = json.dumps({
+        "inputs": [{
+            "name": input_name,
+            "shape": list(tensor.shape),
+            "datatype": "FP64",
+            "parameters": {"binary_data_size": tensor.nbytes},
+        }]
+    }).encode()
+    headers = {
+        "Content-Type": "application/octet-stream",
+        INFERENCE_HEADER_CONTENT_LENGTH: str(len(header)),
+    }
+    return BinaryBody(header=header, tensor=tensor), headers
+
+
+def decode_binary_payload(body, header_length):
+    header = json.loads(body[:header_length])
+    tensor = header["inputs"][0]
+    size = tensor["parameters"]["binary_data_size"]
+    rows = np.frombuffer(body, dtype=FP64_LITTLE_ENDIAN, count=size // FP64_LITTLE_ENDIAN.itemsize,
+                         offset=header_length)
+    return rows.reshape(tensor["shape"]), tensor["name"]
+
+
+def make_payload(name, rows, input_name=DEFAULT_INPUT_NAME, encoding=JSON_ENCODING):
+    if encoding == JSON_ENCODING:
+        return Payload(name=name, data=encode_json_payload(rows=rows, input_name=input_name), row_count=len(rows),
+                       array=rows)
+
+    data, headers = encode_binary_payload(rows=rows, input_name=input_name)
+    return Payload(name=name,
+                   data=data,
+                   headers=headers,
+                   row_count=len(rows),
+                   array=rows,
+                   json_fallback=lambda: make_payload(name=name, rows=rows, input_name=input_name))
+
+
+def load_payload_arrays(data_path):
+    for file_name in sorted(os.listdir(data_path)):
+        file_path = os.path.join(data_path, file_name)
+        if os.path.isfile(file_path):
+            with open(file_path) as file:
+                tensor = json.load(file)["inputs"][0]
+            yield file_name, np.asarray(tensor["data"], dtype=FP64_LITTLE_ENDIAN).reshape(tensor["shape"]), \
+                tensor["name"]
+
+
+def load_encoded_payload_files(data_path, encoding=BINARY_ENCODING):
+    for file_name, rows, input_name in load_payload_arrays(data_path=data_path):
+        yield make_payload(name=file_name, rows=rows, input_name=input_name, encoding=encoding)
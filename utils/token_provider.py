@@ -0,0 +1,89 @@
+import logging
+import threading
+from time import monotonic
+
+from utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_TTL = 300
+BEARER_PREFIX = "Bearer "
+
+
+class TokenNotFoundError(Exception):
+    pass
+
+
+class TokenProvider:
+    """
+    Bearer token taken from the kubernetes client configuration and cached for `ttl` seconds.
+
+    Refreshing goes through the configuration's `refresh_api_key_hook` (exec/OIDC auth) or
+    re-reads the kubeconfig, so no `oc` process is ever spawned.
+    """
+
+    def __init__(self, configuration, ttl=DEFAULT_TOKEN_TTL, config_file=None):
+        self.configuration = configuration
+        self.ttl = ttl
+        self.config_file = config_file
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_client(cls, client, **kwargs):
+        # Accepts either a DynamicClient or the ApiClient it wraps
+        api_client = getattr(client, "client", client)
+        return cls(configuration=api_client.configuration, **kwargs)
+
+    def get_token(self):
+        token = self._token
+        if token is not None and monotonic() < self._expires_at:
+            return token
+
+        with self._lock:
+            if self._token is None:
+                self._token = self._read_token()
+            elif monotonic() >= self._expires_at:
+                self._reload()
+                self._token = self._read_token()
+            self._expires_at = monotonic() + self.ttl
+            return self._token
+
+    def invalidate(self):
+        with self._lock:
+            # Force a reload on the next call, not only a re-read of the cached configuration
+            if self._token is not None:
+                self._expires_at = 0.0
+
+    @traced(name="token.reload")
+    def _reload(self):
+        refresh_hook = self.configuration.refresh_api_key_hook
+        if refresh_hook is not None:
+            refresh_hook(self.configuration)
+        else:
+            # Imported here, so StaticTokenProvider users don't load the kubernetes client
+            import kubernetes
+
+            kubernetes.config.load_kube_config(config_file=self.config_file,
+                                               client_configuration=self.configuration)
+        logger.debug("Reloaded bearer token from client configuration")
+
+    def _read_token(self):
+        token = self.configuration.api_key.get("authorization") or self.configuration.api_key.get("BearerToken")
+        if not token:
+            raise TokenNotFoundError("No bearer token found in the kubernetes client configuration")
+        if token.startswith(BEARER_PREFIX):
+            token = token[len(BEARER_PREFIX):]
+        return token
+
+
+class StaticTokenProvider:
+    def __init__(self, token):
+        self.token = token
+
+    def get_token(self):
+        return self.token
+
+    def invalidate(self):
+        pass
@@ -0,0 +1,226 @@
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from time import monotonic
+
+logger = logging.getLogger(__name__)
+
+SCOPE_NAME = "trustyai-tests"
+# Upper bounds (seconds) of the duration histogram buckets, the last bucket is unbounded
+HISTOGRAM_BOUNDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+DEFAULT_MAX_SPANS = 100000
+# OTLP span status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+# OTLP cumulative aggregation temporality
+AGGREGATION_TEMPORALITY_CUMULATIVE = 2
+
+_NOOP_SPAN = nullcontext()
+
+
+class Histogram:
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.bucket_counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, quantile):
+        # Upper bound of the bucket holding the quantile, good enough to spot a phase moving between buckets
+        rank = quantile * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.bucket_counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Span:
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = os.urandom(8).hex()
+        self.parent = None
+        self.trace_id = None
+        self.start_time_ns = None
+        self.duration = None
+        self.error = None
+        self._start = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.parent = self.tracer._current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent else os.urandom(16).hex()
+        self._token = self.tracer._current_span.set(self)
+        self.start_time_ns = time.time_ns()
+        self._start = monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.duration = monotonic() - self._start
+        if exc_value is not None:
+            self.error = f"{exc_type.__name__}: {exc_value}"
+        self.tracer._current_span.reset(self._token)
+        self.tracer._finish(span=self)
+        return False
+
+
+class Tracer:
+    """
+    Minimal tracer: nested, monotonic-timed spans aggregated into a duration histogram per span name.
+
+    Disabled tracers hand out a shared no-op context manager, so instrumented code pays a single
+    attribute check. Finished spans (up to `max_spans`) and the histograms can be exported as OTLP JSON.
+    The current span lives in a context variable, so work handed to executors through `in_context` keeps
+    its parent span.
+    """
+
+    def __init__(self, enabled=False, max_spans=DEFAULT_MAX_SPANS):
+        self.enabled = enabled
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped_spans = 0
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._current_span = contextvars.ContextVar(f"current_span_{id(self)}", default=None)
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(tracer=self, name=name, attributes=attributes)
+
+    def _finish(self, span):
+        with self._lock:
+            self.histograms.setdefault(span.name, Histogram()).observe(value=span.duration)
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+    def reset(self):
+        with self._lock:
+            self.spans = []
+            self.dropped_spans = 0
+            self.histograms = {}
+
+    def summary(self):
+        with self._lock:
+            histograms = dict(self.histograms)
+        return {name: {"count": histogram.count,
+                       "total": histogram.sum,
+                       "mean": histogram.sum / histogram.count,
+                       "p50": histogram.quantile(quantile=0.5),
+                       "p95": histogram.quantile(quantile=0.95),
+                       "max": histogram.max}
+                for name, histogram in sorted(histograms.items())}
+
+    def to_otlp(self):
+        resource = {"attributes": [otlp_attribute(key="service.name", value=SCOPE_NAME)]}
+        scope = {"name": SCOPE_NAME}
+        with self._lock:
+            spans = list(self.spans)
+            histograms = dict(self.histograms)
+
+        otlp_spans = [{
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent.span_id if span.parent else "",
+            "name": span.name,
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.start_time_ns + int(span.duration * 1e9)),
+            "attributes": [otlp_attribute(key=key, value=value) for key, value in span.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": span.error} if span.error else {"code": STATUS_OK},
+        } for span in spans]
+        otlp_metrics = [{
+            "name": name,
+            "unit": "s",
+            "histogram": {
+                "aggregationTemporality": AGGREGATION_TEMPORALITY_CUMULATIVE,
+                "dataPoints": [{
+                    "timeUnixNano": str(time.time_ns()),
+                    "count": str(histogram.count),
+                    "sum": histogram.sum,
+                    "min": histogram.min,
+                    "max": histogram.max,
+                    "bucketCounts": [str(count) for count in histogram.bucket_counts],
+                    "explicitBounds": list(histogram.bounds),
+                }],
+            },
+        } for name, histogram in sorted(histograms.items())]
+
+        return (
+            {"resourceSpans": [{"resource": resource, "scopeSpans": [{"scope": scope, "spans": otlp_spans}]}]},
+            {"resourceMetrics": [{"resource": resource, "scopeMetrics": [{"scope": scope, "metrics": otlp_metrics}]}]},
+        )
+
+    def write(self, path):
+        # One OTLP JSON document per line, the layout read by the OpenTelemetry collector's otlpjsonfile receiver
+        with open(path, "w") as file:
+            for document in self.to_otlp():
+                file.write(json.dumps(document) + "\n")
+        if self.dropped_spans:
+            logger.warning(f"{self.dropped_spans} spans over the limit of {self.max_spans} were not exported")
+
+
+def otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+tracer = Tracer()
+
+
+def span(name, **attributes):
+    return tracer.span(name, **attributes)
+
+
+def in_context(function):
+    # Runs `function` in a copy of the caller's context, so spans it opens in an executor thread keep their parent
+    if not tracer.enabled:
+        return function
+    context = contextvars.copy_context()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(function, *args, **kwargs)
+    return wrapper
+
+
+def traced(name=None):
+    def decorator(function):
+        span_name = name or f"{function.__module__.rsplit('.', 1)[-1]}.{function.__name__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with tracer.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,251 @@
+import http
+import logging
+import threading
+from time import monotonic
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.constants import TRUSTYAI_SERVICE, TRUSTYAI_SPD_ENDPOINT, TRUSTYAI_NAMES_ENDPOINT, INFERENCE_ENDPOINT, \
+    TRUSTYAI_MODEL_METADATA_ENDPOINT, TRUSTYAI_SINGLE_MODEL_METADATA_ENDPOINT
+from utils.cassette import CassetteAdapter, get_active_cassette
+from utils.token_provider import TokenProvider, StaticTokenProvider
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_METADATA_TTL = 1.0
+
+
+class TrustyAIClient:
+    """
+    Long-lived HTTP client for a TrustyAI service and the inference services it monitors.
+
+    Routes are resolved once and every request goes through a single keep-alive session,
+    so repeated calls reuse pooled TLS connections instead of opening a new one each time.
+    """
+
+    def __init__(self, trustyai_url, token_provider, inference_url_resolver=None, verify=False,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, metadata_ttl=DEFAULT_METADATA_TTL, cassette=None):
+        self.trustyai_url = trustyai_url.rstrip("/")
+        self.token_provider = token_provider
+        self.inference_url_resolver = inference_url_resolver
+        self.inference_urls = {}
+        self._lock = threading.Lock()
+
+        # model id -> (fetch time, metadata); None means the model was absent from the last full listing
+        self.metadata_ttl = metadata_ttl
+        self._metadata_cache = {}
+        self._metadata_lock = threading.Lock()
+        self._single_model_metadata_supported = True
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        if cassette is not None:
+            adapter = CassetteAdapter(cassette=cassette, adapter=adapter)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_routes(cls, client, namespace, token_provider=None, **kwargs):
+        # Imported here, so clients built from a URL don't load the cluster libraries
+        from ocp_resources.route import Route
+
+        # With an active cassette, routes and HTTP traffic are recorded, or replayed without touching the cluster
+        cassette = kwargs.pop("cassette", get_active_cassette())
+
+        def lookup_route_url(name, inference):
+            with span("route.lookup", route=name):
+                route = next(Route.get(client=client, namespace=namespace.name, name=name))
+            if inference:
+                return f"https://{route.host}{route.instance.spec.path}{INFERENCE_ENDPOINT}"
+            return f"https://{route.host}"
+
+        def resolve_url(name, inference=False):
+            if cassette is None:
+                return lookup_route_url(name=name, inference=inference)
+            return cassette.value(key=f"route/{namespace.name}/{name}",
+                                  compute=lambda: lookup_route_url(name=name, inference=inference))
+
+        if token_provider is None:
+            if cassette is not None and cassette.replaying:
+                token_provider = StaticTokenProvider(token="replayed")
+            else:
+                token_provider = TokenProvider.from_client(client=client)
+
+        return cls(trustyai_url=resolve_url(name=TRUSTYAI_SERVICE),
+                   token_provider=token_provider,
+                   inference_url_resolver=lambda name: resolve_url(name=name, inference=True),
+                   cassette=cassette,
+                   **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _request(self, method, url, headers, **kwargs):
+        with span("http.request", method=str(method), path=urlsplit(url).path) as request_span:
+            response = self.session.request(method=method, url=url, headers=headers, **kwargs)
+            if request_span is not None:
+                request_span.set_attribute("status_code", response.status_code)
+                # Until the response headers were parsed: connection, TLS and server time, without reading the body
+                request_span.set_attribute("time_to_headers", response.elapsed.total_seconds())
+        return response
+
+    def _send(self, method, url, headers=None, **kwargs):
+        headers = dict(headers or {})
+        headers["Authorization"] = f"Bearer {self.token_provider.get_token()}"
+        response = self._request(method=method, url=url, headers=headers, **kwargs)
+
+        if response.status_code == http.HTTPStatus.UNAUTHORIZED:
+            logger.debug(f"Got 401 from {url}, refreshing bearer token and retrying")
+            self.token_provider.invalidate()
+            headers["Authorization"] = f"Bearer {self.token_provider.get_token()}"
+            response = self._request(method=method, url=url, headers=headers, **kwargs)
+
+        return response
+
+    def request(self, endpoint, method, data=None):
+        url = f"{self.trustyai_url}{endpoint}"
+        headers = {"Content-Type": "application/json"}
+
+        response = None
+        if method == http.HTTPMethod.GET:
+            response = self._send(method=method, url=url, headers=headers)
+        elif method in (http.HTTPMethod.POST, http.HTTPMethod.DELETE):
+            response = self._send(method=method, url=url, headers=headers, json=data)
+
+        return response
+
+    def get_inference_url(self, inference_service_name):
+        with self._lock:
+            url = self.inference_urls.get(inference_service_name)
+            if url is None:
+                if self.inference_url_resolver is None:
+                    raise ValueError(f"No inference URL known for {inference_service_name}")
+                url = self.inference_url_resolver(inference_service_name)
+                self.inference_urls[inference_service_name] = url
+        return url
+
+    def infer(self, inference_service_name, data, headers=None, timeout=None):
+        url = self.get_inference_url(inference_service_name=inference_service_name)
+        response = self._send(method=http.HTTPMethod.POST, url=url, data=data, headers=headers, timeout=timeout)
+        self.invalidate_metadata(model_id=inference_service_name)
+        return response
+
+    def get_model_metadata(self):
+        response = self.request(endpoint=TRUSTYAI_MODEL_METADATA_ENDPOINT, method=http.HTTPMethod.GET)
+        if response:
+            self._cache_metadata_listing(model_metadata=response.json())
+        return response
+
+    def _cache_metadata_listing(self, model_metadata):
+        fetch_time = monotonic()
+        with self._metadata_lock:
+            for model_id in self._metadata_cache:
+                self._metadata_cache[model_id] = (fetch_time, None)
+            for item in model_metadata:
+                self._metadata_cache[item.get("modelId")] = (fetch_time, item)
+
+    def _fetch_single_model_metadata(self, model_id):
+        response = self.request(endpoint=TRUSTYAI_SINGLE_MODEL_METADATA_ENDPOINT.format(model_id=model_id),
+                                method=http.HTTPMethod.GET)
+        if response.status_code in (http.HTTPStatus.METHOD_NOT_ALLOWED, http.HTTPStatus.NOT_IMPLEMENTED):
+            logger.debug("TrustyAI service has no single-model metadata endpoint, using the full listing")
+            self._single_model_metadata_supported = False
+            return False
+        if response.status_code == http.HTTPStatus.NOT_FOUND:
+            # Either an unknown model (e.g. no inference received yet) or a build without the endpoint,
+            # only the full listing tells them apart
+            if not self.get_model_metadata():
+                raise Exception("Failed to retrieve model metadata")
+            with self._metadata_lock:
+                listed = self._metadata_cache.get(model_id, (None, None))[1] is not None
+            if listed:
+                logger.debug("TrustyAI service has no single-model metadata endpoint, using the full listing")
+                self._single_model_metadata_supported = False
+                return True
+            model_metadata = None
+        elif response:
+            model_metadata = response.json()
+        else:
+            raise Exception("Failed to retrieve model metadata")
+
+        with self._metadata_lock:
+            self._metadata_cache[model_id] = (monotonic(), model_metadata)
+        return True
+
+    def get_model_info(self, model_id, max_age=None):
+        max_age = self.metadata_ttl if max_age is None else max_age
+        with self._metadata_lock:
+            cached = self._metadata_cache.get(model_id)
+        if cached is not None and monotonic() - cached[0] < max_age:
+            return cached[1]
+
+        if not (self._single_model_metadata_supported and self._fetch_single_model_metadata(model_id=model_id)):
+            if not self.get_model_metadata():
+                raise Exception("Failed to retrieve model metadata")
+
+        with self._metadata_lock:
+            return self._metadata_cache.setdefault(model_id, (monotonic(), None))[1]
+
+    def invalidate_metadata(self, model_id=None):
+        with self._metadata_lock:
+            if model_id is None:
+                self._metadata_cache.clear()
+            else:
+                self._metadata_cache.pop(model_id, None)
+
+    def get_datapoint_counter(self, model_id, max_age=None):
+        model_data = self.get_model_info(model_id=model_id, max_age=max_age)
+
+        if model_data:
+            return model_data.get("observations", 0)
+        else:
+            return 0
+
+    def apply_name_mappings(self, model_id, input_mappings, output_mappings):
+        data = {
+            "modelId": model_id,
+            "inputMapping": input_mappings,
+            "outputMapping": output_mappings
+        }
+
+        response = self.request(endpoint=TRUSTYAI_NAMES_ENDPOINT, method=http.HTTPMethod.POST, data=data)
+        self.invalidate_metadata(model_id=model_id)
+        return response
+
+    def delete_name_mappings(self, model_id):
+        response = self.request(endpoint=TRUSTYAI_NAMES_ENDPOINT, method=http.HTTPMethod.DELETE,
+                                data={"modelId": model_id})
+        self.invalidate_metadata(model_id=model_id)
+        return response
+
+    def get_fairness_metrics(self,
+                             model_id,
+                             protected_attribute,
+                             privileged_attribute,
+                             unprivileged_attribute,
+                             outcome_name,
+                             favorable_outcome,
+                             batch_size,
+                             endpoint=TRUSTYAI_SPD_ENDPOINT):
+        data = {
+            "modelId": model_id,
+            "protectedAttribute": protected_attribute,
+            "privilegedAttribute": privileged_attribute,
+            "unprivilegedAttribute": unprivileged_attribute,
+            "outcomeName": outcome_name,
+            "favorableOutcome": favorable_outcome,
+            "batchSize": batch_size
+        }
+
+        return self.request(endpoint=endpoint, method=http.HTTPMethod.POST, data=data)
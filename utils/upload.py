@@ -0,0 +1,86 @@
+import logging
+from time import monotonic
+
+from utils.batching import rebatch_payload_files
+from utils.ingestion import IngestionEngine, load_payload_files, wait_for_observations, DEFAULT_MAX_CONCURRENCY, \
+    DEFAULT_REQUEST_TIMEOUT, DEFAULT_MAX_RETRIES, DEFAULT_BARRIER_TIMEOUT
+from utils.tensor_encoding import load_encoded_payload_files, JSON_ENCODING
+from utils.tracing import traced, span
+
+logger = logging.getLogger(__name__)
+
+# Nothing here talks to the cluster API, so the command line can upload to a TrustyAI URL without
+# importing kubernetes or ocp_resources
+
+
+@traced()
+def send_data(trustyai_client, model_id, data_path,
+              max_concurrency=DEFAULT_MAX_CONCURRENCY,
+              timeout=DEFAULT_REQUEST_TIMEOUT,
+              max_retries=DEFAULT_MAX_RETRIES,
+              barrier_timeout=DEFAULT_BARRIER_TIMEOUT,
+              encoding=JSON_ENCODING,
+              payload_store=None,
+              rows_per_request=None,
+              on_result=None,
+              checkpoint=None):
+    # Same as utils.utils.send_data_to_inference_service, for a client that was not built from the cluster's routes
+    start_obs = trustyai_client.get_datapoint_counter(model_id=model_id, max_age=0)
+
+    if checkpoint is not None:
+        # Journal every accepted payload next to the caller's own callback
+        checkpoint.open(observations=start_obs, rows_per_request=rows_per_request)
+        callbacks = [callback for callback in (on_result, checkpoint.record) if callback is not None]
+
+        def on_result(payload, result):
+            for callback in callbacks:
+                callback(payload, result)
+
+    try:
+        engine = IngestionEngine(trustyai_client=trustyai_client,
+                                 inference_service_name=model_id,
+                                 max_concurrency=max_concurrency,
+                                 timeout=timeout,
+                                 max_retries=max_retries,
+                                 on_result=on_result)
+
+        if rows_per_request is not None:
+            payloads = rebatch_payload_files(data_path=data_path, rows_per_request=rows_per_request,
+                                             encoding=encoding, payload_store=payload_store)
+        elif payload_store is not None:
+            payloads = payload_store.payloads(data_path=data_path, encoding=encoding)
+        elif encoding == JSON_ENCODING:
+            payloads = load_payload_files(data_path=data_path)
+        else:
+            payloads = load_encoded_payload_files(data_path=data_path, encoding=encoding)
+        if checkpoint is not None:
+            payloads = checkpoint.pending(payloads=payloads)
+        with span("upload.send_data.send", max_concurrency=max_concurrency):
+            results = engine.send(payloads=payloads)
+        sent_time = monotonic()
+
+        errors = [f"Data from file {result.name} could not be sent: {result.error}" for result in results
+                  if not result.ok]
+
+        expected_obs = start_obs + sum(result.rows for result in results if result.ok)
+        barrier = wait_for_observations(trustyai_client=trustyai_client,
+                                        model_id=model_id,
+                                        expected_observations=expected_obs,
+                                        timeout=barrier_timeout,
+                                        start_time=sent_time)
+        logger.info(f"TrustyAI reached {barrier.observations}/{expected_obs} observations "
+                    f"{barrier.lag:.2f}s after the last payload was sent")
+        if checkpoint is not None and barrier.reached:
+            checkpoint.confirm(observations=barrier.observations)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if not barrier.reached:
+        errors.append(f"Data from {data_path} not received by TrustyAI service: "
+                      f"{barrier.observations}/{expected_obs} observations")
+
+    if errors:
+        return results, errors
+    else:
+        return results, None
@@ -1,66 +1,42 @@
 import http
-import os
-import subprocess
-from time import time, sleep
+import threading
 
-import kubernetes
-import requests
 from ocp_resources.pod import Pod
 from ocp_resources.route import Route
 
-from utils.constants import TRUSTYAI_SERVICE, TRUSTYAI_SPD_ENDPOINT, TRUSTYAI_NAMES_ENDPOINT, INFERENCE_ENDPOINT, \
-    TRUSTYAI_MODEL_METADATA_ENDPOINT, MM_PAYLOAD_PROCESSORS
+from utils.constants import TRUSTYAI_SERVICE, TRUSTYAI_STORAGE_FOLDER, TRUSTYAI_SPD_ENDPOINT, \
+    TRUSTYAI_DATABASE_STORAGE, TRUSTYAI_PVC_STORAGE, MARIADB, MARIADB_DATABASE, INFERENCE_SERVICE_API_VERSION
+from utils.tracing import traced
+from utils.trustyai_client import TrustyAIClient
+from utils.upload import send_data
+from utils.waiters import wait_for_resources, model_pods_ready, all_present, is_inference_service_loaded, \
+    DEFAULT_WAIT_TIMEOUT
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+_trustyai_clients = {}
+_trustyai_clients_lock = threading.Lock()
+
 
 class TrustyAIPodNotFoundError(Exception):
     pass
 
 
-def send_data_to_inference_service(client, namespace, inference_service, data_path):
-    inference_route = next(Route.get(client=client, namespace=namespace.name, name=inference_service.name))
-    token = get_ocp_token()
-
-    responses = []
-    errors = []
-
-    for file_name in os.listdir(data_path):
-        file_path = os.path.join(data_path, file_name)
-        if os.path.isfile(file_path):
-            start_obs = get_trustyai_service_datapoint_counter(client=client,
-                                                               namespace=namespace,
-                                                               inference_service=inference_service)
-
-            with open(file_path, "r") as file:
-                data = file.read()
-
-            url = f"https://{inference_route.host}{inference_route.instance.spec.path}{INFERENCE_ENDPOINT}"
-            headers = {"Authorization": f"Bearer {token}"}
-            response = requests.post(url=url, headers=headers, data=data, verify=False)
-
-            end_obs = get_trustyai_service_datapoint_counter(client=client,
-                                                             namespace=namespace,
-                                                             inference_service=inference_service)
-
-            if end_obs > start_obs:
-                responses.append(response)
-            else:
-                errors.append(f"Data from file {file_name} not received by TrustyAI service")
-
-    if errors:
-        return responses, errors
-    else:
-        return responses, None
+class TrustyAIResetError(Exception):
+    pass
 
 
-def get_ocp_token():
-    token = subprocess.check_output(["oc", "whoami", "-t"]).decode().strip()
-    return token
+@traced()
+def send_data_to_inference_service(client, namespace, inference_service, data_path, **kwargs):
+    return send_data(trustyai_client=get_trustyai_client(client=client, namespace=namespace),
+                     model_id=inference_service.name,
+                     data_path=data_path,
+                     **kwargs)
 
 
+@traced()
 def get_trustyai_pod(client, namespace):
     pod = next((pod for pod in Pod.get(client=client, namespace=namespace.name) if TRUSTYAI_SERVICE in pod.name), None)
     if pod is None:
@@ -68,43 +44,111 @@ def get_trustyai_pod(client, namespace):
     return pod
 
 
+@traced()
+def reset_trustyai_service(client, namespace, model_ids, storage_format=TRUSTYAI_PVC_STORAGE):
+    # Clears stored inference data and name mappings while keeping the TrustyAI and model pods running
+    trustyai_client = get_trustyai_client(client=client, namespace=namespace)
+    for model_id in model_ids:
+        response = trustyai_client.delete_name_mappings(model_id=model_id)
+        if not response and response.status_code != http.HTTPStatus.NOT_FOUND:
+            raise Exception(f"Failed to delete name mappings for model {model_id}: {response.text}")
+
+    if storage_format == TRUSTYAI_DATABASE_STORAGE:
+        tables = execute_mariadb_query(client=client, namespace=namespace,
+                                       query="SELECT table_name FROM information_schema.tables "
+                                             f"WHERE table_schema = '{MARIADB_DATABASE}'").split()
+        if tables:
+            execute_mariadb_query(client=client, namespace=namespace,
+                                  query="SET FOREIGN_KEY_CHECKS = 0; "
+                                        + " ".join(f"TRUNCATE TABLE `{table}`;" for table in tables))
+    else:
+        trustyai_pod = get_trustyai_pod(client=client, namespace=namespace)
+        trustyai_pod.execute(command=["sh", "-c", f"rm -rf {TRUSTYAI_STORAGE_FOLDER}/*"],
+                             container=TRUSTYAI_SERVICE)
+    trustyai_client.invalidate_metadata()
+
+    # A namespace that still reports data must not be leased again
+    for model_id in model_ids:
+        observations = trustyai_client.get_datapoint_counter(model_id=model_id, max_age=0)
+        if observations:
+            raise TrustyAIResetError(f"Model {model_id} still has {observations} observations after the reset "
+                                     f"of namespace {namespace.name}")
+
+
+@traced()
+def execute_mariadb_query(client, namespace, query):
+    # The password is read from the container's environment, so it never appears on a command line
+    mariadb_pod = Pod(client=client, name=MARIADB, namespace=namespace.name)
+    return mariadb_pod.execute(command=["sh", "-c", 'MYSQL_PWD="$MYSQL_PASSWORD" mysql -u"$MYSQL_USER" -N '
+                                                    f'-D {MARIADB_DATABASE} -e "$0"', query],
+                               container=MARIADB)
+
+
+@traced()
+def get_trustyai_storage_bytes(client, namespace, trustyai_service):
+    # Bytes of inference data stored by TrustyAI, in the PVC folder or in the database
+    if trustyai_service.storage_format == TRUSTYAI_DATABASE_STORAGE:
+        output = execute_mariadb_query(client=client, namespace=namespace,
+                                       query="SELECT COALESCE(SUM(data_length + index_length), 0) "
+                                             "FROM information_schema.tables "
+                                             f"WHERE table_schema = '{MARIADB_DATABASE}'")
+        return int(output.split()[0])
+
+    trustyai_pod = get_trustyai_pod(client=client, namespace=namespace)
+    output = trustyai_pod.execute(command=["du", "-sb", TRUSTYAI_STORAGE_FOLDER], container=TRUSTYAI_SERVICE)
+    return int(output.split()[0])
+
+
+@traced()
 def get_trustyai_service_route(client, namespace):
     return next(Route.get(client=client, namespace=namespace.name, name=TRUSTYAI_SERVICE))
 
 
-def get_trustyai_service_datapoint_counter(client, namespace, inference_service):
-    model_metadata_response = get_trustyai_model_metadata(client=client, namespace=namespace)
+@traced()
+def get_trustyai_client(client, namespace):
+    with _trustyai_clients_lock:
+        trustyai_client = _trustyai_clients.get(namespace.name)
+        if trustyai_client is None:
+            trustyai_client = TrustyAIClient.from_routes(client=client, namespace=namespace)
+            _trustyai_clients[namespace.name] = trustyai_client
+    return trustyai_client
 
-    if model_metadata_response:
-        model_metadata = model_metadata_response.json()
 
-        model_data = next((item for item in model_metadata if item.get("modelId") == inference_service.name), None)
+@traced()
+def close_trustyai_client(namespace):
+    with _trustyai_clients_lock:
+        trustyai_client = _trustyai_clients.pop(namespace.name, None)
+    if trustyai_client is not None:
+        trustyai_client.close()
 
-        if model_data:
-            observations = model_data.get("observations", 0)
-            return observations
-        else:
-            return 0
-    else:
-        raise Exception("Failed to retrieve model metadata")
+
+@traced()
+def close_all_trustyai_clients():
+    with _trustyai_clients_lock:
+        trustyai_clients = list(_trustyai_clients.values())
+        _trustyai_clients.clear()
+    for trustyai_client in trustyai_clients:
+        trustyai_client.close()
+
+
+@traced()
+def get_trustyai_service_datapoint_counter(client, namespace, inference_service):
+    return get_trustyai_client(client=client, namespace=namespace).get_datapoint_counter(
+        model_id=inference_service.name)
 
 
+@traced()
 def get_trustyai_model_metadata(client, namespace):
-    return send_trustyai_service_request(client=client, namespace=namespace, endpoint=TRUSTYAI_MODEL_METADATA_ENDPOINT,
-                                         method=http.HTTPMethod.GET)
+    return get_trustyai_client(client=client, namespace=namespace).get_model_metadata()
 
 
+@traced()
 def apply_trustyai_name_mappings(client, namespace, inference_service, input_mappings, output_mappings):
-    data = {
-        "modelId": inference_service.name,
-        "inputMapping": input_mappings,
-        "outputMapping": output_mappings
-    }
-
-    return send_trustyai_service_request(client=client, namespace=namespace, endpoint=TRUSTYAI_NAMES_ENDPOINT,
-                                         method=http.HTTPMethod.POST, data=data)
+    return get_trustyai_client(client=client, namespace=namespace).apply_name_mappings(
+        model_id=inference_service.name, input_mappings=input_mappings, output_mappings=output_mappings)
 
 
+@traced()
 def get_fairness_metrics(client,
                          namespace,
                          inference_service,
@@ -113,70 +157,50 @@ def get_fairness_metrics(client,
                          unprivileged_attribute,
                          outcome_name,
                          favorable_outcome,
-                         batch_size):
-    data = {
-        "modelId": inference_service.name,
-        "protectedAttribute": protected_attribute,
-        "privilegedAttribute": privileged_attribute,
-        "unprivilegedAttribute": unprivileged_attribute,
-        "outcomeName": outcome_name,
-        "favorableOutcome": favorable_outcome,
-        "batchSize": batch_size
-    }
-
-    return send_trustyai_service_request(client=client, namespace=namespace, endpoint=TRUSTYAI_SPD_ENDPOINT,
-                                         method=http.HTTPMethod.POST, data=data)
-
-
+                         batch_size,
+                         endpoint=TRUSTYAI_SPD_ENDPOINT):
+    return get_trustyai_client(client=client, namespace=namespace).get_fairness_metrics(
+        model_id=inference_service.name,
+        protected_attribute=protected_attribute,
+        privileged_attribute=privileged_attribute,
+        unprivileged_attribute=unprivileged_attribute,
+        outcome_name=outcome_name,
+        favorable_outcome=favorable_outcome,
+        batch_size=batch_size,
+        endpoint=endpoint)
+
+
+@traced()
 def send_trustyai_service_request(client, namespace, endpoint, method, data=None):
-    trustyai_service_route = get_trustyai_service_route(client=client, namespace=namespace)
-    token = get_ocp_token()
-
-    url = f"https://{trustyai_service_route.host}{endpoint}"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-
-    response = None
-    if method == http.HTTPMethod.GET:
-        response = requests.get(url=url, headers=headers, verify=False)
-    elif method == http.HTTPMethod.POST:
-        response = requests.post(url=url, headers=headers, json=data, verify=False)
-
-    return response
-
-
-def wait_for_model_pods(client, namespace):
-    pods_with_env_var = False
-    all_pods_running = False
-    timeout = 60 * 3
-    start_time = time()
-    while not pods_with_env_var or not all_pods_running:
-        if time() - start_time > timeout:
-            raise TimeoutError("Not all model pods are ready in time")
-
-        model_pods = [pod for pod in Pod.get(client=client, namespace=namespace.name)
-                      if "modelmesh-serving" in pod.name]
-
-        pods_with_env_var = False
-        all_pods_running = True
-        for pod in model_pods:
-            try:
-                has_env_var = False
-                for container in pod.instance.spec.containers:
-                    if container.env is not None and any(env.name == MM_PAYLOAD_PROCESSORS for env in container.env):
-                        has_env_var = True
-                        break
-
-                if has_env_var:
-                    pods_with_env_var = True
-                    if pod.status != Pod.Status.RUNNING:
-                        all_pods_running = False
-                        break
-            except kubernetes.dynamic.exceptions.NotFoundError:
-                # Ignore the error if the pod is not found (deleted during the process)
-                continue
-
-        if not pods_with_env_var or not all_pods_running:
-            sleep(5)
+    return get_trustyai_client(client=client, namespace=namespace).request(endpoint=endpoint, method=method,
+                                                                          data=data)
+
+
+@traced()
+def wait_for_inference_services(client, namespace, names, timeout=DEFAULT_WAIT_TIMEOUT):
+    # One watch for all the InferenceServices and one for their routes, instead of a wait per model
+    wait_for_resources(client=client,
+                       api_version=INFERENCE_SERVICE_API_VERSION,
+                       kind="InferenceService",
+                       namespace=namespace.name,
+                       condition=all_present(names=names, condition=is_inference_service_loaded),
+                       timeout=timeout,
+                       description=f"{len(names)} InferenceServices in namespace {namespace.name}")
+    wait_for_resources(client=client,
+                       api_version=f"{Route.api_group}/v1",
+                       kind=Route.kind,
+                       namespace=namespace.name,
+                       condition=all_present(names=names),
+                       timeout=timeout,
+                       description=f"routes of {len(names)} InferenceServices in namespace {namespace.name}")
+
+
+@traced()
+def wait_for_model_pods(client, namespace, timeout=DEFAULT_WAIT_TIMEOUT):
+    wait_for_resources(client=client,
+                       api_version=Pod.api_version,
+                       kind=Pod.kind,
+                       namespace=namespace.name,
+                       condition=model_pods_ready,
+                       timeout=timeout,
+                       description=f"model pods in namespace {namespace.name}")
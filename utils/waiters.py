@@ -0,0 +1,138 @@
+import http
+import logging
+from time import monotonic
+
+from kubernetes.client.rest import ApiException
+from ocp_resources.pod import Pod
+
+from utils.constants import MM_PAYLOAD_PROCESSORS, MODELMESH_SERVING
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAIT_TIMEOUT = 60 * 3
+# Upper bound for a single watch request, the watch is resumed from the last seen resourceVersion
+MAX_WATCH_SECONDS = 60
+
+
+def wait_for_resources(client,
+                       api_version,
+                       kind,
+                       namespace,
+                       condition,
+                       timeout=DEFAULT_WAIT_TIMEOUT,
+                       label_selector=None,
+                       field_selector=None,
+                       description=None):
+    """
+    Wait until `condition` holds for the current set of matching resources, using the watch API.
+
+    `condition` is called with a dict of name -> ResourceInstance every time that set changes and
+    the dict is returned as soon as it evaluates to True.
+    """
+    description = description or f"{kind} resources in namespace {namespace}"
+    resource_api = client.resources.get(api_version=api_version, kind=kind)
+    deadline = monotonic() + timeout
+    resources = None
+    resource_version = None
+
+    while True:
+        if resources is None:
+            listing = resource_api.get(namespace=namespace, label_selector=label_selector,
+                                       field_selector=field_selector)
+            resources = {item.metadata.name: item for item in listing.items}
+            resource_version = listing.metadata.resourceVersion
+            if condition(resources):
+                return resources
+
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for {description}")
+
+        try:
+            for event in resource_api.watch(namespace=namespace,
+                                            label_selector=label_selector,
+                                            field_selector=field_selector,
+                                            resource_version=resource_version,
+                                            timeout=max(1, int(min(remaining, MAX_WATCH_SECONDS)))):
+                instance = event["object"]
+                resource_version = instance.metadata.resourceVersion
+                if event["type"] == "DELETED":
+                    resources.pop(instance.metadata.name, None)
+                elif event["type"] in ("ADDED", "MODIFIED"):
+                    resources[instance.metadata.name] = instance
+                else:
+                    continue
+
+                if condition(resources):
+                    return resources
+        except ApiException as e:
+            if e.status != http.HTTPStatus.GONE:
+                raise
+            logger.debug(f"resourceVersion {resource_version} expired while waiting for {description}, relisting")
+            resources = None
+
+
+def wait_for_resource(resource, condition, timeout=DEFAULT_WAIT_TIMEOUT):
+    def named_resource_ready(resources):
+        instance = resources.get(resource.name)
+        return instance is not None and condition(instance)
+
+    resources = wait_for_resources(client=resource.client,
+                                   api_version=resource.api_version,
+                                   kind=resource.kind,
+                                   namespace=resource.namespace,
+                                   field_selector=f"metadata.name={resource.name}",
+                                   condition=named_resource_ready,
+                                   timeout=timeout,
+                                   description=f"{resource.kind} {resource.name}")
+    return resources[resource.name]
+
+
+def exists(instance):
+    return True
+
+
+def is_pod_running(instance):
+    return instance.status is not None and instance.status.phase == Pod.Status.RUNNING
+
+
+def has_ready_condition(instance):
+    conditions = (instance.status or {}).get("conditions") or []
+    return any(condition["type"] == "Ready" and condition["status"] == "True" for condition in conditions)
+
+
+def is_pod_ready(instance):
+    # Running only means the containers started, Ready also means their readiness probes pass
+    return is_pod_running(instance) and has_ready_condition(instance)
+
+
+def is_trustyai_service_ready(instance):
+    return instance.status is not None and (instance.status.phase == "Ready" or has_ready_condition(instance))
+
+
+def is_inference_service_loaded(instance):
+    # ModelMesh reports the model as Loaded once a runtime pod serves it, before the Ready condition settles
+    model_status = (instance.status or {}).get("modelStatus") or {}
+    states = model_status.get("states") or {}
+    return states.get("activeModelState") == "Loaded" or has_ready_condition(instance)
+
+
+def all_present(names, condition=exists):
+    # Condition for wait_for_resources: every resource in `names` exists and satisfies `condition`
+    def resources_ready(resources):
+        return all(name in resources and condition(resources[name]) for name in names)
+    return resources_ready
+
+
+def has_payload_processors_env(instance):
+    for container in instance.spec.containers:
+        if container.env is not None and any(env.name == MM_PAYLOAD_PROCESSORS for env in container.env):
+            return True
+    return False
+
+
+def model_pods_ready(pods):
+    model_pods = [pod for name, pod in pods.items()
+                  if MODELMESH_SERVING in name and pod.metadata.deletionTimestamp is None]
+    pods_with_env_var = [pod for pod in model_pods if has_payload_processors_env(instance=pod)]
+    return bool(pods_with_env_var) and all(is_pod_running(instance=pod) for pod in pods_with_env_var)
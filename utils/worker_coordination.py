@@ -0,0 +1,59 @@
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def get_worker_id():
+    # Set by pytest-xdist on every worker process, absent when running without -n
+    return os.environ.get("PYTEST_XDIST_WORKER")
+
+
+def worker_scoped_name(name):
+    worker_id = get_worker_id()
+    return f"{name}-{worker_id}" if worker_id else name
+
+
+class SharedClusterResources:
+    """
+    Reference-counted setup and teardown of cluster-scoped resources shared by pytest-xdist workers.
+
+    The first worker to acquire runs `setup` and the last one to release runs `teardown`, both while
+    holding an exclusive file lock in `state_dir`, which must be shared by all workers of the run.
+    """
+
+    def __init__(self, state_dir, name):
+        self.lock_path = os.path.join(state_dir, f"{name}.lock")
+        self.state_path = os.path.join(state_dir, f"{name}.json")
+
+    @contextmanager
+    def _locked_state(self):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                state = {"users": 0}
+                if os.path.exists(self.state_path):
+                    with open(self.state_path) as state_file:
+                        state = json.load(state_file)
+                yield state
+                with open(self.state_path, "w") as state_file:
+                    json.dump(state, state_file)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def acquire(self, setup):
+        with self._locked_state() as state:
+            if state["users"] == 0:
+                logger.info(f"Worker {get_worker_id()} setting up shared resources {self.state_path}")
+                setup()
+            state["users"] += 1
+
+    def release(self, teardown):
+        with self._locked_state() as state:
+            state["users"] -= 1
+            if state["users"] == 0:
+                logger.info(f"Worker {get_worker_id()} tearing down shared resources {self.state_path}")
+                teardown()